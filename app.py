@@ -1,22 +1,34 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from startup import STARTUP
+from flask import (Flask, render_template, request, redirect, url_for, session, jsonify, g, has_request_context,
+                   Response, abort, send_from_directory)
+from flask_sock import Sock
+from simple_websocket import ConnectionClosed
 import os
-import sqlite3
 import uuid
-import cv2
-import numpy as np
-import mediapipe as mp
 import traceback
-import bcrypt
-import subprocess
-import json
-import shutil
-import sys
+import atexit
+import threading
+import time
+import jobs
+import storage
+from db_pool import SQLitePool
+from passwords import PasswordHasher, HasherBusy
+from uploads import UploadStore, UploadError, DiskRequest, accept_file
+from frame_mailbox import ClaimTimeout, LatestFrame, MailboxTable
+from metrics import REGISTRY, LIVE_STAGE_SECONDS, HTTP_REQUEST_SECONDS, HTTP_REQUESTS
 
 app = Flask(__name__, template_folder='public', static_folder='static')
 app.secret_key = 'replace-with-a-strong-secret'
 app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024  # 200MB max upload size
+app.request_class = DiskRequest
+sock = Sock(app)
 DB_PATH = 'users.db'
 
+# Latest-frame-wins mailboxes so slow inference never builds a backlog per user.
+FRAME_MAILBOXES = MailboxTable()
+# Resumable chunked video uploads, written to disk as they arrive.
+UPLOADS = UploadStore()
+
 POSES = [
     {"key": "tree", "name": "Tree Pose", "image": "/static/images/tree.png"},
     {"key": "ardhachandrasana", "name": "Ardha Chandrasana", "image": "/static/images/ardhachandrasana.png"},
@@ -25,16 +37,70 @@ POSES = [
     {"key": "utkatasana", "name": "Utkata Konasana", "image": "/static/images/utkatasana.png"},
     {"key": "veerabhadrasana", "name": "Veerabhadrasana", "image": "/static/images/veerabhadrasana.png"}
 ]
+POSES_BY_KEY = {p['key']: p for p in POSES}
+
+# --- Vision stack ---
+# cv2, mediapipe and numpy are only needed by the live pose routes, so they
+# are imported on the first live frame rather than by every worker at boot.
+# VISION_PRELOAD=1 loads them at import instead; under `gunicorn --preload`
+# that happens once in the master and the forked workers share the pages.
+VISION_PRELOAD = os.environ.get('VISION_PRELOAD', '0') == '1'
+_vision_lock = threading.Lock()
+_inference = None
+_pose_registry = None
+
+def load_vision():
+    """
+    Build the landmark model and the ideal-pose templates. The landmark model
+    is the shared inference server when INFERENCE_SOCKET is set (MediaPipe
+    is then never imported here), otherwise warm Pose graphs and per-user
+    tracking sessions in this worker; the graphs themselves are created on
+    first use, so preloading before a fork is safe.
+    """
+    global _inference, _pose_registry
+    with _vision_lock:
+        if _pose_registry is not None:
+            return
+        with STARTUP.phase('vision'):
+            from pose_registry import PoseRegistry
+            from inference import INFERENCE_SOCKET, InferenceClient
+            if INFERENCE_SOCKET:
+                inference = InferenceClient(INFERENCE_SOCKET)
+            else:
+                from live_pose import LocalInference
+                inference = LocalInference(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+            atexit.register(inference.close)
+            registry = PoseRegistry(POSES, os.path.join(app.static_folder, 'ideal_poses'))
+        _inference, _pose_registry = inference, registry
+        log(f"Vision stack loaded: {STARTUP.phases[-1]['ms']:.0f}ms, {STARTUP.phases[-1]['rss_delta_mb']:+.1f}MB")
+
+def inference():
+    if _pose_registry is None:
+        load_vision()
+    return _inference
+
+def pose_registry():
+    if _pose_registry is None:
+        load_vision()
+    return _pose_registry
 
 # --- Database Helpers ---
+# Pooled WAL-mode connections, reused across requests.
+USER_DB = SQLitePool(DB_PATH)
+atexit.register(USER_DB.close)
+
 def db_execute(query, args=(), one=False):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(query, args)
-    conn.commit()
-    results = c.fetchall()
-    conn.close()
-    return (results[0] if results else None) if one else results
+    return USER_DB.execute(query, args, one)
+
+# bcrypt runs on a few dedicated threads so login bursts can't take every core.
+PASSWORDS = PasswordHasher()
+atexit.register(PASSWORDS.close)
+
+def _busy_response(template):
+    error = "Server busy, please try again in a moment."
+    if request.is_json:
+        return jsonify({'success': False, 'message': error}), 503, {'Retry-After': '1'}
+    return render_template(template, error=error), 503, {'Retry-After': '1'}
 
 def db_create_users():
     db_execute('''CREATE TABLE IF NOT EXISTS users (
@@ -42,34 +108,49 @@ def db_create_users():
         username TEXT UNIQUE, 
         password TEXT
     )''')
-db_create_users()
 
-# --- Video Conversion Helper ---
-def convert_to_h264(input_path, output_path):
-    """
-    Converts video to H.264 format using FFmpeg for browser compatibility.
-    Returns True if successful, False otherwise.
-    """
-    try:
-        if shutil.which('ffmpeg') is None:
-            print("FFmpeg not found. Skipping conversion.")
-            return False
-
-        print(f"Converting {input_path} to H.264...")
-        command = [
-            'ffmpeg', '-y',
-            '-i', input_path,
-            '-vcodec', 'libx264',
-            '-acodec', 'aac',
-            '-movflags', 'faststart',
-            output_path
-        ]
-        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        print("Conversion successful!")
-        return True
-    except Exception as e:
-        print(f"Video conversion failed: {e}")
-        return False
+# Tables are created on a worker's first request, so importing this module
+# touches no files.
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def init_db():
+    global _schema_ready
+    with _schema_lock:
+        if not _schema_ready:
+            db_create_users()
+            jobs.init_db()
+            _schema_ready = True
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the user and job databases (`flask --app app init-db`)."""
+    init_db()
+    print(f"Initialized {DB_PATH} and {jobs.JOBS_DB}")
+
+# --- Request IDs and metrics ---
+def log(message):
+    """print() tagged with the current request ID."""
+    request_id = g.get('request_id', '-') if has_request_context() else '-'
+    print(f"[{request_id}] {message}")
+
+@app.before_request
+def start_request():
+    if not _schema_ready:
+        init_db()
+    # Lets any worker's /metrics include this one's numbers.
+    REGISTRY.dump_periodically()
+    g.request_id = (request.headers.get('X-Request-ID') or uuid.uuid4().hex[:12])[:64]
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def finish_request(response):
+    # Label by route pattern, not URL, so pose names and job IDs don't explode the series.
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, route=route, method=request.method)
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    response.headers['X-Request-ID'] = g.request_id
+    return response
 
 # --- Routes ---
 
@@ -99,7 +180,10 @@ def signup():
             else:
                 return render_template('signup.html', error=error)
                 
-        hashed = bcrypt.hashpw(pwd.encode('utf-8'), bcrypt.gensalt())
+        try:
+            hashed = PASSWORDS.hash(pwd)
+        except HasherBusy:
+            return _busy_response('signup.html')
         db_execute('INSERT INTO users(username, password) VALUES (?,?)', (uname, hashed))
         
         if request.is_json:
@@ -122,7 +206,14 @@ def login():
         row = db_execute('SELECT * FROM users WHERE username=?', (uname,), one=True)
         
         if row:
-            if bcrypt.checkpw(pwd.encode('utf-8'), row[2]):
+            try:
+                ok, new_hash = PASSWORDS.verify(pwd, row[2])
+            except HasherBusy:
+                return _busy_response('login.html')
+            if ok:
+                if new_hash is not None:
+                    # Stored with an older cost factor; upgrade it now that we know the password.
+                    db_execute('UPDATE users SET password=? WHERE id=?', (new_hash, row[0]))
                 session['user'] = uname
                 return jsonify({'success': True, 'redirect': url_for('dashboard')}) if request.is_json else redirect(url_for('dashboard'))
             else:
@@ -137,6 +228,8 @@ def login():
 
 @app.route('/logout', methods=['POST', 'GET'])
 def logout():
+    if 'live_id' in session and _inference is not None:
+        _inference.discard(session['live_id'])
     session.clear()
     return redirect(url_for('login'))
 
@@ -167,181 +260,285 @@ def physical_test(test):
         video = request.files.get('video')
         if not video:
             return "No video file", 400
-            
-        uploads_dir = os.path.join(app.static_folder, 'uploads')
-        if not os.path.exists(uploads_dir):
-            os.makedirs(uploads_dir)
-            
-        savename = f"{test}_{uuid.uuid4().hex}.mp4"
-        filepath = os.path.join(uploads_dir, savename)
-        video.save(filepath)
-        
+        # DiskRequest already spooled the file to disk; validate and move it.
+        spooled = getattr(video.stream, 'name', None)
+        video.stream.close()
+        if not isinstance(spooled, str):
+            return "No video file", 400
         try:
-            result = subprocess.run(
-                [sys.executable, 'eval_script.py', test, filepath],
-                capture_output=True,
-                text=True,
-                timeout=900
-            )
-            print("========== STDOUT ==========")
-            print(result.stdout)
-
-            print("========== STDERR ==========")
-            print(result.stderr)
-
-            lines = result.stdout.strip().splitlines()
-
-            if len(lines) == 0:
-                raise Exception(
-                    f"eval_script.py produced no output.\n\n"
-                    f"STDERR:\n{result.stderr}"
-                )
-
-            json_line = None
-
-            for line in reversed(lines):
-                if line.strip().startswith("{"):
-                    json_line = line
-                    break
-
-            if not json_line:
-                raise Exception("No JSON output found")
-
-            output_json = json_line
-            try:
-                res_data = json.loads(output_json)
-                summary = res_data['result']
-                raw_video_path = res_data['video'].lstrip('/')
-                
-                if not raw_video_path.startswith('evaluated_videos/'):
-                    filename = os.path.basename(raw_video_path)
-                    rel_path = f"evaluated_videos/{filename}"
-                else:
-                    rel_path = raw_video_path
-
-                full_source_path = os.path.join(app.static_folder, rel_path)
-                web_filename = f"web_{os.path.basename(rel_path)}"
-                web_rel_path = f"evaluated_videos/{web_filename}"
-                full_dest_path = os.path.join(app.static_folder, web_rel_path)
-
-                conversion_success = False
-                if os.path.exists(full_source_path):
-                    if convert_to_h264(full_source_path, full_dest_path):
-                        conversion_success = True
-                
-                if conversion_success:
-                    download_url = url_for('static', filename=web_rel_path)
-                else:
-                    download_url = url_for('static', filename=rel_path)
-
-            except Exception as ex:
-                print(f"JSON Parse Error: {ex}")
-                summary = f"Analysis complete, but output parsing failed.\nRaw: {output_json}"
-                download_url = url_for('static', filename=f"uploads/{savename}")
-                
-        except Exception as e:
-            print(f"Script Error: {e}")
-            summary = f"Error running analysis: {e}"
-            download_url = url_for('static', filename=f"uploads/{savename}")
-
-        return render_template('physical_result.html',
-                               result=summary,
-                               download_url=download_url)
+            filepath = accept_file(spooled, test)
+        except UploadError as e:
+            return str(e), e.status
+
+        # Evaluation runs in the job pool; the result page polls for progress.
+        job_id = jobs.create_job(session['user'], test, filepath)
+        log(f"Queued job {job_id} ({test}) for {session['user']}")
+        return redirect(url_for('physical_job', job_id=job_id))
                                
     return render_template('physical_test.html', test=test)
 
+@app.route('/api/uploads', methods=['POST'])
+def upload_start():
+    if 'user' not in session:
+        return jsonify({'error': 'Login required'}), 401
+    data = request.get_json(silent=True) or {}
+    try:
+        status = UPLOADS.create(session['user'], data.get('test', ''), data.get('filename'), data.get('size'))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify(status), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'PUT'])
+def upload_chunk(upload_id):
+    """GET: where to resume. PUT: raw chunk body at the byte offset in the Upload-Offset header."""
+    if 'user' not in session:
+        return jsonify({'error': 'Login required'}), 401
+    try:
+        meta = UPLOADS.get(upload_id, session['user'])
+        if request.method == 'GET':
+            return jsonify(UPLOADS.status(meta))
+        offset = UPLOADS.append(meta, int(request.headers.get('Upload-Offset', -1)), request.stream)
+        if offset < meta['size']:
+            return jsonify({**UPLOADS.status(meta), 'offset': offset})
+        filepath = UPLOADS.complete(meta)
+    except UploadError as e:
+        body = {'error': str(e)}
+        if e.status == 409:
+            body['offset'] = UPLOADS.offset(upload_id)
+        return jsonify(body), e.status
+    except ValueError:
+        return jsonify({'error': 'Bad Upload-Offset header'}), 400
+
+    job_id = jobs.create_job(session['user'], meta['test'], filepath)
+    log(f"Queued job {job_id} ({meta['test']}) for {session['user']} from upload {upload_id}")
+    return jsonify({'offset': meta['size'], 'size': meta['size'], 'job_id': job_id,
+                    'redirect': url_for('physical_job', job_id=job_id)})
+
+def _owned_job(job_id):
+    job = jobs.get_job(job_id)
+    if job is None or job['owner'] != session.get('user'):
+        return None
+    return job
+
+@app.route('/physical_result/<job_id>')
+def physical_job(job_id):
+    if 'user' not in session:
+        return redirect(url_for('login'))
+    job = _owned_job(job_id)
+    if job is None:
+        return "Job not found!", 404
+    if job['status'] not in (jobs.DONE, jobs.FAILED):
+        return render_template('physical_result.html', pending=True, job_id=job_id,
+                               result='', download_url='')
+    return render_template('physical_result.html',
+                           result=job['summary'],
+                           download_url=url_for('serve_video', rel=job['video_rel']) if job['video_rel'] else '')
+
+# Browsers cache videos privately; the file behind a path never changes.
+VIDEO_MAX_AGE = 24 * 3600
+TRACKED_DIRS = ('uploads/', 'evaluated_videos/')
+
+@app.before_request
+def route_tracked_static():
+    """Old /static links to videos go through serve_video so access is checked and recorded."""
+    if request.endpoint == 'static':
+        filename = (request.view_args or {}).get('filename', '')
+        if filename.startswith(TRACKED_DIRS):
+            return redirect(url_for('serve_video', rel=filename), 301)
+
+@app.route('/videos/<path:rel>')
+def serve_video(rel):
+    """Owner-only video download with HTTP range support for seeking."""
+    if 'user' not in session:
+        return redirect(url_for('login'))
+    if not rel.startswith(TRACKED_DIRS):
+        abort(404)
+    artifact = storage.lookup(rel)
+    if artifact is None or artifact[1] != session['user']:
+        abort(404)
+    storage.touch(rel, artifact[5])
+    # Same root the job workers write to.
+    response = send_from_directory(os.path.abspath(storage.STATIC_DIR), rel, conditional=True,
+                                   max_age=VIDEO_MAX_AGE)
+    response.cache_control.private = True
+    response.cache_control.public = False
+    return response
+
+@app.route('/api/storage')
+def storage_usage():
+    if 'user' not in session:
+        return jsonify({'error': 'Login required'}), 401
+    return jsonify(storage.usage(session['user']))
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    if 'user' not in session:
+        return jsonify({'error': 'Login required'}), 401
+    job = _owned_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({
+        'id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'attempts': job['attempts'],
+    })
+
 @app.route('/pose/<pose_name>')
 def show_pose_page(pose_name):
     if 'user' not in session:
         return redirect(url_for('login'))
-    pose = next((p for p in POSES if p['key'] == pose_name), None)
+    pose = POSES_BY_KEY.get(pose_name)
     if not pose:
         return "Pose not found!", 404
     return render_template('yoga_detect.html', ideal_img=pose["image"], pose_name=pose_name)
 
 @app.route('/compare_pose/<pose_name>', methods=['POST'])
 def compare_pose(pose_name):
+    from inference import InferenceBusy, FrameError
+    from pose_matching import score_keypoints
     try:
-        print(f"compare_pose received: {pose_name}")
         if 'frame' not in request.files:
-            print("No frame in request")
+            log("compare_pose: no frame in request")
             return jsonify({'feedback': 'No frame in request', 'matches': [], 'user_keypoints': [], 'accuracy': 0})
         
-        file = request.files['frame']
-        arr = np.frombuffer(file.read(), np.uint8)
-        frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
-            print("Frame read error")
+        if 'live_id' not in session:
+            session['live_id'] = uuid.uuid4().hex
+        mailbox = FRAME_MAILBOXES.get(session['live_id'])
+        ticket = mailbox.post(request.files['frame'].read())
+        try:
+            with LIVE_STAGE_SECONDS.time(stage='wait'):
+                data = mailbox.claim(ticket)
+        except ClaimTimeout as e:
+            log(f"compare_pose: {e}")
+            return jsonify({'feedback': 'Server busy, retrying...', 'timed_out': True, 'matches': [],
+                            'user_keypoints': [], 'accuracy': 0}), 503
+        if data is None:
+            # A newer frame from the same user arrived while this one waited.
+            return jsonify({'feedback': 'Superseded by a newer frame', 'superseded': True, 'matches': [],
+                            'user_keypoints': [], 'accuracy': 0, 'drop_rate': mailbox.drop_rate()})
+        try:
+            kps, aspect = inference().landmarks(data, session['live_id'])
+        except FrameError:
+            log("compare_pose: frame read error")
             return jsonify({'feedback': 'Frame read error', 'matches': [], 'user_keypoints': [], 'accuracy': 0})
-
-        mp_pose = mp.solutions.pose
-        pose_model = mp_pose.Pose(static_image_mode=True, min_detection_confidence=0.5, min_tracking_confidence=0.5)
-        results = pose_model.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-
-        feedback = "No pose detected"
-        matches = []
-        user_keypoints = []
-        accuracy = 0
-
-        if results.pose_landmarks:
-            # Extract landmarks
-            user_keypoints = np.array([[lm.x, lm.y] for lm in results.pose_landmarks.landmark])
-            
-            # Path to ideal pose
-            ideal_path = os.path.join(app.static_folder, 'ideal_poses', f'{pose_name}.npy')
-            
-            # Check if file exists
-            if not os.path.exists(ideal_path):
-                # Return user_keypoints to prevent blinking even if ideal pose is missing
-                return jsonify({
-                    'feedback': 'Ideal pose keypoints not found', 
-                    'matches': [], 
-                    'user_keypoints': user_keypoints.tolist(), 
-                    'accuracy': 0
-                })
-            
-            ideal_kps = np.load(ideal_path)
-            
-            # Check shape mismatch
-            if user_keypoints.shape != ideal_kps.shape:
-                # Return user_keypoints to prevent blinking
-                return jsonify({
-                    'feedback': f'Keypoint shape mismatch', 
-                    'matches': [], 
-                    'user_keypoints': user_keypoints.tolist(), 
-                    'accuracy': 0
-                })
-            
-            # Calculate matches and accuracy
-            tolerance = 0.09
-            # Check if absolute difference is within tolerance for both X and Y
-            match_bools = np.all(np.abs(user_keypoints - ideal_kps) < tolerance, axis=1)
-            matches = match_bools.tolist()
-            match_count = np.sum(match_bools)
-            
-            # Accuracy based on count of matched points vs total points
-            if len(matches) > 0:
-                accuracy = int((match_count / len(matches)) * 100)
-            
-            feedback = f"Accuracy: {accuracy}%" + (" - Great job!" if accuracy == 100 else " - Keep adjusting!")
-
-        return jsonify({
-            'feedback': feedback,
-            'matches': matches,
-            'user_keypoints': user_keypoints.tolist() if len(user_keypoints) > 0 else [],
-            'accuracy': accuracy
-        })
+        except InferenceBusy as e:
+            log(f"compare_pose: {e}")
+            return jsonify({'feedback': 'Server busy, retrying...', 'matches': [], 'user_keypoints': [], 'accuracy': 0}), 503
+        finally:
+            mailbox.release()
+        with LIVE_STAGE_SECONDS.time(stage='compare'):
+            result = score_keypoints(kps, pose_name, pose_registry().matcher(), aspect)
+
+        user_keypoints = result['user_keypoints']
+        with LIVE_STAGE_SECONDS.time(stage='serialize'):
+            return jsonify({
+                'feedback': result['feedback'],
+                'matches': result['matches'],
+                'user_keypoints': user_keypoints.tolist() if len(user_keypoints) > 0 else [],
+                'accuracy': result['accuracy'],
+                'recognized': result['recognized'],
+                'recognized_accuracy': result['recognized_accuracy']
+            })
     except Exception as e:
-        print("Exception in compare_pose:", repr(e))
+        log(f"Exception in compare_pose: {e!r}")
         traceback.print_exc()
         return jsonify({'feedback': f'Error: {repr(e)}', 'matches': [], 'user_keypoints': [], 'accuracy': 0})
 
+def _receive_frames(ws, slot):
+    try:
+        while True:
+            data = ws.receive()
+            if isinstance(data, bytes):
+                slot.put(data)
+    except ConnectionClosed:
+        pass
+    finally:
+        slot.close()
+
+@sock.route('/ws/compare_pose/<pose_name>')
+def compare_pose_socket(ws, pose_name):
+    """
+    Live comparison over one persistent connection. Each binary message is a
+    JPEG frame; each reply is packed by live_protocol.encode_reply. Frames
+    that arrive while inference is busy are dropped, only the newest is kept.
+    pose_name 'auto' scores against whichever template matches best.
+    """
+    from inference import InferenceBusy, FrameError
+    from pose_matching import score_keypoints
+    from live_protocol import encode_reply, FLAG_BUSY, FLAG_ERROR
+    if 'user' not in session:
+        ws.close(reason=1008, message='Login required')
+        return
+    # The cookie can't change after the upgrade, so an id minted here lives
+    # only as long as this connection.
+    minted = 'live_id' not in session
+    live_id = session['live_id'] if not minted else uuid.uuid4().hex
+    empty = {'user_keypoints': [], 'matches': [], 'accuracy': 0}
+
+    slot = LatestFrame()
+    threading.Thread(target=_receive_frames, args=(ws, slot), daemon=True).start()
+    try:
+        while True:
+            taken = slot.take()
+            if taken is None:
+                break
+            data, seq, dropped = taken
+            try:
+                kps, aspect = inference().landmarks(data, live_id)
+            except FrameError:
+                ws.send(encode_reply(empty, seq, dropped, FLAG_ERROR))
+                continue
+            except InferenceBusy:
+                ws.send(encode_reply(empty, seq, dropped, FLAG_BUSY))
+                continue
+            with LIVE_STAGE_SECONDS.time(stage='compare'):
+                result = score_keypoints(kps, pose_name, pose_registry().matcher(), aspect)
+            with LIVE_STAGE_SECONDS.time(stage='serialize'):
+                reply = encode_reply(result, seq, dropped)
+            ws.send(reply)
+    except ConnectionClosed:
+        pass
+    finally:
+        slot.close()
+        FRAME_MAILBOXES.record(slot)
+        if minted and _inference is not None:
+            _inference.discard(live_id)
+
+@app.route('/stats/pose_pool')
+def pose_pool_stats():
+    return jsonify({
+        **(_inference.stats() if _inference is not None else {}),
+        'frame_mailboxes': FRAME_MAILBOXES.stats(),
+    })
+
+@app.route('/stats/startup')
+def startup_stats():
+    """Import phases and current RSS of the worker that answers."""
+    return jsonify(STARTUP.as_dict())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text format, merged across web workers, job workers and the inference server."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/favicon.ico')
 def favicon():
     return app.send_static_file('favicon.ico')
 
+STARTUP.mark('app')
+if VISION_PRELOAD:
+    load_vision()
+STARTUP.log()
+
 if __name__ == "__main__":
+    init_db()
+    # The development server runs the evaluation workers itself; under
+    # gunicorn, run `python jobs.py` alongside instead.
+    job_pool = jobs.JobPool()
+    if job_pool.size > 0 and job_pool.start():
+        atexit.register(job_pool.stop)
+
     uploads_dir = os.path.join('static', 'uploads')
     if not os.path.exists(uploads_dir):
         os.makedirs(uploads_dir)
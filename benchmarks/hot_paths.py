@@ -0,0 +1,325 @@
+"""
+Latency/throughput benchmarks for the live comparison and video evaluation hot paths.
+
+    python -m benchmarks.hot_paths --out before.json
+    python -m benchmarks.hot_paths --out after.json --compare before.json
+
+Each path runs in a fresh subprocess so model initialization time and peak
+RSS are its own. Fixture frames are the reference images in static/images
+(or --frames DIR); the clip is built from them unless --clip is given.
+Output is one JSON document: machine info plus, per path, frames/sec,
+p50/p95/p99 per-frame latency in ms, peak RSS in MB and model init time.
+
+Paths:
+    compare_pose   a live stream as served: LocalInference.landmarks (per-user tracking
+                   session, region-of-interest decode) + scoring against all templates
+    match          PoseMatcher.score alone on recorded landmarks
+    test_loops     rep/jump state machines (update + overlay) per frame
+    process_video  decode -> tracking inference -> score -> draw -> encode pipeline
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+PATHS = ('compare_pose', 'match', 'test_loops', 'process_video')
+TEMPLATE_DIR = os.path.join('static', 'ideal_poses')
+# Webcam frame size for the live stream.
+LIVE_SIZE = (1280, 720)
+
+
+def percentiles(samples_sec):
+    ms = np.asarray(samples_sec) * 1000
+    if not len(ms):
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3)}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def load_frames(directory, size=(640, 480)):
+    import cv2
+    frames = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.png')) + glob.glob(os.path.join(directory, '*.jpg'))):
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is not None:
+            frames.append(cv2.resize(image, size, interpolation=cv2.INTER_AREA))
+    if not frames:
+        raise SystemExit(f"No fixture frames in {directory}")
+    return frames
+
+
+def clip_frames(frames, seconds, fps=30):
+    """Cycle through the fixture frames, a second each, with a slow pan so tracking has work to do."""
+    import cv2
+    h, w = frames[0].shape[:2]
+    for i in range(int(seconds * fps)):
+        shift = np.float32([[1, 0, 20 * np.sin(i / 15)], [0, 1, 0]])
+        yield cv2.warpAffine(frames[(i // fps) % len(frames)], shift, (w, h))
+
+
+def build_clip(frames, path, seconds, fps=30):
+    import cv2
+    h, w = frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+    for frame in clip_frames(frames, seconds, fps):
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def registry():
+    from pose_registry import PoseRegistry, TEMPLATE_PACK, load_pack
+    keys = {os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(TEMPLATE_DIR, '*.npy'))
+            if os.path.basename(p) != TEMPLATE_PACK}
+    pack_path = os.path.join(TEMPLATE_DIR, TEMPLATE_PACK)
+    pack = load_pack(pack_path) if os.path.exists(pack_path) else None
+    if pack is not None:
+        keys.update(str(key) for key in pack['key'])
+    keys = sorted(keys)
+    return PoseRegistry([{'key': k, 'name': k, 'image': f'/static/images/{k}.png'} for k in keys], TEMPLATE_DIR)
+
+
+def synthetic_landmarks(n, seed=0):
+    """(n, 33, 4) landmarks of a body bobbing up and down, for the state machines."""
+    rng = np.random.default_rng(seed)
+    base = np.column_stack([rng.uniform(0.3, 0.7, 33), rng.uniform(0.2, 0.9, 33),
+                            np.zeros(33), np.ones(33)]).astype(np.float32)
+    bob = (0.1 * np.sin(np.arange(n) / 10)).astype(np.float32)
+    kps = np.repeat(base[None], n, axis=0)
+    kps[:, :, 1] += bob[:, None]
+    return kps
+
+
+def run_compare_pose(args):
+    import cv2
+    from live_pose import LocalInference
+    from pose_matching import AUTO_POSE, score_keypoints
+    stream = [cv2.imencode('.jpg', f)[1].tobytes()
+              for f in clip_frames(load_frames(args.frames, LIVE_SIZE), args.seconds)]
+    live_id = 'benchmark'
+    t0 = time.perf_counter()
+    engine = LocalInference(pool_size=1, max_sessions=1, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    engine.landmarks(stream[0], live_id)  # build the tracking graph now so init is not counted as frame latency
+    init = time.perf_counter() - t0
+    matcher = registry().matcher()
+    samples = []
+    for i in range(args.warmup + args.iterations):
+        t0 = time.perf_counter()
+        kps, aspect = engine.landmarks(stream[i % len(stream)], live_id)
+        score_keypoints(kps, AUTO_POSE, matcher, aspect)
+        if i >= args.warmup:
+            samples.append(time.perf_counter() - t0)
+    roi = engine.sessions.get(live_id).region.stats()
+    engine.close()
+    return samples, init, {'frame_size': list(LIVE_SIZE), 'roi': roi}
+
+
+def run_match(args):
+    import cv2
+    import mediapipe as mp
+    from landmarks import landmarks_to_array
+    t0 = time.perf_counter()
+    pose = mp.solutions.pose.Pose(static_image_mode=True)
+    init = time.perf_counter() - t0
+    recorded = [landmarks_to_array(pose.process(cv2.cvtColor(f, cv2.COLOR_BGR2RGB)).pose_landmarks)
+                for f in load_frames(args.frames)]
+    pose.close()
+    recorded = [kps for kps in recorded if kps is not None] or list(synthetic_landmarks(4))
+    matcher = registry().matcher()
+    samples = []
+    for i in range(args.warmup + args.iterations * 10):
+        t0 = time.perf_counter()
+        matcher.score(recorded[i % len(recorded)])
+        if i >= args.warmup:
+            samples.append(time.perf_counter() - t0)
+    return samples, init, {'templates': len(matcher)}
+
+
+def run_test_loops(args):
+    from eval_engine import TESTS
+    from landmarks import joint_angles
+    kps = synthetic_landmarks(args.iterations * 10)
+    angles = joint_angles(kps)
+    shape = (480, 640, 3)
+    samples, per_test = [], {}
+    for name, cls in TESTS.items():
+        if not cls.uses_pose:
+            continue
+        test = cls()
+        t_start = time.perf_counter()
+        for row, angle in zip(kps, angles):
+            t0 = time.perf_counter()
+            test.update(row, angle, shape)
+            test.overlay()
+            samples.append(time.perf_counter() - t0)
+        per_test[name] = round(len(kps) / (time.perf_counter() - t_start), 1)
+    return samples, 0.0, {'fps_per_test': per_test}
+
+
+class _TimedWriter:
+    """Wraps a video writer and records the interval between frames leaving the pipeline."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.stamps = []
+
+    def isOpened(self):
+        return self.writer.isOpened()
+
+    def write(self, frame):
+        self.writer.write(frame)
+        self.stamps.append(time.perf_counter())
+
+    def release(self):
+        return self.writer.release()
+
+
+def run_process_video(args):
+    import cv2
+    from eval_engine import TESTS, VIDEO_POSE_POOL, FrameSampler, run_pipeline
+    from video_io import open_video_writer
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = args.clip or build_clip(load_frames(args.frames), os.path.join(tmp, 'clip.mp4'), args.seconds)
+        t0 = time.perf_counter()
+        with VIDEO_POSE_POOL.checkout():
+            pass
+        init = time.perf_counter() - t0
+        samples, runs = [], []
+        for _ in range(args.repeat):
+            cap = cv2.VideoCapture(clip)
+            size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            writer, _ = open_video_writer(os.path.join(tmp, 'out.mp4'), cap.get(cv2.CAP_PROP_FPS) or 30, size)
+            out = _TimedWriter(writer)
+            try:
+                with VIDEO_POSE_POOL.checkout() as pose:
+                    pose.reset()
+                    start = time.perf_counter()
+                    _, timings, _ = run_pipeline(cap, out, pose, TESTS[args.test](), sampler=FrameSampler())
+            finally:
+                cap.release()
+                out.release()
+            samples.extend(np.diff([start] + out.stamps))
+            runs.append(timings)
+    VIDEO_POSE_POOL.close()
+    return samples, init, {'test': args.test, 'runs': runs}
+
+
+RUNNERS = {
+    'compare_pose': run_compare_pose,
+    'match': run_match,
+    'test_loops': run_test_loops,
+    'process_video': run_process_video,
+}
+
+
+def run_one(args):
+    """Child process: benchmark one path and print its JSON result."""
+    t0 = time.perf_counter()
+    samples, init, extra = RUNNERS[args.run](args)
+    total = sum(samples)
+    result = {
+        'path': args.run,
+        'frames': len(samples),
+        'fps': round(len(samples) / total, 2) if total > 0 else None,
+        **percentiles(samples),
+        'model_init_sec': round(init, 3),
+        'peak_rss_mb': peak_rss_mb(),
+        'elapsed_sec': round(time.perf_counter() - t0, 3),
+        **extra,
+    }
+    print(json.dumps(result))
+
+
+def machine_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(current, baseline):
+    """Per path: ratio of current to baseline for the headline numbers (>1 means larger now)."""
+    old = {r['path']: r for r in baseline['results']}
+    report = {}
+    for r in current['results']:
+        prev = old.get(r['path'])
+        if prev is None:
+            continue
+        report[r['path']] = {k: round(r[k] / prev[k], 3)
+                             for k in ('fps', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mb', 'model_init_sec')
+                             if r.get(k) and prev.get(k)}
+    return report
+
+
+def child_args(args, path):
+    argv = [sys.executable, '-m', 'benchmarks.hot_paths', '--run', path,
+            '--iterations', str(args.iterations), '--warmup', str(args.warmup),
+            '--frames', args.frames, '--seconds', str(args.seconds),
+            '--repeat', str(args.repeat), '--test', args.test]
+    if args.clip:
+        argv += ['--clip', args.clip]
+    return argv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--paths', nargs='+', choices=PATHS, default=list(PATHS))
+    parser.add_argument('--iterations', type=int, default=200, help='timed frames per path')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--frames', default=os.path.join('static', 'images'), help='directory of fixture images')
+    parser.add_argument('--clip', help='recorded clip for process_video (default: built from the fixture frames)')
+    parser.add_argument('--seconds', type=float, default=10, help='length of the generated clip')
+    parser.add_argument('--repeat', type=int, default=2, help='process_video runs')
+    parser.add_argument('--test', default='squats')
+    parser.add_argument('--out', help='write the JSON report here as well as to stdout')
+    parser.add_argument('--compare', help='earlier report to compare against')
+    parser.add_argument('--run', choices=PATHS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args)
+        return
+
+    report = {'machine': machine_info(), 'results': []}
+    for path in args.paths:
+        print(f"Benchmarking {path}...", file=sys.stderr)
+        proc = subprocess.run(child_args(args, path), capture_output=True, text=True)
+        lines = proc.stdout.strip().splitlines()
+        if proc.returncode != 0 or not lines:
+            report['results'].append({'path': path, 'error': proc.stderr.strip()[-2000:]})
+            continue
+        report['results'].append(json.loads(lines[-1]))
+    if args.compare:
+        with open(args.compare) as f:
+            report['compare'] = compare(report, json.load(f))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+"""
+Load test against a running app: concurrent live-yoga users plus video uploads.
+
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --users 1,2,4,8 \\
+        --fps 10 --uploaders 2 --duration 30 --server-pid $(pgrep -of gunicorn) \\
+        --label 2cpu-4workers --out capacity-2cpu.json --user loadtest --password ...
+
+Every simulated user logs in and streams fixture frames (the
+reference images in static/images, or --frames DIR) to /compare_pose at
+--fps, with at most one frame in flight like the browser. Uploaders
+repeatedly post a clip (--clip, or one built from the fixture frames) to
+/physical_test and follow the job until it finishes. Each --users value is
+one step of --duration seconds; the report holds one result per step, so a
+run per deployment size gives its capacity curve.
+
+With --user/--password every simulated client logs in to that existing
+account (each still gets its own cookie session, so its own live session).
+Without them each client signs up a new load-* account, which stays in
+users.db; use that only against a throwaway database.
+
+Per step: live frames/sec overall and per user, latency p50/p95/p99, the
+share of busy (503), timed-out (503 while the previous frame was still
+running), superseded, failed and slow frames, upload and job
+turnaround latency, and CPU and RSS of --server-pid and its children (read
+from /proc). A step is `sustained` when users got at least 90% of --fps
+with a p95 under --slo-ms and under 1% errors.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+from benchmarks.hot_paths import build_clip, load_frames, machine_info, percentiles
+
+CLK_TCK = os.sysconf('SC_CLK_TCK')
+
+
+class Session:
+    """A logged-in browser: cookie jar plus small JSON/multipart helpers."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()))
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, body bytes, final url); HTTP errors are returned, not raised."""
+        req = Request(self.base_url + path, data=body, headers=headers or {}, method=method)
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read(), resp.geturl()
+        except HTTPError as e:
+            return e.code, e.read(), e.geturl()
+
+    def json(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        return self.request(method, path, body, {'Content-Type': 'application/json'} if body else {})
+
+    def multipart(self, path, field, filename, data, content_type):
+        boundary = uuid.uuid4().hex
+        body = b''.join([
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode(), data, f'\r\n--{boundary}--\r\n'.encode()])
+        return self.request('POST', path, body, {'Content-Type': f'multipart/form-data; boundary={boundary}'})
+
+    def login(self, user=None, password=None, retries=20):
+        """
+        Log in as `user`, or sign up a throwaway account first if None;
+        bcrypt may answer 503 under load, so retry.
+        """
+        if user is None:
+            creds = {'username': f"load-{uuid.uuid4().hex[:10]}", 'password': uuid.uuid4().hex}
+            paths = ('/signup', '/login')
+        else:
+            creds = {'username': user, 'password': password}
+            paths = ('/login',)
+        for path in paths:
+            for attempt in range(retries):
+                status, _, _ = self.json('POST', path, creds)
+                if status != 503:
+                    break
+                time.sleep(0.2 * (attempt + 1))
+            if status != 200:
+                raise RuntimeError(f"{path} answered {status}")
+
+
+class Recorder:
+    """Thread-safe latency samples and outcome counts for one kind of request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.outcomes = {}
+
+    def add(self, outcome, latency=None):
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def summary(self, seconds):
+        with self._lock:
+            total = sum(self.outcomes.values())
+            return {'requests': total, 'per_sec': round(total / seconds, 2), **percentiles(self.latencies),
+                    'outcomes': dict(self.outcomes)}
+
+
+def logged_in(args, session, rec, ready, go):
+    """Log in, then wait for the step to start; False if login failed."""
+    try:
+        session.login(args.user, args.password)
+    except (RuntimeError, URLError, OSError) as e:
+        rec.add('login_failed')
+        print(f"Could not log in: {e}", file=sys.stderr)
+        return False
+    finally:
+        ready.release()
+    go.wait()
+    return True
+
+
+def live_user(args, frames, ready, go, stop, rec):
+    session = Session(args.url, args.timeout)
+    if not logged_in(args, session, rec, ready, go):
+        return
+    interval = 1.0 / args.fps
+    i = 0
+    # Spread users over the first frame interval so they don't send in lockstep.
+    stop.wait(random.random() * interval)
+    next_send = time.monotonic()
+    while not stop.is_set():
+        t0 = time.monotonic()
+        try:
+            status, body, _ = session.multipart(f'/compare_pose/{args.pose}', 'frame', 'frame.jpg',
+                                                frames[i % len(frames)], 'image/jpeg')
+            latency = time.monotonic() - t0
+            if status == 503:
+                rec.add('timeout' if b'"timed_out"' in body else 'busy', latency)
+            elif status != 200:
+                rec.add(f'http_{status}', latency)
+            else:
+                reply = json.loads(body)
+                if reply.get('superseded'):
+                    rec.add('superseded', latency)
+                elif str(reply.get('feedback', '')).startswith('Error'):
+                    rec.add('error', latency)
+                else:
+                    rec.add('ok' if latency <= args.slo_ms / 1000 else 'slow', latency)
+        except (URLError, OSError, ValueError):
+            rec.add('failed')
+        i += 1
+        # Fixed rate, but never more than one frame in flight.
+        next_send = max(next_send + interval, time.monotonic())
+        stop.wait(max(0.0, next_send - time.monotonic()))
+
+
+def uploader(args, clip, ready, go, stop, uploads, jobs):
+    session = Session(args.url, args.upload_timeout)
+    if not logged_in(args, session, uploads, ready, go):
+        return
+    while not stop.is_set():
+        t0 = time.monotonic()
+        try:
+            status, _, url = session.multipart(f'/physical_test/{args.test}', 'video', 'clip.mp4', clip, 'video/mp4')
+        except (URLError, OSError):
+            uploads.add('failed')
+            stop.wait(1.0)
+            continue
+        uploads.add('ok' if status == 200 and '/physical_result/' in url else f'http_{status}',
+                    time.monotonic() - t0)
+        if '/physical_result/' not in url:
+            stop.wait(1.0)
+            continue
+        job_id = url.rsplit('/', 1)[1]
+        # Jobs are followed to the end even after the step stops, so turnaround isn't cut short.
+        deadline = time.monotonic() + args.upload_timeout
+        outcome = 'timeout'
+        while time.monotonic() < deadline:
+            try:
+                status, body, _ = session.request('GET', f'/api/jobs/{job_id}')
+                state = json.loads(body).get('status') if status == 200 else None
+            except (URLError, OSError, ValueError):
+                state = None
+            if state in ('done', 'failed'):
+                outcome = state
+                break
+            time.sleep(1.0)
+        jobs.add(outcome, time.monotonic() - t0)
+        stop.wait(args.upload_interval)
+
+
+def process_tree(root):
+    """PIDs of `root` and all its descendants."""
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    pids, todo = [], [root]
+    while todo:
+        pid = todo.pop()
+        pids.append(pid)
+        todo.extend(children.get(pid, []))
+    return pids
+
+
+def tree_usage(root):
+    """(CPU seconds, RSS bytes) summed over the process tree."""
+    cpu = rss = 0
+    page = os.sysconf('SC_PAGE_SIZE')
+    for pid in process_tree(root):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / CLK_TCK   # utime, stime
+            rss += int(fields[21]) * page
+        except (OSError, ValueError, IndexError):
+            continue
+    return cpu, rss
+
+
+class ResourceSampler(threading.Thread):
+    """Samples CPU and RSS of the server's process tree once a second."""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.stop = threading.Event()
+        self.samples = []   # (monotonic time, cpu seconds, rss bytes)
+
+    def run(self):
+        while not self.stop.is_set():
+            self.samples.append((time.monotonic(), *tree_usage(self.pid)))
+            self.stop.wait(1.0)
+
+    def summary(self):
+        if len(self.samples) < 2:
+            return None
+        (t0, cpu0, _), (t1, cpu1, _) = self.samples[0], self.samples[-1]
+        peaks = [(b[1] - a[1]) / (b[0] - a[0]) for a, b in zip(self.samples, self.samples[1:]) if b[0] > a[0]]
+        return {'cpu_percent_avg': round(100 * (cpu1 - cpu0) / (t1 - t0), 1),
+                'cpu_percent_peak': round(100 * max(peaks), 1) if peaks else None,
+                'rss_mb_peak': round(max(s[2] for s in self.samples) / 2**20, 1),
+                'processes': len(process_tree(self.pid))}
+
+
+def run_step(args, users, frames, clip):
+    ready, go, stop = threading.Semaphore(0), threading.Event(), threading.Event()
+    live, uploads, jobs = Recorder(), Recorder(), Recorder()
+    threads = [threading.Thread(target=live_user, args=(args, frames, ready, go, stop, live), daemon=True)
+               for _ in range(users)]
+    threads += [threading.Thread(target=uploader, args=(args, clip, ready, go, stop, uploads, jobs), daemon=True)
+                for _ in range(args.uploaders)]
+    sampler = ResourceSampler(args.server_pid) if args.server_pid else None
+    for t in threads:
+        t.start()
+    # Accounts are created before the clock starts; bcrypt is not what's being measured.
+    for _ in threads:
+        ready.acquire(timeout=args.timeout * 4)
+    go.set()
+    started = time.monotonic()
+    if sampler:
+        sampler.start()
+    stop.wait(args.duration)
+    stop.set()
+    elapsed = time.monotonic() - started
+    for t in threads:
+        t.join(timeout=args.upload_timeout)
+    if sampler:
+        sampler.stop.set()
+        sampler.join()
+
+    live_summary = live.summary(elapsed)
+    outcomes = live_summary['outcomes']
+    total = max(live_summary['requests'], 1)
+    errors = sum(n for k, n in outcomes.items() if k not in ('ok', 'slow', 'superseded', 'busy', 'timeout'))
+    answered = outcomes.get('ok', 0) + outcomes.get('slow', 0)
+    fps_per_user = answered / elapsed / users if users else 0.0
+    live_summary.update({
+        'fps_per_user': round(fps_per_user, 2),
+        'busy_rate': round(outcomes.get('busy', 0) / total, 4),
+        'timeout_rate': round(outcomes.get('timeout', 0) / total, 4),
+        'superseded_rate': round(outcomes.get('superseded', 0) / total, 4),
+        'error_rate': round(errors / total, 4),
+    })
+    sustained = (users > 0 and fps_per_user >= 0.9 * args.fps and live_summary['p95_ms'] is not None
+                 and live_summary['p95_ms'] <= args.slo_ms and errors / total < 0.01)
+    return {
+        'users': users,
+        'uploaders': args.uploaders,
+        'target_fps': args.fps,
+        'sustained': sustained,
+        'live': live_summary,
+        'uploads': uploads.summary(elapsed),
+        'jobs': jobs.summary(elapsed),
+        'server': sampler.summary() if sampler else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--users', default='1,2,4,8', help='comma-separated live user counts, one step each')
+    parser.add_argument('--fps', type=float, default=10.0, help='frames per second each live user sends')
+    parser.add_argument('--pose', default='auto')
+    parser.add_argument('--uploaders', type=int, default=0, help='concurrent video uploaders in every step')
+    parser.add_argument('--upload-interval', type=float, default=5.0, help='seconds between an uploader\'s jobs')
+    parser.add_argument('--test', default='squats')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per step')
+    parser.add_argument('--slo-ms', type=float, default=250.0, help='live frame latency target (p95)')
+    parser.add_argument('--user', help='existing account every simulated client logs in to '
+                                       '(default: sign up a new account per client)')
+    parser.add_argument('--password', help='password of --user')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--upload-timeout', type=float, default=300.0)
+    parser.add_argument('--frames', default=os.path.join('static', 'images'), help='directory of fixture images')
+    parser.add_argument('--clip', help='fixture clip to upload (default: built from the fixture frames)')
+    parser.add_argument('--server-pid', type=int, help='app process whose tree (workers, job and inference '
+                                                       'processes) is sampled for CPU and RSS')
+    parser.add_argument('--label', help='deployment name stored with the report, e.g. 2cpu-4workers')
+    parser.add_argument('--out', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+    if args.user is not None and args.password is None:
+        parser.error('--user needs --password')
+    if args.user is None:
+        print("No --user given: every client signs up a new account that is not deleted afterwards.",
+              file=sys.stderr)
+
+    import cv2
+    fixtures = load_frames(args.frames)
+    frames = [cv2.imencode('.jpg', f, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes() for f in fixtures]
+    clip = b''
+    if args.uploaders:
+        if args.clip:
+            with open(args.clip, 'rb') as f:
+                clip = f.read()
+        else:
+            with tempfile.TemporaryDirectory() as tmp:
+                with open(build_clip(fixtures, os.path.join(tmp, 'clip.mp4'), 10), 'rb') as f:
+                    clip = f.read()
+
+    report = {'machine': machine_info(), 'label': args.label, 'url': args.url, 'steps': []}
+    for users in [int(n) for n in args.users.split(',') if n.strip()]:
+        print(f"Step: {users} live users, {args.uploaders} uploaders, {args.duration:.0f}s...", file=sys.stderr)
+        step = run_step(args, users, frames, clip)
+        report['steps'].append(step)
+        print(f"  {step['live']['fps_per_user']} fps/user, p95 {step['live']['p95_ms']}ms, "
+              f"errors {step['live']['error_rate']:.1%}, sustained={step['sustained']}", file=sys.stderr)
+    sustained = [s['users'] for s in report['steps'] if s['sustained']]
+    report['max_sustained_users'] = max(sustained) if sustained else 0
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Web worker startup cost with the vision stack lazy vs preloaded.
+
+    python -m benchmarks.startup --repeat 5
+
+Imports app.py in fresh subprocesses with VISION_PRELOAD=0
+and =1 and prints one JSON object per mode with the median import time, the
+RSS once imported and which of cv2/mediapipe/numpy got loaded, as reported
+by startup.STARTUP.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = "import json, app; print(json.dumps(app.STARTUP.as_dict()))"
+
+
+def run(preload):
+    env = dict(os.environ, VISION_PRELOAD='1' if preload else '0')
+    proc = subprocess.run([sys.executable, '-c', CHILD], env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip()[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    for preload in (False, True):
+        reports = [run(preload) for _ in range(args.repeat)]
+        print(json.dumps({
+            'vision_preload': preload,
+            'import_ms': statistics.median(sum(p['ms'] for p in r['phases']) for r in reports),
+            'rss_mb': statistics.median(r['rss_mb'] for r in reports),
+            'vision_loaded': reports[-1]['vision_loaded'],
+        }))
+
+
+if __name__ == "__main__":
+    main()
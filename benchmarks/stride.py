@@ -0,0 +1,65 @@
+"""
+Accuracy/throughput trade-off of sampled evaluation (FrameSampler).
+
+    python -m benchmarks.stride path/to/clip.mp4 --test squats
+
+Runs the test at full rate first, then with each sampling configuration,
+and prints one JSON object per run with fps, inference time, the number of
+frames actually inferred and how far the counts drift from full rate.
+"""
+import argparse
+import json
+
+from eval_engine import evaluate, FrameSampler, VIDEO_POSE_POOL
+
+# (label, FrameSampler kwargs)
+CONFIGS = [
+    ('full', dict(stride=1)),
+    ('stride2', dict(stride=2)),
+    ('stride3', dict(stride=3)),
+    ('stride4', dict(stride=4)),
+    ('side640', dict(stride=1, max_side=640)),
+    ('stride2_side480', dict(stride=2, max_side=480)),
+    ('auto_side480', dict(stride=2, max_side=480, adaptive=True)),
+]
+
+
+def count_metrics(metrics):
+    return {k: v for k, v in metrics.items() if isinstance(v, int)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('video')
+    parser.add_argument('--test', default='squats')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per configuration; the fastest is kept')
+    args = parser.parse_args()
+
+    baseline = None
+    try:
+        for label, kwargs in CONFIGS:
+            best = None
+            for _ in range(args.repeat):
+                res = evaluate(args.test, args.video, sampler=FrameSampler(**kwargs), use_cache=False)
+                if best is None or res.timings['wall_sec'] < best.timings['wall_sec']:
+                    best = res
+            counts = count_metrics(best.metrics)
+            if baseline is None:
+                baseline = best
+            base_counts = count_metrics(baseline.metrics)
+            print(json.dumps({
+                'config': label,
+                'fps': best.timings['fps'],
+                'speedup': round(baseline.timings['wall_sec'] / best.timings['wall_sec'], 2),
+                'infer_sec': best.timings['infer_sec'],
+                'inferred_frames': best.timings['inferred_frames'],
+                'frames': best.frames,
+                'counts': counts,
+                'count_error': {k: counts.get(k, 0) - base_counts[k] for k in base_counts},
+            }))
+    finally:
+        VIDEO_POSE_POOL.close()
+
+
+if __name__ == '__main__':
+    main()
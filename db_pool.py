@@ -0,0 +1,103 @@
+"""
+Reusable SQLite connections for the user store.
+
+Connections are checked out of a per-process pool and returned after each
+statement, so their statement caches are reused across requests instead of
+re-preparing every query (a forked gunicorn worker starts its own pool
+rather than sharing the parent's handles). The database runs in WAL mode:
+readers never block the writer and vice versa, so a login burst across
+several workers doesn't serialize on the file lock. Connections are in
+autocommit mode; a single statement is its own transaction and read-only
+queries never take a write lock or commit.
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# How long one statement may wait on a locked database before giving up.
+BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', 5.0))
+CACHED_STATEMENTS = 256
+# Idle connections kept per process; more are opened under load and closed afterwards.
+MAX_IDLE = int(os.environ.get('DB_POOL_SIZE', 8))
+
+
+class SQLitePool:
+    """Bounded set of idle connections to one database file, shared by this process's threads."""
+
+    def __init__(self, path, busy_timeout=BUSY_TIMEOUT, max_idle=MAX_IDLE,
+                 cached_statements=CACHED_STATEMENTS):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+        self._wal = False
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False, cached_statements=self.cached_statements)
+        if not self._wal:
+            # journal_mode is persistent in the file, so setting it once is enough.
+            # Done on first use rather than construction, so a pool can be built at import.
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._wal = True
+        # NORMAL is durable across application crashes in WAL mode, only an OS
+        # crash can lose the last commits; it saves an fsync per write.
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the block."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: the inherited handles belong to the parent.
+                self._idle = []
+                self._pid = os.getpid()
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if len(self._idle) < self.max_idle and self._pid == os.getpid():
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def execute(self, query, args=(), one=False):
+        """Run one statement; returns all rows, or the first row (or None) with one=True."""
+        deadline = time.monotonic() + self.busy_timeout
+        delay = 0.01
+        with self.connection() as conn:
+            while True:
+                try:
+                    rows = conn.execute(query, args).fetchall()
+                    break
+                except sqlite3.OperationalError as e:
+                    # busy_timeout already waited; retry with jittered backoff for
+                    # the cases SQLite reports without waiting (e.g. WAL recovery).
+                    if 'locked' not in str(e) and 'busy' not in str(e) or time.monotonic() > deadline:
+                        raise
+                    time.sleep(delay * (1 + random.random()))
+                    delay = min(delay * 2, 0.2)
+        return (rows[0] if rows else None) if one else rows
+
+    def close(self):
+        """Close the idle connections; ones checked out are closed when returned."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.max_idle = 0
+        for conn in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
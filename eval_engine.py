@@ -0,0 +1,738 @@
+"""
+Physical test evaluation engine.
+
+evaluate(test_type, video_path) runs one of TESTS over a video, writes the
+annotated copy to EVAL_FOLDER and returns an EvalResult. Importing this
+module loads MediaPipe, so long-lived workers pay that cost once.
+"""
+import os
+import cv2
+import multiprocessing
+import mediapipe as mp
+import numpy as np
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pose_pool import PosePool
+from landmark_cache import default_cache
+from video_io import open_video_writer
+from landmarks import (landmarks_to_array, joint_angles, interpolate, LandmarkBuffer, JOINT_INDEX, NUM_LANDMARKS,
+                       LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_WRIST, RIGHT_WRIST, LEFT_HIP)
+
+EVAL_FOLDER = os.path.join("static", "evaluated_videos")
+os.makedirs(EVAL_FOLDER, exist_ok=True)
+
+mp_pose = mp.solutions.pose
+# One tracking-mode graph per evaluator process; videos are processed one at a time.
+VIDEO_POSE_POOL = PosePool(
+    size=1,
+    min_detection_confidence=0.5,
+    min_tracking_confidence=0.5
+)
+# Landmarks of videos evaluated before, by content hash (None if disabled).
+LANDMARK_CACHE = default_cache()
+
+# summary: human-readable report, metrics: per-test numbers,
+# video: annotated video path relative to static/ ('' if none),
+# web_ready: video is already H.264/faststart and needs no transcode,
+# timings: busy seconds per pipeline stage plus wall time and fps.
+EvalResult = namedtuple('EvalResult', 'test summary metrics video web_ready frames duration timings')
+
+
+class EvalError(Exception):
+    """The video could not be evaluated; the message is shown to the user."""
+
+
+class InexactSeek(Exception):
+    """A segment could not start exactly on its first frame; extract sequentially instead."""
+
+
+def draw_text(img, text, position, color=(36,255,12), font_scale=0.7, thickness=2, shadow=True):
+    x, y = position
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    if shadow:
+        cv2.putText(img, text, (x+2, y+2), font, font_scale, (0,0,0), thickness+2, cv2.LINE_AA)
+    cv2.putText(img, text, (x, y), font, font_scale, color, thickness, cv2.LINE_AA)
+
+def draw_pose(image, kps, min_visibility=0.5):
+    """Draw a (33, 4) landmark array the way mp_drawing.draw_landmarks does by default."""
+    h, w = image.shape[:2]
+    pts = np.round(kps[:, :2] * [w, h]).astype(int)
+    visible = kps[:, 3] >= min_visibility
+    for a, b in mp_pose.POSE_CONNECTIONS:
+        if visible[a] and visible[b]:
+            cv2.line(image, tuple(pts[a]), tuple(pts[b]), (224, 224, 224), 2)
+    for (x, y), vis in zip(pts, visible):
+        if vis:
+            cv2.circle(image, (x, y), 2, (0, 0, 255), 2)
+
+
+# --- Tests ---
+# Each test is a small state machine fed one frame at a time: its (33, 4)
+# landmark array (None when no pose was found) and the matching row of
+# landmarks.joint_angles(), computed for a whole window of frames at once.
+# overlay() returns the draw_text() calls for the current frame; result()
+# returns (summary, metrics) at the end.
+
+LEFT_KNEE_ANGLE = JOINT_INDEX['left_knee']
+LEFT_ELBOW_ANGLE = JOINT_INDEX['left_elbow']
+
+class SquatTest:
+    uses_pose = True
+
+    def __init__(self):
+        self.counter, self.stage, self.live_feedback = 0, None, "Start!"
+
+    def update(self, landmarks, angles, frame_shape):
+        if landmarks is None:
+            self.live_feedback = "Pose not detected"
+            return
+        angle = angles[LEFT_KNEE_ANGLE]
+        if angle > 160:
+            self.stage = 'up'
+            self.live_feedback = "Go Lower!"
+        if angle < 90 and self.stage == 'up':
+            self.stage = 'down'
+            self.counter += 1
+            self.live_feedback = "Nice rep!"
+
+    def overlay(self):
+        return [(f"Squat Counter: {self.counter}", (10, 35), (255, 70, 0), 0.8, 2),
+                (f"{self.live_feedback}", (10, 65), (72, 255, 120), 0.75, 2)]
+
+    def result(self):
+        return f"Squat Test Complete. Total Squats: {self.counter}", {'squats': self.counter}
+
+
+class PushupTest:
+    uses_pose = True
+
+    def __init__(self):
+        self.counter, self.stage, self.live_feedback = 0, None, "Start!"
+
+    def update(self, landmarks, angles, frame_shape):
+        if landmarks is None:
+            self.live_feedback = "Pose not detected"
+            return
+        elbow_angle = angles[LEFT_ELBOW_ANGLE]
+        hands_on_ground = ((landmarks[LEFT_WRIST, 1] > landmarks[LEFT_SHOULDER, 1])
+                           and (landmarks[RIGHT_WRIST, 1] > landmarks[RIGHT_SHOULDER, 1]))
+        if hands_on_ground:
+            if elbow_angle > 160:
+                self.stage = 'up'
+                self.live_feedback = "Go Deeper!"
+            if elbow_angle < 90 and self.stage == 'up':
+                self.stage = 'down'
+                self.counter += 1
+                self.live_feedback = "Good pushup!"
+
+    def overlay(self):
+        return [(f"Pushup Counter: {self.counter}", (10, 35), (255, 70, 0), 0.8, 2),
+                (f"{self.live_feedback}", (10, 65), (72, 255, 120), 0.75, 2)]
+
+    def result(self):
+        return f"Pushup Test Complete. Total Pushups: {self.counter}", {'pushups': self.counter}
+
+
+class JumpTest:
+    uses_pose = True
+    real_hip_height_cm = 100
+
+    def __init__(self):
+        self.baseline_hip_y, self.prev_hip_y = None, None
+        self.pixels_per_cm = 1
+        self.jump_started, self.max_jump_height_px, self.jump_count = False, 0, 0
+        self.jump_heights_cm = []
+        self.live_feedback, self.output = "Start!", ""
+
+    def update(self, landmarks, angles, frame_shape):
+        if landmarks is None:
+            self.live_feedback = "Pose not detected"
+            return
+        hip_y_px = int(landmarks[LEFT_HIP, 1] * frame_shape[0])
+        if self.baseline_hip_y is None:
+            self.baseline_hip_y = hip_y_px
+            pixels_hip_height = frame_shape[0] - self.baseline_hip_y
+            self.pixels_per_cm = pixels_hip_height / self.real_hip_height_cm if pixels_hip_height else 1
+        if self.prev_hip_y is not None:
+            rise = self.baseline_hip_y - hip_y_px
+            if not self.jump_started and rise > 30:
+                self.jump_started = True
+                self.max_jump_height_px = rise
+                self.live_feedback = "Jump started!"
+            if self.jump_started and rise > self.max_jump_height_px:
+                self.max_jump_height_px = rise
+            if self.jump_started and (hip_y_px >= self.baseline_hip_y - 10):
+                self.jump_started = False
+                self.jump_count += 1
+                jump_height_cm = self.max_jump_height_px / self.pixels_per_cm
+                self.jump_heights_cm.append(round(jump_height_cm, 2))
+                self.live_feedback = f"Jump {self.jump_count}: {jump_height_cm:.2f} cm"
+                self.output += self.live_feedback + "\n"
+        self.prev_hip_y = hip_y_px
+
+    def overlay(self):
+        return [(f"Jump Counter: {self.jump_count}", (10, 35), (255, 70, 0), 0.8, 2),
+                (f"{self.live_feedback}", (10, 65), (72, 255, 120), 0.75, 2)]
+
+    def result(self):
+        output = self.output + f"Jump Test Complete. Total jumps: {self.jump_count}"
+        return output, {'jumps': self.jump_count, 'jump_heights_cm': self.jump_heights_cm}
+
+
+class HexagonTest:
+    uses_pose = False
+
+    def update(self, landmarks, angles, frame_shape):
+        pass
+
+    def overlay(self):
+        return [("Hexagon Test evaluation not implemented.", (10, 35), (200, 90, 200), 0.8, 2)]
+
+    def result(self):
+        return "Hexagon Test evaluation not implemented yet.\n", {}
+
+
+TESTS = {
+    'squats': SquatTest,
+    'pushups': PushupTest,
+    'jumps': JumpTest,
+    'hexagon': HexagonTest,
+}
+
+
+# --- Pipeline ---
+# decode thread -> [frames queue] -> inference (calling thread) -> [annotate queue] -> encode thread
+# Single consumers on FIFO queues keep frame order; the bounded queues cap memory
+# and let decode and encode overlap with inference on multi-core machines.
+
+PIPELINE_QUEUE_SIZE = 8
+_END = object()
+# Frames scored per batch when landmarks were extracted beforehand.
+LANDMARK_WINDOW = 64
+# Parallel extraction: frames decoded before a segment's start so tracking has
+# locked on, shortest segment worth a process, and the share of progress
+# reported for extraction (the rest is the render pass).
+SEGMENT_WARMUP = 30
+MIN_SEGMENT_FRAMES = 300
+EXTRACT_SHARE = 0.7
+# Seconds between progress calls while segments run, so a job's heartbeat
+# and deadline keep working during a segment that takes minutes.
+PROGRESS_TICK = 2.0
+# Only these containers are split into segments: their frame count comes
+# from a per-frame index. WebM, which browsers record, only stores a
+# duration, so its count is an estimate and seeking may snap to keyframes.
+INDEXED_CONTAINERS = ('.mp4', '.mov', '.m4v', '.avi')
+
+
+class FrameSampler:
+    """
+    Chooses which frames run pose inference and at what resolution.
+
+    Only every `stride`-th frame is inferred, downscaled so its longer side
+    is at most `max_side`. Frames in between get landmarks interpolated from
+    the inferred frames on either side, so the rep state machines and the
+    overlay still see every frame. With adaptive=True the stride halves when
+    the body moves fast between inferred frames and creeps back up, to
+    `max_stride`, while it moves slowly. The default samples every frame at
+    full resolution, as before.
+    """
+
+    def __init__(self, stride=1, max_side=None, adaptive=False, max_stride=4,
+                 fast_motion=0.02, slow_motion=0.006):
+        self.stride = max(1, stride)
+        self.max_side = max_side
+        self.adaptive = adaptive
+        self.max_stride = max(self.stride, max_stride)
+        # Largest per-frame landmark displacement, in normalized image units.
+        self.fast_motion = fast_motion
+        self.slow_motion = slow_motion
+
+    @classmethod
+    def from_env(cls):
+        """EVAL_STRIDE (an integer or 'auto') and EVAL_MAX_SIDE (pixels)."""
+        stride = os.environ.get('EVAL_STRIDE', '1')
+        max_side = int(os.environ['EVAL_MAX_SIDE']) if os.environ.get('EVAL_MAX_SIDE') else None
+        if stride == 'auto':
+            return cls(stride=2, max_side=max_side, adaptive=True)
+        return cls(stride=int(stride), max_side=max_side)
+
+    def cache_variant(self):
+        """Tag for the landmark cache: videos sampled differently get different landmarks."""
+        tag = 'auto' if self.adaptive else f"s{self.stride}"
+        return f"{tag}-m{self.max_side}" if self.max_side else tag
+
+    def prepare(self, frame):
+        """BGR frame -> RGB image to run inference on."""
+        h, w = frame.shape[:2]
+        if self.max_side and max(h, w) > self.max_side:
+            scale = self.max_side / max(h, w)
+            frame = cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def adapt(self, prev, cur, gap):
+        if not self.adaptive or prev is None or cur is None:
+            return
+        visible = (prev[:, 3] > 0.5) & (cur[:, 3] > 0.5)
+        if not visible.any():
+            return
+        motion = np.max(np.abs(cur[visible, :2] - prev[visible, :2])) / gap
+        if motion > self.fast_motion:
+            self.stride = max(1, self.stride // 2)
+        elif motion < self.slow_motion:
+            self.stride = min(self.max_stride, self.stride + 1)
+
+
+class _Stage(threading.Thread):
+    """Worker thread that remembers its exception and busy time; a failure stops the pipeline."""
+
+    def __init__(self, name, target, stop):
+        super().__init__(name=name, daemon=True)
+        self._target_fn = target
+        self._stop_event = stop
+        self.error = None
+        self.busy = 0.0
+
+    def run(self):
+        try:
+            self._target_fn(self)
+        except BaseException as e:
+            self.error = e
+            self._stop_event.set()
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _END
+
+
+class LandmarkStream:
+    """
+    Runs frames through `pose` as chosen by `sampler` and appends one
+    landmark row per frame to `buffer`. push() returns how many frames it
+    finalized (0 while a frame waits for the next inferred one to be
+    interpolated against); flush() finalizes the rest.
+    """
+
+    def __init__(self, pose, sampler, buffer):
+        self.pose = pose
+        self.sampler = sampler
+        self.buffer = buffer
+        self.frames = 0
+        self.inferred = 0
+        self.infer_sec = 0.0
+        self._next_key = 0
+        self._pending = 0   # frames waiting for the next inferred frame
+        self._prev = None   # landmarks of the last inferred frame
+
+    def push(self, frame):
+        index = self.frames
+        self.frames += 1
+        if index != self._next_key:
+            self._pending += 1
+            return 0
+        t0 = time.perf_counter()
+        image_rgb = self.sampler.prepare(frame)
+        image_rgb.flags.writeable = False
+        kps = landmarks_to_array(self.pose.process(image_rgb).pose_landmarks)
+        self.infer_sec += time.perf_counter() - t0
+        self.inferred += 1
+        done = self._pending + 1
+        if self._pending:
+            self.buffer.extend(interpolate(self._prev, kps, self._pending))
+        self.buffer.append(kps)
+        if index > 0:
+            self.sampler.adapt(self._prev, kps, done)
+        self._pending = 0
+        self._prev = kps
+        self._next_key = index + self.sampler.stride
+        return done
+
+    def flush(self):
+        # Trailing frames after the last inferred one keep its landmarks.
+        done = self._pending
+        for _ in range(done):
+            self.buffer.append(self._prev)
+        self._pending = 0
+        return done
+
+
+def _landmark_rows(landmarks, start, count):
+    """landmarks[start:start + count], NaN-padded if the array is too short."""
+    rows = landmarks[start:start + count]
+    if len(rows) < count:
+        pad = np.full((count - len(rows), NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+        rows = np.concatenate([rows, pad])
+    return rows
+
+
+def run_pipeline(cap, out, pose, test, progress=None, sampler=None, every=30, landmarks=None):
+    """
+    Run `test` over every frame of `cap`, writing the annotated video to `out`.
+    With precomputed `landmarks` (one row per frame) no inference is run and
+    `pose` may be None. Returns (frames, timings, landmarks used).
+    """
+    sampler = sampler or FrameSampler()
+    frames_q = queue.Queue(PIPELINE_QUEUE_SIZE)
+    annotate_q = queue.Queue(PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+    total = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+
+    def decode(stage):
+        count = 0
+        try:
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                ret, frame = cap.read()
+                stage.busy += time.perf_counter() - t0
+                if not ret:
+                    break
+                count += 1
+                if progress and total > 0 and count % every == 0:
+                    progress(min(count / total, 1.0))
+                if not _put(frames_q, frame, stop):
+                    break
+        finally:
+            _put(frames_q, _END, stop)
+
+    def encode(stage):
+        while True:
+            item = _get(annotate_q, stop)
+            if item is _END:
+                break
+            t0 = time.perf_counter()
+            image, kps, texts = item
+            if kps is not None:
+                draw_pose(image, kps)
+            for args in texts:
+                draw_text(image, *args)
+            out.write(image)
+            stage.busy += time.perf_counter() - t0
+
+    score_sec = 0.0
+    buffer = LandmarkBuffer(int(total) if total > 0 else 256)
+    stream = None
+    if landmarks is None and test.uses_pose:
+        stream = LandmarkStream(pose, sampler, buffer)
+
+    def take(held, final=False):
+        """Number of held frames whose landmarks are now in `buffer`."""
+        if stream is not None:
+            return stream.flush() if final else stream.push(held[-1])
+        if final or len(held) >= LANDMARK_WINDOW:
+            buffer.extend(_landmark_rows(landmarks, len(buffer), len(held)))
+            return len(held)
+        return 0
+
+    def emit_window(window_frames):
+        """Score the frames whose landmarks were just appended to `buffer`, in order."""
+        nonlocal score_sec
+        t0 = time.perf_counter()
+        window = buffer.array[len(buffer) - len(window_frames):]
+        angles = joint_angles(window)
+        items = []
+        for frame, kps, row in zip(window_frames, window, angles):
+            kps = None if np.isnan(kps[0, 0]) else kps
+            test.update(kps, row, frame.shape)
+            items.append((frame, kps, test.overlay()))
+        score_sec += time.perf_counter() - t0
+        for item in items:
+            if not _put(annotate_q, item, stop):
+                return
+
+    decoder = _Stage('eval-decode', decode, stop)
+    encoder = _Stage('eval-encode', encode, stop)
+    decoder.start()
+    encoder.start()
+    wall_start = time.perf_counter()
+    frames = 0
+    held = []   # decoded frames not scored yet
+    try:
+        while True:
+            frame = _get(frames_q, stop)
+            if frame is _END:
+                break
+            frames += 1
+            if not test.uses_pose:
+                test.update(None, None, frame.shape)
+                _put(annotate_q, (frame, None, test.overlay()), stop)
+                continue
+            held.append(frame)
+            done = take(held)
+            if done:
+                emit_window(held[:done])
+                del held[:done]
+        if held:
+            take(held, final=True)
+            emit_window(held)
+        _put(annotate_q, _END, stop)
+        encoder.join()
+    finally:
+        stop.set()
+        decoder.join()
+        encoder.join()
+    for stage in (decoder, encoder):
+        if stage.error is not None:
+            raise stage.error
+
+    wall = time.perf_counter() - wall_start
+    timings = {
+        'decode_sec': round(decoder.busy, 3),
+        'infer_sec': round(stream.infer_sec if stream else 0.0, 3),
+        'score_sec': round(score_sec, 3),
+        'encode_sec': round(encoder.busy, 3),
+        'wall_sec': round(wall, 3),
+        'fps': round(frames / wall, 2) if wall > 0 else 0.0,
+        'inferred_frames': stream.inferred if stream else 0,
+    }
+    return frames, timings, buffer.array
+
+
+# --- Parallel segment extraction ---
+_SEGMENT_POOL = None
+_SEGMENT_POOL_SIZE = 0
+_SEGMENT_POOL_LOCK = threading.Lock()
+
+
+def eval_processes():
+    """EVAL_PROCESSES: landmark extraction processes per video (1 = in-process)."""
+    return max(1, int(os.environ.get('EVAL_PROCESSES', 1)))
+
+
+def plan_segments(frame_count, workers, min_frames=MIN_SEGMENT_FRAMES):
+    """
+    Split [0, frame_count) into up to `workers` contiguous (start, stop)
+    ranges of at least `min_frames`; the last one has stop=None and runs to
+    the end of the file, whatever the container claimed.
+    """
+    n = max(1, min(workers, frame_count // max(1, min_frames)))
+    bounds = [frame_count * i // n for i in range(n + 1)]
+    segments = [(bounds[i], bounds[i + 1]) for i in range(n)]
+    segments[-1] = (segments[-1][0], None)
+    return segments
+
+
+def extract_segment(video_path, start, stop, sampler=None, warmup=SEGMENT_WARMUP):
+    """
+    Landmarks for frames [start, stop) of the video as an (n, 33, 4) array,
+    plus (infer_sec, inferred). Decoding starts up to `warmup` frames early
+    so the tracker has locked on by `start`; those rows are dropped. Raises
+    InexactSeek if the decoder can't position on that frame exactly.
+    """
+    sampler = sampler or FrameSampler()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise EvalError(f"Error: Could not open video file: {video_path}")
+    first = max(0, start - warmup)
+    if first:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        landed = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if landed != first:
+            cap.release()
+            raise InexactSeek(f"Seek to frame {first} landed on frame {landed}")
+    buffer = LandmarkBuffer((stop or start + 1024) - first)
+    try:
+        with VIDEO_POSE_POOL.checkout() as pose:
+            pose.reset()
+            stream = LandmarkStream(pose, sampler, buffer)
+            while stop is None or first + stream.frames < stop:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                stream.push(frame)
+            stream.flush()
+    finally:
+        cap.release()
+    rows = buffer.array[start - first:]
+    if stop is not None:
+        # Keep later segments aligned even if this one hit EOF early.
+        rows = _landmark_rows(rows, 0, stop - start)
+    return np.ascontiguousarray(rows), stream.infer_sec, stream.inferred
+
+
+def segment_pool(workers):
+    """Process pool for extract_segment, started on first use and reused across videos."""
+    global _SEGMENT_POOL, _SEGMENT_POOL_SIZE
+    with _SEGMENT_POOL_LOCK:
+        if _SEGMENT_POOL is None or _SEGMENT_POOL_SIZE != workers:
+            if _SEGMENT_POOL is not None:
+                _SEGMENT_POOL.shutdown()
+            # spawn: forking a process that already runs MediaPipe and
+            # pipeline threads is not safe.
+            _SEGMENT_POOL = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            _SEGMENT_POOL_SIZE = workers
+        return _SEGMENT_POOL
+
+
+def close_segment_pool():
+    global _SEGMENT_POOL
+    with _SEGMENT_POOL_LOCK:
+        if _SEGMENT_POOL is not None:
+            _SEGMENT_POOL.shutdown()
+            _SEGMENT_POOL = None
+
+
+def extract_parallel(video_path, frame_count, workers, sampler=None, progress=None):
+    """
+    Landmarks for the whole video, extracted segment by segment in
+    `workers` processes and stitched in frame order. Returns
+    (landmarks, stats).
+    """
+    t0 = time.perf_counter()
+    segments = plan_segments(frame_count, workers)
+    pool = segment_pool(workers)
+    futures = {pool.submit(extract_segment, video_path, start, stop, sampler): i
+               for i, (start, stop) in enumerate(segments)}
+    results = [None] * len(segments)
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=PROGRESS_TICK, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures[future]] = future.result()
+            if progress:
+                progress((len(segments) - len(pending)) / len(segments))
+    except BaseException:
+        # Timed out or a segment failed: don't start the ones still queued.
+        for future in pending:
+            future.cancel()
+        raise
+    landmarks = np.concatenate([rows for rows, _, _ in results])
+    return landmarks, {
+        'segments': len(segments),
+        'extract_sec': round(time.perf_counter() - t0, 3),
+        'infer_sec': round(sum(sec for _, sec, _ in results), 3),
+        'inferred_frames': sum(n for _, _, n in results),
+    }
+
+
+def process_video(video_path, test, progress=None, sampler=None, workers=1, cache=None):
+    """
+    Run test over the video; returns (relative_path, web_ready, frames, timings).
+    With workers > 1, long videos have their landmarks extracted in parallel
+    segments first and are then scored and rendered in one ordered pass.
+    With a LandmarkCache, landmarks of a video seen before are reused and
+    new ones are stored.
+    """
+    sampler = sampler or FrameSampler()
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise EvalError(f"Error: Could not open video file: {video_path}")
+
+    # Try to determine a reliable FPS
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    # Ignore garbage FPS values (very low, huge, NaN)
+    if fps is None or fps != fps or fps < 10 or fps > 120:
+        # Try inferring FPS based on file duration, if possible
+        duration_secs = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 if cap.get(cv2.CAP_PROP_POS_MSEC) > 0 else 0
+        if frame_count > 0 and duration_secs > 0:
+            fps = frame_count / duration_secs
+        else:
+            fps = 25.0  # fallback if no info is available
+    else:
+        fps = float(fps)
+
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if width == 0 or height == 0:
+        cap.release()
+        raise EvalError("Error: video frame size not determined.")
+
+    landmarks, extract = None, {}
+    cache_key = None
+    if cache is not None and test.uses_pose:
+        cache_key = cache.key(video_path, sampler.cache_variant())
+        landmarks = cache.get(cache_key)
+        extract = {'landmark_cache': 'hit' if landmarks is not None else 'miss'}
+    if (landmarks is None and workers > 1 and test.uses_pose and frame_count >= 2 * MIN_SEGMENT_FRAMES
+            and os.path.splitext(video_path)[1].lower() in INDEXED_CONTAINERS):
+        split = progress and (lambda p: progress(EXTRACT_SHARE * p))
+        try:
+            landmarks, stats = extract_parallel(video_path, frame_count, workers, sampler, split)
+            extract.update(stats)
+        except InexactSeek as e:
+            # Stitched segments would be shifted against the frames they're drawn on.
+            print(f"Extracting {video_path} sequentially: {e}")
+        except Exception:
+            cap.release()
+            raise
+        if progress and landmarks is not None:
+            progress = (lambda report: lambda p: report(EXTRACT_SHARE + (1 - EXTRACT_SHARE) * p))(progress)
+
+    filename = os.path.basename(video_path)
+    name, ext = os.path.splitext(filename)
+    out_path = os.path.join(EVAL_FOLDER, f"{name}_eval.mp4")
+    relative_path = f"evaluated_videos/{name}_eval.mp4"
+    out, web_ready = open_video_writer(out_path, fps, (width, height))
+    if not out.isOpened():
+        cap.release()
+        raise EvalError(f"Failed to open VideoWriter for {out_path}")
+    try:
+        if landmarks is not None:
+            frames, timings, used = run_pipeline(cap, out, None, test, progress, sampler, landmarks=landmarks)
+        else:
+            with VIDEO_POSE_POOL.checkout() as pose:
+                # The graph is reused across videos; drop tracking state from the last one.
+                pose.reset()
+                frames, timings, used = run_pipeline(cap, out, pose, test, progress, sampler)
+        timings.update(extract)
+    finally:
+        cap.release()
+        # cv2.VideoWriter.release() returns None; only the ffmpeg pipe reports failures.
+        encoded = out.release() is not False
+    if not encoded:
+        try:
+            os.remove(out_path)
+        except OSError:
+            pass
+        raise EvalError(f"Error: Encoding the output video failed: {out_path}")
+    if not os.path.exists(out_path) or os.path.getsize(out_path) < 1000:
+        raise EvalError(f"Error: Output video not created or too small: {out_path}")
+    if cache_key is not None and extract.get('landmark_cache') == 'miss':
+        cache.put(cache_key, used)
+    return relative_path, web_ready, frames, timings
+
+
+def evaluate(test_type, video_path, progress=None, sampler=None, workers=None, use_cache=True):
+    """
+    Evaluate one video. `progress`, if given, is called with a 0-1 fraction
+    every few frames; `sampler` picks the frames and resolution used for
+    inference (default: FrameSampler.from_env()); `workers` is the number of
+    landmark extraction processes (default: eval_processes()). Landmarks are
+    read from and saved to LANDMARK_CACHE unless use_cache is False. Raises
+    EvalError for unreadable or missing videos.
+    """
+    test_type = test_type.lower()
+    if not os.path.exists(video_path):
+        raise EvalError(f"Error: Video not found at {video_path}")
+    start_time = time.time()
+    test_class = TESTS.get(test_type)
+    if test_class is None:
+        return EvalResult(test_type, "Unknown test type", {}, '', False, 0, 0.0, {})
+    test = test_class()
+    sampler = sampler or FrameSampler.from_env()
+    workers = workers or eval_processes()
+    cache = LANDMARK_CACHE if use_cache else None
+    out_video, web_ready, frames, timings = process_video(video_path, test, progress, sampler, workers, cache)
+    result_text, metrics = test.result()
+    duration = time.time() - start_time
+    result_text += f"\nProcessing Time: {duration:.2f} sec"
+    return EvalResult(test_type, result_text, metrics, out_video.replace('\\', '/'), web_ready, frames, duration, timings)
@@ -0,0 +1,159 @@
+import threading
+import time
+
+
+class ClaimTimeout(Exception):
+    """Raised when the frame ahead of ours is still being processed after the wait budget."""
+
+
+class FrameMailbox:
+    """
+    Latest-frame-wins hand-off for one user's HTTP frame requests.
+
+    Each request post()s its frame and then claim()s it. Only one frame per
+    mailbox is processed at a time; a request still waiting when a newer
+    frame is posted gets None back and should answer "superseded", and one
+    whose turn doesn't come within the timeout gets ClaimTimeout. So a
+    client that captures faster than we infer waits at most one inference
+    for feedback instead of an ever-growing queue.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._latest = 0
+        self._pending = None
+        self._busy = False
+        self.last_used = time.monotonic()
+        self.posted = 0
+        self.processed = 0
+        self.superseded = 0
+        self.timeouts = 0
+
+    def post(self, frame):
+        with self._cond:
+            self._latest += 1
+            self._pending = frame
+            self.posted += 1
+            self.last_used = time.monotonic()
+            self._cond.notify_all()
+            return self._latest
+
+    def claim(self, ticket, timeout=10.0):
+        """Wait for our turn; returns the frame, or None if a newer one replaced it."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._busy and ticket == self._latest:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if ticket != self._latest:
+                self.superseded += 1
+                return None
+            if self._busy:
+                # Still ours to run, but inference is starved: not a normal drop.
+                self.timeouts += 1
+                raise ClaimTimeout(f"Previous frame still processing after {timeout:.1f}s")
+            self._busy = True
+            frame, self._pending = self._pending, None
+            return frame
+
+    def release(self):
+        with self._cond:
+            self._busy = False
+            self.processed += 1
+            self.last_used = time.monotonic()
+            self._cond.notify_all()
+
+    def drop_rate(self):
+        return self.superseded / self.posted if self.posted else 0.0
+
+
+class LatestFrame:
+    """
+    Single-slot hand-off between a socket reader and the inference loop.
+
+    put() overwrites any frame that hasn't been picked up yet, so when
+    inference falls behind the stale frames are dropped instead of queued.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._data = None
+        self._seq = -1
+        self._dropped = 0
+        self._closed = False
+        self.posted = 0
+        self.superseded = 0
+
+    def put(self, data):
+        with self._cond:
+            if self._data is not None:
+                self._dropped += 1
+                self.superseded += 1
+            self._data = data
+            self._seq += 1
+            self.posted += 1
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def take(self):
+        """Block for the newest frame; returns (data, seq, dropped) or None once closed."""
+        with self._cond:
+            while self._data is None and not self._closed:
+                self._cond.wait()
+            if self._data is None:
+                return None
+            taken = (self._data, self._seq, self._dropped)
+            self._data = None
+            self._dropped = 0
+            return taken
+
+
+class MailboxTable:
+    """Per-worker FrameMailboxes keyed by live session id, dropped after `ttl` idle seconds."""
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self._boxes = {}
+        self._lock = threading.Lock()
+        # Totals from expired mailboxes and closed sockets, so stats survive them.
+        self._posted = 0
+        self._superseded = 0
+        self._timeouts = 0
+
+    def get(self, session_id):
+        with self._lock:
+            cutoff = time.monotonic() - self.ttl
+            for sid in [sid for sid, box in self._boxes.items() if box.last_used < cutoff]:
+                box = self._boxes.pop(sid)
+                self._posted += box.posted
+                self._superseded += box.superseded
+                self._timeouts += box.timeouts
+            box = self._boxes.get(session_id)
+            if box is None:
+                box = self._boxes[session_id] = FrameMailbox()
+            return box
+
+    def record(self, slot):
+        """Fold a finished LatestFrame's counters into the totals."""
+        with self._lock:
+            self._posted += slot.posted
+            self._superseded += slot.superseded
+
+    def stats(self):
+        with self._lock:
+            posted = self._posted + sum(b.posted for b in self._boxes.values())
+            superseded = self._superseded + sum(b.superseded for b in self._boxes.values())
+            timeouts = self._timeouts + sum(b.timeouts for b in self._boxes.values())
+            return {
+                'active': len(self._boxes),
+                'posted': posted,
+                'superseded': superseded,
+                'timeouts': timeouts,
+                'drop_rate': superseded / posted if posted else 0.0,
+            }
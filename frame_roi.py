@@ -0,0 +1,149 @@
+"""
+Region-of-interest decoding for a live session's frames.
+
+A practicer usually fills only part of the camera view, and the landmark
+model looks at a 256px crop around the person anyway. So once a frame had a
+pose, the next one is decoded at the largest JPEG DCT reduction (1/2, 1/4,
+1/8) that still leaves MIN_ROI_SIDE pixels across the person, cropped to the
+previous landmarks' box padded by ROI_PADDING, and only that crop goes
+through inference. Keypoints are mapped back to full-frame coordinates.
+
+The ROI is sticky: it only moves when the person gets close to its edge or
+becomes much smaller than it, so the tracking graph sees a stable image.
+The graph's tracking state is in the coordinates of the image it was fed,
+so whenever the region changes the caller resets it (`moved`). When the
+crop has no pose, the same frame is retried whole on a stateless graph and
+the next frame starts from the full view again.
+"""
+import math
+
+import cv2
+import numpy as np
+
+from pose_matching import MIN_VISIBILITY
+
+# Of the person's larger side, added around the landmark box.
+ROI_PADDING = 0.35
+# Pixels across the person the model still gets after a reduced decode.
+MIN_ROI_SIDE = 256
+# A region covering more of the frame than this isn't worth cropping.
+MAX_ROI_FRACTION = 0.7
+# imdecode flags per reduction factor.
+_IMREAD = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+           4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+class RegionTracker:
+    """Where to look in a session's next frame, from the landmarks of the last one."""
+
+    def __init__(self, padding=ROI_PADDING, min_side=MIN_ROI_SIDE, max_fraction=MAX_ROI_FRACTION):
+        self.padding = padding
+        self.min_side = min_side
+        self.max_fraction = max_fraction
+        self.roi = None     # (x0, y0, x1, y1) as frame fractions; None = whole frame
+        self.size = None    # (width, height) of the full-resolution frame
+        self.moved = False  # this frame's region differs from the previous frame's
+        self._fed = None    # region of the previous frame
+        self.frames = 0
+        self.cropped = 0
+        self.fallbacks = 0
+        self.moves = 0
+        self.pixels = 0     # decoded pixels that went to inference, for stats
+
+    def reduction(self):
+        """Largest decode reduction that keeps min_side pixels across the region."""
+        if self.size is None:
+            return 1
+        x0, y0, x1, y1 = self.roi or (0.0, 0.0, 1.0, 1.0)
+        side = min((x1 - x0) * self.size[0], (y1 - y0) * self.size[1])
+        for factor in (8, 4, 2):
+            if side / factor >= self.min_side:
+                return factor
+        return 1
+
+    def decode(self, data):
+        """
+        (image, box): the frame decoded at reduced scale, and the pixel box
+        (x0, y0, x1, y1) to run inference on, or None for the whole image.
+        image is None if `data` isn't an image. Sets `moved`.
+        """
+        factor = self.reduction()
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), _IMREAD[factor])
+        if image is None:
+            return None, None
+        h, w = image.shape[:2]
+        self.size = (w * factor, h * factor)
+        self.frames += 1
+        box = None
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            box = (int(x0 * w), int(y0 * h), min(w, math.ceil(x1 * w)), min(h, math.ceil(y1 * h)))
+            if box[2] - box[0] < 16 or box[3] - box[1] < 16:
+                self.roi = box = None
+        self.moved = self.roi != self._fed
+        self._fed = self.roi
+        self.moves += self.moved
+        if box is None:
+            self.pixels += w * h
+            return image, None
+        self.cropped += 1
+        self.pixels += (box[2] - box[0]) * (box[3] - box[1])
+        return image, box
+
+    @staticmethod
+    def crop(image, box):
+        return image if box is None else image[box[1]:box[3], box[0]:box[2]]
+
+    def lost(self):
+        """The crop had no pose; the caller retries the whole frame."""
+        self.fallbacks += 1
+        self.roi = None
+
+    def update(self, kps, shape, box):
+        """
+        Map (33, 4) landmarks found in `box` of an image of `shape` to
+        whole-frame coordinates and pick the next frame's region. Returns the
+        mapped landmarks (None stays None).
+        """
+        if kps is None:
+            self.roi = None
+            return None
+        if box is not None:
+            h, w = shape[:2]
+            x0, y0, x1, y1 = box
+            kps = kps.copy()
+            kps[:, 0] = (x0 + kps[:, 0] * (x1 - x0)) / w
+            kps[:, 1] = (y0 + kps[:, 1] * (y1 - y0)) / h
+            kps[:, 2] *= (x1 - x0) / w   # z uses the same scale as x
+        self._follow(kps)
+        return kps
+
+    def _follow(self, kps):
+        visible = kps[:, 3] >= MIN_VISIBILITY
+        pts = kps[visible, :2] if visible.sum() >= 4 else kps[:, :2]
+        lo = np.clip(pts.min(axis=0), 0.0, 1.0)
+        hi = np.clip(pts.max(axis=0), 0.0, 1.0)
+        w, h = self.size
+        # Pad by the same number of pixels on both axes.
+        pad_px = self.padding * max((hi[0] - lo[0]) * w, (hi[1] - lo[1]) * h)
+        pad = np.array([pad_px / w, pad_px / h])
+        want_lo, want_hi = np.clip(lo - pad, 0.0, 1.0), np.clip(hi + pad, 0.0, 1.0)
+        want_area = (want_hi[0] - want_lo[0]) * (want_hi[1] - want_lo[1])
+        if want_area > self.max_fraction:
+            self.roi = None
+            return
+        if self.roi is not None:
+            roi_lo, roi_hi = np.array(self.roi[:2]), np.array(self.roi[2:])
+            margin = pad / 3
+            # A side already at the frame edge can't get any closer to it.
+            inside = (np.all((lo - margin >= roi_lo) | (roi_lo <= 0.0))
+                      and np.all((hi + margin <= roi_hi) | (roi_hi >= 1.0)))
+            roi_area = (roi_hi[0] - roi_lo[0]) * (roi_hi[1] - roi_lo[1])
+            if inside and roi_area < 2 * want_area:
+                return
+        self.roi = (float(want_lo[0]), float(want_lo[1]), float(want_hi[0]), float(want_hi[1]))
+
+    def stats(self):
+        return {'frames': self.frames, 'cropped': self.cropped, 'fallbacks': self.fallbacks,
+                'region_changes': self.moves, 'reduction': self.reduction(),
+                'pixels_per_frame': self.pixels // max(self.frames, 1)}
@@ -0,0 +1,273 @@
+"""
+Client side of the shared landmark model process (inference_server.py).
+
+With INFERENCE_SOCKET set, web workers don't load MediaPipe at all: each
+worker process creates one shared-memory ring of RING_SLOTS frame slots,
+announces it to the server over a Unix socket, and then for every live frame
+writes the JPEG bytes into a free slot and sends only a small header (slot,
+length, live session id). The server decodes straight out of the slot and
+replies with the (33, 4) landmarks; scoring against the templates stays in
+the web worker. A slot is reused only after the server has answered for it.
+Frames larger than a slot are sent inline over the socket instead.
+
+Messages on the socket are a uint32 length followed by a body, little-endian.
+Requests start with _REQUEST (req_id, op, slot, nbytes, id_len) followed by
+id_len bytes of UTF-8 id and, for inline frames (slot -1), the frame bytes:
+
+    OP_HELLO    id = shared memory name, slot = number of slots, nbytes = slot size
+    OP_FRAME    id = live session id ('' for stateless), frame in `slot`
+    OP_DISCARD  id = live session id to close; no reply
+
+Replies are _REPLY (req_id, status); when status is POSE they go on with
+the frame's width / height as a float32 and the 33 x 4 float32 landmarks.
+"""
+import itertools
+import os
+import socket
+import struct
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from metrics import LIVE_STAGE_SECONDS
+
+INFERENCE_SOCKET = os.environ.get('INFERENCE_SOCKET')
+RING_SLOTS = int(os.environ.get('INFERENCE_RING_SLOTS', 8))
+SLOT_BYTES = int(os.environ.get('INFERENCE_SLOT_KB', 1024)) << 10
+# Longer than a few batches of inference; after this the frame is answered as busy.
+INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 5.0))
+
+OP_HELLO, OP_FRAME, OP_DISCARD = 0, 1, 2
+NO_POSE, POSE, BUSY, BAD_FRAME, ERROR = 0, 1, 2, 3, 4
+
+_LENGTH = struct.Struct('<I')
+_REQUEST = struct.Struct('<IBiIH')
+_REPLY = struct.Struct('<IB')
+_ASPECT = struct.Struct('<f')
+
+
+class InferenceBusy(Exception):
+    """No landmark model was free in time; the caller should answer busy."""
+
+
+class FrameError(Exception):
+    """The frame bytes are not a decodable image."""
+
+
+def send_message(sock, body):
+    sock.sendall(_LENGTH.pack(len(body)) + body)
+
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:])
+        if k == 0:
+            raise ConnectionError("Inference socket closed")
+        got += k
+    return buf
+
+
+def recv_message(sock):
+    (length,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return _recv_exact(sock, length)
+
+
+def pack_request(req_id, op, slot=-1, nbytes=0, ident='', payload=b''):
+    ident = ident.encode('utf-8')
+    return _REQUEST.pack(req_id, op, slot, nbytes, len(ident)) + ident + payload
+
+
+def unpack_request(body):
+    """(req_id, op, slot, nbytes, ident, inline payload view)"""
+    req_id, op, slot, nbytes, id_len = _REQUEST.unpack_from(body)
+    start = _REQUEST.size + id_len
+    ident = bytes(body[_REQUEST.size:start]).decode('utf-8')
+    return req_id, op, slot, nbytes, ident, memoryview(body)[start:]
+
+
+def pack_reply(req_id, status, kps=None, aspect=1.0):
+    body = _REPLY.pack(req_id, status)
+    if status == POSE:
+        body += _ASPECT.pack(aspect) + np.ascontiguousarray(kps, dtype=np.float32).tobytes()
+    return body
+
+
+def attach_shared_memory(name):
+    """Open a segment created by another process without taking ownership of it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the segment with this
+        # process's resource tracker, which would unlink it on exit.
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class _Pending:
+    __slots__ = ('event', 'slot', 'status', 'kps', 'aspect')
+
+    def __init__(self, slot):
+        self.event = threading.Event()
+        self.slot = slot
+        self.status = None
+        self.kps = None
+        self.aspect = None
+
+
+class InferenceClient:
+    """
+    One web worker's connection to the inference server, shared by its
+    request threads. Connects lazily (and again after a fork or a server
+    restart); while the server is unreachable every frame raises
+    InferenceBusy.
+    """
+
+    def __init__(self, path=INFERENCE_SOCKET, slots=RING_SLOTS, slot_bytes=SLOT_BYTES,
+                 timeout=INFERENCE_TIMEOUT):
+        self.path = path
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pid = None
+        self._sock = None
+        self._shm = None
+        self._free = []
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self.requests = 0
+        self.inline = 0
+        self.timeouts = 0
+        self.reconnects = 0
+
+    def _connect_locked(self):
+        if self._pid != os.getpid():
+            # Forked: the parent's socket and ring are not ours to use.
+            self._sock = self._shm = None
+            self._pending = {}
+            self._pid = os.getpid()
+        if self._sock is not None:
+            return self._sock
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+            send_message(sock, pack_request(0, OP_HELLO, self.slots, self.slot_bytes, self._shm.name))
+        except OSError as e:
+            sock.close()
+            raise InferenceBusy(f"Inference server unavailable: {e}") from None
+        self._sock = sock
+        self._free = list(range(self.slots))
+        self.reconnects += 1
+        threading.Thread(target=self._read_replies, args=(sock,), daemon=True).start()
+        return sock
+
+    def _read_replies(self, sock):
+        try:
+            while True:
+                body = recv_message(sock)
+                req_id, status = _REPLY.unpack_from(body)
+                kps = aspect = None
+                if status == POSE:
+                    (aspect,) = _ASPECT.unpack_from(body, _REPLY.size)
+                    kps = np.frombuffer(body, np.float32, 33 * 4, _REPLY.size + _ASPECT.size).reshape(33, 4).copy()
+                with self._lock:
+                    pending = self._pending.pop(req_id, None)
+                    if pending is not None and pending.slot is not None:
+                        self._free.append(pending.slot)
+                if pending is not None:
+                    pending.status, pending.kps, pending.aspect = status, kps, aspect
+                    pending.event.set()
+        except (OSError, ConnectionError, struct.error):
+            pass
+        with self._lock:
+            if self._sock is sock:
+                self._sock = None
+                orphans, self._pending = list(self._pending.values()), {}
+            else:
+                orphans = []
+        sock.close()
+        for pending in orphans:
+            pending.status = ERROR
+            pending.event.set()
+
+    def landmarks(self, data, live_id=None):
+        """
+        (kps, aspect): (33, 4) landmarks of the person in JPEG/PNG bytes and
+        the frame's width / height, or (None, None) if nobody was found.
+        """
+        with LIVE_STAGE_SECONDS.time(stage='remote'):
+            with self._lock:
+                sock = self._connect_locked()
+                slot = self._free.pop() if len(data) <= self.slot_bytes and self._free else None
+                req_id = next(self._ids) & 0xFFFFFFFF
+                pending = self._pending[req_id] = _Pending(slot)
+                self.requests += 1
+            if slot is None:
+                self.inline += 1
+                body = pack_request(req_id, OP_FRAME, -1, len(data), live_id or '', data)
+            else:
+                offset = slot * self.slot_bytes
+                self._shm.buf[offset:offset + len(data)] = data
+                body = pack_request(req_id, OP_FRAME, slot, len(data), live_id or '')
+            try:
+                with self._send_lock:
+                    send_message(sock, body)
+            except OSError:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)  # the reader thread fails the pending requests
+                except OSError:
+                    pass
+            if not pending.event.wait(self.timeout):
+                # The slot comes back when the late reply arrives.
+                self.timeouts += 1
+                raise InferenceBusy("Inference server did not answer in time")
+        if pending.status == POSE:
+            return pending.kps, pending.aspect
+        if pending.status == NO_POSE:
+            return None, None
+        if pending.status == BAD_FRAME:
+            raise FrameError("Frame is not an image")
+        raise InferenceBusy("Inference server busy" if pending.status == BUSY else "Inference server error")
+
+    def discard(self, live_id):
+        """Close the server-side tracking session of a user who left."""
+        try:
+            with self._lock:
+                sock = self._connect_locked()
+            with self._send_lock:
+                send_message(sock, pack_request(0, OP_DISCARD, ident=live_id))
+        except (InferenceBusy, OSError):
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'socket': self.path,
+                'connected': self._sock is not None,
+                'slots': self.slots,
+                'free_slots': len(self._free),
+                'in_flight': len(self._pending),
+                'requests': self.requests,
+                'inline': self.inline,
+                'timeouts': self.timeouts,
+                'connects': self.reconnects,
+            }
+
+    def close(self):
+        with self._lock:
+            sock, self._sock = self._sock, None
+            shm, self._shm = self._shm, None
+            mine = self._pid == os.getpid()
+        if sock is not None:
+            sock.close()
+        if shm is not None and mine:
+            shm.close()
+            shm.unlink()
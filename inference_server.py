@@ -0,0 +1,261 @@
+"""
+Shared landmark model process for the web workers.
+
+One process holds the MediaPipe graphs (stateless pool plus per-user
+tracking sessions) for every gunicorn worker on the host, so model memory
+no longer grows with the web worker count. Workers connect over the Unix
+socket INFERENCE_SOCKET and pass frames through shared-memory rings (see
+inference.py for the wire format).
+
+Requests from all connections go into one queue. The dispatcher takes
+everything that arrives within BATCH_WINDOW_MS of the first request (up to
+BATCH_MAX) and runs the batch on the graph pool: frames of one tracking
+session run in order as one task, so they don't occupy several threads
+waiting on the same session lock, and different sessions run in parallel.
+MediaPipe's Pose solution takes one image per call, so a batch shares a
+dispatch rather than one tensor. Requests that waited longer than the
+client's timeout are answered busy without running.
+
+Run with `INFERENCE_SOCKET=/tmp/yoga-inference.sock python inference_server.py`
+and start the web workers with the same INFERENCE_SOCKET.
+"""
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from inference import (INFERENCE_TIMEOUT, OP_HELLO, OP_FRAME, OP_DISCARD, NO_POSE, POSE, BUSY, BAD_FRAME, ERROR,
+                       InferenceBusy, FrameError, send_message, recv_message, unpack_request, pack_reply,
+                       attach_shared_memory)
+from live_pose import LocalInference
+from metrics import REGISTRY, INFERENCE_BATCH_SIZE, LIVE_STAGE_SECONDS
+
+BATCH_WINDOW = float(os.environ.get('INFERENCE_BATCH_MS', 4)) / 1000
+BATCH_MAX = int(os.environ.get('INFERENCE_BATCH_MAX', 16))
+# Live sessions across every web worker; each holds a tracking graph.
+MAX_SESSIONS = int(os.environ.get('INFERENCE_SESSIONS', 64))
+METRICS_INTERVAL = 10.0
+
+_Request = namedtuple('_Request', 'conn req_id live_id slot nbytes inline arrived')
+
+
+class _Connection:
+    """One web worker: its socket and the shared-memory ring it announced."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.shm = None
+        self.slot_bytes = 0
+        self.slots = 0
+
+    def hello(self, name, slots, slot_bytes):
+        self.shm = attach_shared_memory(name)
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+
+    def frame(self, request):
+        """The request's frame bytes; a view into the ring, not a copy."""
+        if request.slot < 0:
+            return request.inline
+        if self.shm is None or request.slot >= self.slots or request.nbytes > self.slot_bytes:
+            return None
+        offset = request.slot * self.slot_bytes
+        return self.shm.buf[offset:offset + request.nbytes]
+
+    def reply(self, req_id, status, kps=None, aspect=1.0):
+        try:
+            with self.send_lock:
+                send_message(self.sock, pack_reply(req_id, status, kps, aspect))
+        except OSError:
+            pass  # the worker went away; its reader thread cleans up
+
+    def shutdown(self):
+        """Wake the reader blocked on this socket; it closes the connection."""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        self.sock.close()
+        if self.shm is not None:
+            try:
+                self.shm.close()
+            except BufferError:
+                pass  # a frame view is still in use; the mapping goes with the process
+
+
+class InferenceServer:
+
+    def __init__(self, path, engine=None, batch_window=BATCH_WINDOW, batch_max=BATCH_MAX,
+                 max_wait=INFERENCE_TIMEOUT):
+        self.path = path
+        self.engine = engine or LocalInference(max_sessions=MAX_SESSIONS, min_detection_confidence=0.5,
+                                               min_tracking_confidence=0.5)
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.engine.pool.size, thread_name_prefix='infer')
+        self._stop = threading.Event()
+        self._listener = None
+        self._dispatcher = None
+        self._readers = {}   # _Connection -> its reader thread
+        self._readers_lock = threading.Lock()
+        self.batches = 0
+        self.expired = 0
+
+    def serve_forever(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        self._listener.listen(64)
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
+        print(f"---- Inference server on {self.path}, {self.engine.pool.size} graphs ----")
+        while not self._stop.is_set():
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                break
+            conn = _Connection(sock)
+            reader = threading.Thread(target=self._read_requests, args=(conn,), daemon=True)
+            with self._readers_lock:
+                if self._stop.is_set():
+                    conn.close()
+                    break
+                self._readers[conn] = reader
+            reader.start()
+
+    def _read_requests(self, conn):
+        try:
+            while True:
+                req_id, op, slot, nbytes, ident, inline = unpack_request(recv_message(conn.sock))
+                if op == OP_FRAME:
+                    self._queue.put(_Request(conn, req_id, ident, slot, nbytes, inline, time.monotonic()))
+                elif op == OP_DISCARD:
+                    self.engine.discard(ident)
+                elif op == OP_HELLO:
+                    conn.hello(ident, slot, nbytes)
+        except (OSError, ConnectionError, ValueError) as e:
+            if not isinstance(e, ConnectionError):
+                print(f"Inference connection failed: {e}")
+        finally:
+            with self._readers_lock:
+                self._readers.pop(conn, None)
+            conn.close()
+
+    def _dispatch_loop(self):
+        last_dump = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=1.0)]
+            except queue.Empty:
+                batch = []
+            deadline = time.monotonic() + self.batch_window
+            while batch and len(batch) < self.batch_max:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                self._dispatch(batch)
+            if time.monotonic() - last_dump > METRICS_INTERVAL:
+                REGISTRY.dump()
+                last_dump = time.monotonic()
+
+    def _dispatch(self, batch):
+        self.batches += 1
+        INFERENCE_BATCH_SIZE.observe(len(batch))
+        groups = OrderedDict()
+        for request in batch:
+            # Stateless frames are independent; a session's frames must stay in order.
+            key = request.live_id or id(request)
+            groups.setdefault(key, []).append(request)
+        for requests in groups.values():
+            self._executor.submit(self._run, requests)
+
+    def _run(self, requests):
+        for request in requests:
+            waited = time.monotonic() - request.arrived
+            LIVE_STAGE_SECONDS.observe(waited, stage='queue')
+            if waited > self.max_wait:
+                # The worker has already given up on this one.
+                self.expired += 1
+                request.conn.reply(request.req_id, BUSY)
+                continue
+            data = kps = aspect = None
+            status = ERROR
+            try:
+                data = request.conn.frame(request)
+                if data is None:
+                    status = BAD_FRAME
+                else:
+                    kps, aspect = self.engine.landmarks(data, request.live_id or None)
+                    status = NO_POSE if kps is None else POSE
+            except FrameError:
+                status = BAD_FRAME
+            except InferenceBusy:
+                status = BUSY
+            except Exception as e:
+                print(f"Inference failed: {e!r}")
+            finally:
+                if isinstance(data, memoryview):
+                    try:
+                        data.release()
+                    except BufferError:
+                        pass
+            request.conn.reply(request.req_id, status, kps, aspect)
+
+    def stats(self):
+        return {**self.engine.stats(), 'queued': self._queue.qsize(), 'batches': self.batches,
+                'expired': self.expired}
+
+    def stop(self):
+        """
+        Stop accepting, let the dispatcher finish its batch, disconnect the
+        workers, then wait for running frames before closing the graphs.
+        """
+        self._stop.set()
+        if self._listener is not None:
+            try:
+                self._listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._listener.close()
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+        with self._readers_lock:
+            readers = dict(self._readers)
+        for conn in readers:
+            conn.shutdown()
+        for reader in readers.values():
+            reader.join(timeout=5)
+        self._executor.shutdown(wait=True)
+        self.engine.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('INFERENCE_SOCKET', 'inference.sock')
+    server = InferenceServer(path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
@@ -0,0 +1,402 @@
+"""
+Background evaluation jobs for /physical_test uploads.
+
+The web request only stores the upload and inserts a row into the jobs
+table; long-lived worker processes claim queued rows, run the evaluation
+in-process through eval_engine and the H.264 transcode, and write progress
+and the result back. The table is the
+only shared state, so any number of web workers and job workers can point
+at the same database file.
+
+Run the pool next to the web server with `python jobs.py` (JOB_WORKERS
+processes, default 2); the development server, `python app.py`, starts an
+embedded one. Importing app.py never does, so gunicorn workers don't each
+get their own. One pool per database: the pool holds an flock on JOBS_LOCK
+and a second one refuses to start.
+"""
+import fcntl
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from video_io import convert_to_h264
+from metrics import REGISTRY, VIDEO_STAGE_SECONDS, JOBS_FINISHED
+import storage
+
+JOBS_DB = os.environ.get('JOBS_DB', 'jobs.db')
+JOBS_LOCK = os.environ.get('JOBS_LOCK', f"{JOBS_DB}.pool.lock")
+STATIC_DIR = 'static'
+UPLOADS_DIR = os.path.join(STATIC_DIR, 'uploads')
+EVAL_DIR = os.path.join(STATIC_DIR, 'evaluated_videos')
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+# Jobs running at once across every pool sharing JOBS_DB.
+MAX_RUNNING = int(os.environ.get('JOB_MAX_RUNNING', max(JOB_WORKERS, 1)))
+JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 900))
+MAX_ATTEMPTS = 3
+POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 5.0
+STALE_AFTER = 60.0
+ORPHAN_AGE = 3600.0
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+# --- Database Helpers ---
+def _connect():
+    conn = sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _execute(query, args=(), one=False):
+    conn = _connect()
+    try:
+        rows = [dict(r) for r in conn.execute(query, args).fetchall()]
+    finally:
+        conn.close()
+    return (rows[0] if rows else None) if one else rows
+
+def init_db():
+    _execute('''CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        owner TEXT,
+        test TEXT,
+        input_path TEXT,
+        status TEXT,
+        progress REAL DEFAULT 0,
+        summary TEXT,
+        video_rel TEXT,
+        error TEXT,
+        attempts INTEGER DEFAULT 0,
+        worker TEXT,
+        heartbeat REAL,
+        created REAL,
+        updated REAL
+    )''')
+    _execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created)')
+    storage.init_db()
+
+def create_job(owner, test, input_path):
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    _execute('INSERT INTO jobs(id, owner, test, input_path, status, created, updated) VALUES (?,?,?,?,?,?,?)',
+             (job_id, owner, test, input_path, QUEUED, now, now))
+    storage.record(storage.relative(input_path), owner, storage.UPLOAD, job_id)
+    return job_id
+
+def get_job(job_id):
+    return _execute('SELECT * FROM jobs WHERE id=?', (job_id,), one=True)
+
+def claim_next(worker):
+    """Atomically move the oldest queued job to running, respecting MAX_RUNNING."""
+    conn = _connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        running = conn.execute('SELECT COUNT(*) FROM jobs WHERE status=?', (RUNNING,)).fetchone()[0]
+        row = None
+        if running < MAX_RUNNING:
+            row = conn.execute('SELECT * FROM jobs WHERE status=? ORDER BY created LIMIT 1', (QUEUED,)).fetchone()
+        if row is not None:
+            now = time.time()
+            conn.execute('UPDATE jobs SET status=?, worker=?, attempts=attempts+1, progress=0, heartbeat=?, updated=? '
+                         'WHERE id=?', (RUNNING, worker, now, now, row['id']))
+        conn.execute('COMMIT')
+        return dict(row) if row is not None else None
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+def heartbeat(job_id, progress=None):
+    now = time.time()
+    if progress is None:
+        _execute('UPDATE jobs SET heartbeat=?, updated=? WHERE id=?', (now, now, job_id))
+    else:
+        _execute('UPDATE jobs SET heartbeat=?, updated=?, progress=? WHERE id=?', (now, now, progress, job_id))
+
+def finish_job(job_id, summary, video_rel):
+    _execute('UPDATE jobs SET status=?, progress=1, summary=?, video_rel=?, updated=? WHERE id=?',
+             (DONE, summary, video_rel, time.time(), job_id))
+
+def fail_job(job_id, error, retry):
+    job = get_job(job_id)
+    if retry and job and job['attempts'] < MAX_ATTEMPTS:
+        _execute('UPDATE jobs SET status=?, error=?, updated=? WHERE id=?', (QUEUED, error, time.time(), job_id))
+    else:
+        _execute('UPDATE jobs SET status=?, error=?, summary=?, video_rel=?, updated=? WHERE id=?',
+                 (FAILED, error, f"Error running analysis: {error}",
+                  f"uploads/{os.path.basename(job['input_path'])}" if job else None, time.time(), job_id))
+
+def requeue_stale():
+    """
+    Jobs whose worker stopped heartbeating crashed or hung; retry them or
+    give up. Returns the names of the unresponsive workers.
+    """
+    cutoff = time.time() - STALE_AFTER
+    stale = _execute('SELECT id, worker FROM jobs WHERE status=? AND heartbeat<?', (RUNNING, cutoff))
+    for job in stale:
+        print(f"Job {job['id']} lost its worker, requeueing")
+        fail_job(job['id'], 'Worker stopped responding', retry=True)
+    return {job['worker'] for job in stale}
+
+def requeue_worker_jobs(worker):
+    """Retry whatever a worker that just died was running."""
+    for job in _execute('SELECT id FROM jobs WHERE status=? AND worker=?', (RUNNING, worker)):
+        print(f"Job {job['id']} was running on dead worker {worker}, requeueing")
+        fail_job(job['id'], 'Worker process died', retry=True)
+
+def cleanup_orphans():
+    """Delete uploads and evaluated videos no job refers to any more."""
+    referenced = set()
+    for job in _execute('SELECT input_path, video_rel FROM jobs'):
+        if job['input_path']:
+            referenced.add(os.path.abspath(job['input_path']))
+        if job['video_rel']:
+            referenced.add(os.path.abspath(os.path.join(STATIC_DIR, job['video_rel'])))
+    for job in _execute('SELECT input_path FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)):
+        # Outputs of jobs still in flight are not recorded yet.
+        name = os.path.splitext(os.path.basename(job['input_path']))[0]
+        referenced.add(os.path.abspath(os.path.join(EVAL_DIR, f"{name}_eval.mp4")))
+        referenced.add(os.path.abspath(os.path.join(EVAL_DIR, f"web_{name}_eval.mp4")))
+
+    cutoff = time.time() - ORPHAN_AGE
+    for folder in (UPLOADS_DIR, EVAL_DIR):
+        if not os.path.isdir(folder):
+            continue
+        for entry in os.scandir(folder):
+            if (entry.is_file() and entry.stat().st_mtime < cutoff
+                    and os.path.abspath(entry.path) not in referenced):
+                print(f"Removing orphaned file {entry.path}")
+                os.remove(entry.path)
+
+
+# --- Worker ---
+class _Heartbeat:
+    """
+    Keeps a job's heartbeat fresh on a timer while a step runs, whether or
+    not it reports progress (WebM uploads often have no frame count).
+    Called with a 0-1 fraction it doubles as the progress callback.
+
+    With a `timeout`, progress calls raise TimeoutError past the deadline;
+    a step that doesn't reach one in time can't be interrupted in-process,
+    so the timer fails the job and exits the worker, and the pool starts
+    a new one.
+    """
+
+    def __init__(self, job_id, timeout=None):
+        self.job_id = job_id
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.fraction = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __call__(self, fraction):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise TimeoutError(f"Evaluation exceeded {self.timeout}s")
+        self.fraction = min(fraction, 0.99)
+
+    def _run(self):
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            # Leave a progress-reporting step a couple of beats to raise on its own.
+            if self.deadline is not None and time.monotonic() > self.deadline + 2 * HEARTBEAT_INTERVAL:
+                self._expire()
+            try:
+                heartbeat(self.job_id, self.fraction)
+            except sqlite3.Error as e:
+                print(f"Heartbeat for job {self.job_id} failed: {e}")
+
+    def _expire(self):
+        print(f"Job {self.job_id} timed out without reporting progress, stopping its worker")
+        job = get_job(self.job_id)
+        fail_job(self.job_id, f"Evaluation exceeded {self.timeout}s", retry=False)
+        JOBS_FINISHED.inc(test=job['test'] if job else '', outcome='timeout')
+        REGISTRY.dump()
+        os._exit(1)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def _transcode(raw_rel):
+    """Make a browser-friendly copy of the evaluated video; returns the path to serve."""
+    if not raw_rel.startswith('evaluated_videos/'):
+        raw_rel = f"evaluated_videos/{os.path.basename(raw_rel)}"
+    source = os.path.join(STATIC_DIR, raw_rel)
+    web_rel = f"evaluated_videos/web_{os.path.basename(raw_rel)}"
+    if os.path.exists(source) and convert_to_h264(source, os.path.join(STATIC_DIR, web_rel)):
+        return web_rel
+    return raw_rel
+
+def run_job(job, engine):
+    try:
+        with _Heartbeat(job['id'], JOB_TIMEOUT) as progress:
+            res = engine.evaluate(job['test'], job['input_path'], progress=progress)
+    except TimeoutError as e:
+        print(f"Job {job['id']} timed out")
+        fail_job(job['id'], str(e), retry=False)
+        JOBS_FINISHED.inc(test=job['test'], outcome='timeout')
+        return
+    except engine.EvalError as e:
+        print(f"Job {job['id']} failed: {e}")
+        fail_job(job['id'], str(e), retry=False)
+        JOBS_FINISHED.inc(test=job['test'], outcome='failed')
+        return
+    except Exception as e:
+        print(f"Job {job['id']} crashed: {e}")
+        fail_job(job['id'], str(e), retry=True)
+        JOBS_FINISHED.inc(test=job['test'], outcome='crashed')
+        return
+
+    for name, seconds in res.timings.items():
+        if name.endswith('_sec'):
+            VIDEO_STAGE_SECONDS.observe(seconds, test=res.test, stage=name[:-4])
+
+    summary = res.summary
+    raw_video = res.video.lstrip('/')
+    if raw_video and res.web_ready:
+        video_rel = raw_video
+    elif raw_video:
+        # Encoded with the mp4v fallback; make a browser-friendly copy if we can.
+        heartbeat(job['id'], 0.99)
+        with _Heartbeat(job['id']), VIDEO_STAGE_SECONDS.time(test=res.test, stage='transcode'):
+            video_rel = _transcode(raw_video)
+    else:
+        video_rel = f"uploads/{os.path.basename(job['input_path'])}"
+    finish_job(job['id'], summary, video_rel)
+    if raw_video:
+        web = video_rel != raw_video or res.web_ready
+        storage.record(video_rel, job['owner'], storage.WEB if web else storage.EVAL, job['id'])
+        storage.drop_intermediate(raw_video, video_rel)
+    JOBS_FINISHED.inc(test=job['test'], outcome='done')
+
+def worker_main(worker, parent_pid=None):
+    """Claim and run jobs until the parent pool goes away."""
+    # Imported here so the web tier can enqueue jobs without loading MediaPipe;
+    # each worker pays the import and graph build once, not per upload.
+    import eval_engine
+    print(f"Job worker {worker} started (pid {os.getpid()})")
+    while parent_pid is None or os.getppid() == parent_pid:
+        job = claim_next(worker)
+        if job is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+        print(f"Job worker {worker} running {job['id']} ({job['test']}, attempt {job['attempts'] + 1})")
+        run_job(job, eval_engine)
+        # Metrics from this process reach /metrics through METRICS_DIR.
+        REGISTRY.dump()
+
+
+# --- Pool ---
+class JobPool:
+    """
+    Keeps `size` worker processes alive and does the periodic housekeeping:
+    restarting dead workers, requeueing jobs whose worker crashed and
+    deleting orphaned files.
+    """
+
+    def __init__(self, size=JOB_WORKERS):
+        self.size = size
+        self._procs = {}
+        self._names = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None
+
+    def _spawn(self, slot):
+        worker = f"{os.uname().nodename}-{os.getpid()}-{slot}-{uuid.uuid4().hex[:6]}"
+        self._names[slot] = worker
+        self._procs[slot] = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--worker', worker, str(os.getpid())])
+
+    def _acquire(self):
+        lock_file = open(JOBS_LOCK, 'a+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.seek(0)
+            owner = lock_file.read().strip() or '?'
+            lock_file.close()
+            print(f"Job pool already running for {JOBS_DB} (pid {owner}), not starting another")
+            return False
+        lock_file.truncate(0)
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._lock_file = lock_file
+        return True
+
+    def start(self):
+        """Start the workers unless another pool owns JOBS_DB; returns whether this one does."""
+        if not self._acquire():
+            return False
+        init_db()
+        for slot in range(self.size):
+            self._spawn(slot)
+        self._thread = threading.Thread(target=self._supervise, daemon=True)
+        self._thread.start()
+        return True
+
+    def _supervise(self):
+        last_cleanup = 0.0
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            for slot, proc in list(self._procs.items()):
+                if proc.poll() is not None:
+                    print(f"Job worker {slot} exited with {proc.returncode}, restarting")
+                    requeue_worker_jobs(self._names[slot])
+                    self._spawn(slot)
+            try:
+                for worker in requeue_stale():
+                    # A hung worker can't be interrupted in-process; replace it.
+                    for slot, name in self._names.items():
+                        if name == worker:
+                            print(f"Job worker {slot} is unresponsive, killing it")
+                            self._procs[slot].kill()
+                if time.monotonic() - last_cleanup > ORPHAN_AGE / 4:
+                    cleanup_orphans()
+                    storage.enforce()
+                    last_cleanup = time.monotonic()
+            except Exception as e:
+                print(f"Job housekeeping failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        for proc in self._procs.values():
+            proc.terminate()
+        for proc in self._procs.values():
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the flock
+            self._lock_file = None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == '--worker':
+        init_db()
+        worker_main(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else None)
+    else:
+        pool = JobPool(max(JOB_WORKERS, 1))
+        if not pool.start():
+            sys.exit(1)
+        print(f"---- Job pool running with {pool.size} workers ----")
+        # Stop the workers on SIGTERM too (systemd, docker stop), not only on Ctrl-C.
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            while True:
+                time.sleep(3600)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            pool.stop()
@@ -0,0 +1,131 @@
+"""
+On-disk cache of per-frame video landmarks.
+
+Entries are (N, 33, 4) float32 .npy files named after a hash of the video
+bytes plus the sampling settings, so re-evaluating the same upload (a retry,
+a threshold change, another test type on the same clip) can score and render
+from the cached landmarks without running MediaPipe again. Hits are opened
+memory-mapped. Entries older than `max_age` are dropped, then the least
+recently used ones until the directory fits in `max_bytes`.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+LANDMARK_CACHE_DIR = os.environ.get('LANDMARK_CACHE_DIR', 'landmark_cache')
+LANDMARK_CACHE_MB = int(os.environ.get('LANDMARK_CACHE_MB', 512))
+LANDMARK_CACHE_DAYS = float(os.environ.get('LANDMARK_CACHE_DAYS', 7))
+# Bump when inference settings change so old entries stop matching.
+CACHE_VERSION = 1
+
+
+def video_digest(path, chunk_size=1 << 20):
+    """Hex digest of the file contents."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LandmarkCache:
+    """Directory of landmark arrays keyed by video content hash."""
+
+    def __init__(self, directory=LANDMARK_CACHE_DIR, max_bytes=LANDMARK_CACHE_MB << 20,
+                 max_age=LANDMARK_CACHE_DAYS * 86400):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, video_path, variant=''):
+        """Cache key for a video; `variant` tells apart settings that change the landmarks."""
+        return f"v{CACHE_VERSION}-{video_digest(video_path)}{'-' + variant if variant else ''}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key):
+        """Memory-mapped landmarks for `key`, or None."""
+        path = self._path(key)
+        try:
+            landmarks = np.load(path, mmap_mode='r')
+            os.utime(path)  # mtime doubles as last-used time for eviction
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return landmarks
+
+    def put(self, key, landmarks):
+        """Store landmarks atomically, then evict to stay within budget."""
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                np.save(f, np.ascontiguousarray(landmarks, dtype=np.float32))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Could not cache landmarks {key}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used until under max_bytes."""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                # Stray .tmp files from a crashed writer count as expired after an hour.
+                expired = now - st.st_mtime > (self.max_age if name.endswith('.npy') else 3600)
+                if expired:
+                    self._remove(path)
+                elif name.endswith('.npy'):
+                    entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        entries = size = 0
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                try:
+                    size += os.path.getsize(os.path.join(self.directory, name))
+                    entries += 1
+                except OSError:
+                    pass
+        return {'entries': entries, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
+
+def default_cache():
+    """A LandmarkCache in LANDMARK_CACHE_DIR, or None when LANDMARK_CACHE_MB is 0."""
+    if LANDMARK_CACHE_MB <= 0:
+        return None
+    return LandmarkCache()
@@ -0,0 +1,143 @@
+"""
+Shared MediaPipe landmark helpers.
+
+Landmarks are handled as float32 arrays of shape (..., 33, 4) holding
+x, y, z and visibility, so a single frame, a window of frames or a whole
+video can go through the same vectorized functions.
+"""
+import numpy as np
+
+NUM_LANDMARKS = 33
+
+# MediaPipe PoseLandmark indices used across the app.
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+# (a, b, c) landmark triplets; the angle is measured at b.
+JOINT_ANGLES = {
+    'left_elbow': (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    'right_elbow': (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    'left_shoulder': (LEFT_ELBOW, LEFT_SHOULDER, LEFT_HIP),
+    'right_shoulder': (RIGHT_ELBOW, RIGHT_SHOULDER, RIGHT_HIP),
+    'left_hip': (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    'right_hip': (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    'left_knee': (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    'right_knee': (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+}
+JOINT_NAMES = tuple(JOINT_ANGLES)
+JOINT_INDEX = {name: i for i, name in enumerate(JOINT_NAMES)}
+_JOINT_IDX = np.array([JOINT_ANGLES[name] for name in JOINT_NAMES])
+
+
+def landmarks_to_array(pose_landmarks, out=None):
+    """
+    MediaPipe landmark list -> (33, 4) float32 array, or None if there is no
+    pose. Fills `out` in place when given (e.g. a row of a LandmarkBuffer).
+    """
+    if not pose_landmarks:
+        return None
+    flat = np.fromiter((v for lm in pose_landmarks.landmark for v in (lm.x, lm.y, lm.z, lm.visibility)),
+                       dtype=np.float32, count=NUM_LANDMARKS * 4)
+    if out is None:
+        return flat.reshape(NUM_LANDMARKS, 4)
+    out[...] = flat.reshape(NUM_LANDMARKS, 4)
+    return out
+
+
+def joint_angles(kps, names=JOINT_NAMES):
+    """
+    Angles in degrees (0-180) at each named joint, for any leading shape:
+    (33, 2|4) -> (J,), (N, 33, 2|4) -> (N, J).
+    """
+    kps = np.asarray(kps, dtype=np.float32)
+    idx = _JOINT_IDX if names is JOINT_NAMES else np.array([JOINT_ANGLES[n] for n in names])
+    a = kps[..., idx[:, 0], :2]
+    b = kps[..., idx[:, 1], :2]
+    c = kps[..., idx[:, 2], :2]
+    radians = (np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0])
+               - np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0]))
+    angle = np.abs(np.degrees(radians))
+    return np.where(angle > 180, 360 - angle, angle)
+
+
+def square_pixels(kps, aspect):
+    """
+    Copy of (..., 33, k) landmarks with x multiplied by the frame's width /
+    height, so that x and y (fractions of different frame sides) share one
+    unit. `aspect` is a scalar or one value per leading row.
+    """
+    kps = np.array(kps, dtype=np.float32)
+    kps[..., 0] *= np.asarray(aspect, dtype=np.float32)[..., None]
+    return kps
+
+
+def normalize_keypoints(kps):
+    """Center on the hip midpoint and scale by torso length. Works on (..., 33, 2)."""
+    kps = np.asarray(kps, dtype=np.float32)
+    hips = (kps[..., LEFT_HIP, :] + kps[..., RIGHT_HIP, :]) / 2
+    shoulders = (kps[..., LEFT_SHOULDER, :] + kps[..., RIGHT_SHOULDER, :]) / 2
+    torso = np.linalg.norm(shoulders - hips, axis=-1)
+    torso = np.where(torso > 1e-6, torso, 1.0)
+    return (kps - hips[..., None, :]) / torso[..., None, None]
+
+
+def interpolate(a, b, steps):
+    """
+    Landmarks for `steps` evenly spaced frames strictly between a and b,
+    as a (steps, 33, 4) array. Nearest neighbour if either side is missing
+    (None rows are returned as NaN).
+    """
+    t = (np.arange(1, steps + 1, dtype=np.float32) / (steps + 1))[:, None, None]
+    if a is None and b is None:
+        return np.full((steps, NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    if a is None or b is None:
+        near_b = t >= 0.5
+        a = np.full_like(b, np.nan) if a is None else a
+        b = np.full_like(a, np.nan) if b is None else b
+        return np.where(near_b, b, a).astype(np.float32)
+    return (a + (b - a) * t).astype(np.float32)
+
+
+class LandmarkBuffer:
+    """
+    Growable, preallocated (N, 33, 4) float32 store of per-frame landmarks.
+    Frames without a pose are NaN rows; `valid` tells them apart.
+    """
+
+    def __init__(self, capacity=256):
+        self._data = np.full((max(1, capacity), NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def _reserve(self, extra):
+        need = self._len + extra
+        if need > len(self._data):
+            grown = np.full((max(need, 2 * len(self._data)), NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+            grown[:self._len] = self._data[:self._len]
+            self._data = grown
+
+    def append(self, kps):
+        """Append one frame's (33, 4) landmarks, or a NaN row for None."""
+        self._reserve(1)
+        self._data[self._len] = np.nan if kps is None else kps
+        self._len += 1
+
+    def extend(self, window):
+        """Append a (k, 33, 4) block of landmarks."""
+        self._reserve(len(window))
+        self._data[self._len:self._len + len(window)] = window
+        self._len += len(window)
+
+    @property
+    def array(self):
+        return self._data[:self._len]
+
+    @property
+    def valid(self):
+        return ~np.isnan(self._data[:self._len, :, 0]).any(axis=1)
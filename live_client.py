@@ -0,0 +1,128 @@
+"""
+Scripted client for the live pose WebSocket.
+
+    python live_client.py --user alice --password secret --pose tree \
+        --source static/images/tree.png --fps 15 --seconds 10
+
+Logs in over HTTP, opens /ws/compare_pose/<pose>, streams JPEG frames from
+an image or video file at the requested rate and prints a summary of the
+replies (latency, accuracy, frames dropped by the server).
+"""
+import argparse
+import http.cookiejar
+import json
+import threading
+import time
+import urllib.request
+
+import cv2
+from simple_websocket import Client, ConnectionClosed
+
+from live_protocol import decode_reply
+
+
+def login(base_url, username, password):
+    """Return a Cookie header value for an authenticated session."""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    req = urllib.request.Request(
+        f"{base_url}/login",
+        data=json.dumps({'username': username, 'password': password}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+    )
+    opener.open(req).read()
+    return '; '.join(f"{c.name}={c.value}" for c in jar)
+
+
+def load_frames(source, max_side=640, quality=80):
+    """JPEG-encode frames from an image or video file."""
+    frames = []
+    image = cv2.imread(source)
+    if image is not None:
+        images = [image]
+    else:
+        images = []
+        cap = cv2.VideoCapture(source)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            images.append(frame)
+        cap.release()
+    for img in images:
+        scale = max_side / max(img.shape[:2])
+        if scale < 1:
+            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ok:
+            frames.append(buf.tobytes())
+    if not frames:
+        raise SystemExit(f"No frames could be read from {source}")
+    return frames
+
+
+def stream(ws_url, cookie, frames, fps, seconds):
+    ws = Client.connect(ws_url, headers={'Cookie': cookie})
+    sent_at = {}
+    replies = []
+    done = threading.Event()
+
+    def reader():
+        try:
+            while not done.is_set():
+                data = ws.receive(timeout=1)
+                if data is None:
+                    continue
+                reply = decode_reply(data)
+                reply['latency_ms'] = (time.perf_counter() - sent_at[reply['seq']]) * 1000
+                replies.append(reply)
+        except ConnectionClosed:
+            pass
+
+    t = threading.Thread(target=reader, daemon=True)
+    t.start()
+    interval = 1.0 / fps
+    start = time.perf_counter()
+    seq = 0
+    while time.perf_counter() - start < seconds:
+        sent_at[seq] = time.perf_counter()
+        ws.send(frames[seq % len(frames)])
+        seq += 1
+        time.sleep(max(0.0, start + seq * interval - time.perf_counter()))
+    time.sleep(1.0)  # let the last replies arrive
+    done.set()
+    ws.close()
+    t.join(timeout=2)
+    return seq, replies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--user', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--pose', default='tree')
+    parser.add_argument('--source', default='static/images/tree.png')
+    parser.add_argument('--fps', type=float, default=15)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    cookie = login(args.url, args.user, args.password)
+    ws_url = args.url.replace('http', 'ws', 1) + f"/ws/compare_pose/{args.pose}"
+    sent, replies = stream(ws_url, cookie, load_frames(args.source), args.fps, args.seconds)
+
+    latencies = sorted(r['latency_ms'] for r in replies)
+    summary = {
+        'sent': sent,
+        'replies': len(replies),
+        'dropped_by_server': sum(r['dropped'] for r in replies),
+        'latency_ms_p50': latencies[len(latencies) // 2] if latencies else None,
+        'latency_ms_max': latencies[-1] if latencies else None,
+        'last_accuracy': replies[-1]['accuracy'] if replies else None,
+        'last_recognized': replies[-1]['recognized'] if replies else None,
+    }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
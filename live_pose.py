@@ -0,0 +1,103 @@
+import cv2
+import numpy as np
+
+from landmarks import landmarks_to_array
+from pose_pool import PosePool, PoolTimeout
+from live_sessions import LiveSessionManager
+from inference import InferenceBusy, FrameError
+from metrics import LIVE_STAGE_SECONDS, LIVE_ROI_FRAMES
+
+
+def run_inference(image_rgb, live, pool, reset=False):
+    """
+    Prefer the user's tracking session (the caller holds live.lock); fall
+    back to a stateless pooled graph.
+    """
+    results = live.process(image_rgb, reset) if live is not None else None
+    if results is None:
+        with pool.checkout() as pose_model:
+            results = pose_model.process(image_rgb)
+    return results
+
+
+def frame_landmarks(frame_bgr, live, pool, reset=False):
+    """(33, 4) landmarks of the person in a BGR frame, or None."""
+    with LIVE_STAGE_SECONDS.time(stage='color_convert'):
+        image_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+    with LIVE_STAGE_SECONDS.time(stage='inference'):
+        results = run_inference(image_rgb, live, pool, reset)
+    return landmarks_to_array(results.pose_landmarks)
+
+
+def decode_frame(data):
+    """Decode JPEG/PNG bytes to a BGR image, or None if they aren't an image."""
+    with LIVE_STAGE_SECONDS.time(stage='decode'):
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class LocalInference:
+    """
+    Landmark model in this process: warm stateless graphs plus per-user
+    tracking sessions. Same interface as inference.InferenceClient, and what
+    inference_server.py runs behind its socket.
+    """
+
+    def __init__(self, pool_size=None, max_sessions=None, **pose_kwargs):
+        self.pool = PosePool(size=pool_size, static_image_mode=True, **pose_kwargs)
+        self.sessions = LiveSessionManager(max_sessions=max_sessions, **pose_kwargs)
+
+    def landmarks(self, data, live_id=None):
+        """
+        (kps, aspect): (33, 4) landmarks of the person in JPEG/PNG bytes and
+        the frame's width / height, or (None, None) if nobody was found.
+        """
+        live = self.sessions.get(live_id) if live_id else None
+        try:
+            if live is None:
+                frame = decode_frame(data)
+                if frame is None:
+                    raise FrameError("Frame is not an image")
+                kps = frame_landmarks(frame, None, self.pool)
+            else:
+                # One frame at a time per session: the ROI state and the graph go together.
+                with live.lock:
+                    frame, kps = self._tracked_landmarks(data, live)
+        except PoolTimeout as e:
+            raise InferenceBusy(str(e)) from None
+        if kps is None:
+            return None, None
+        # A reduced decode keeps the aspect ratio.
+        return kps, frame.shape[1] / frame.shape[0]
+
+    def _tracked_landmarks(self, data, live):
+        """
+        (decoded frame, landmarks): decode and infer only the session's
+        region of interest; see frame_roi. The caller holds live.lock.
+        """
+        region = live.region
+        with LIVE_STAGE_SECONDS.time(stage='decode'):
+            frame, box = region.decode(data)
+        if frame is None:
+            raise FrameError("Frame is not an image")
+        # Tracking state from another region would point the graph at the wrong place.
+        kps = frame_landmarks(region.crop(frame, box), live, self.pool, reset=region.moved)
+        if kps is None and box is not None:
+            # Lost the person inside the crop: look at the whole frame, on a
+            # stateless graph since the tracking graph has already had this
+            # frame. The next frame is whole too, so region.moved resets it.
+            region.lost()
+            LIVE_ROI_FRAMES.inc(region='fallback')
+            box = None
+            kps = frame_landmarks(frame, None, self.pool)
+        LIVE_ROI_FRAMES.inc(region='roi' if box is not None else 'full')
+        return frame, region.update(kps, frame.shape, box)
+
+    def discard(self, live_id):
+        self.sessions.discard(live_id)
+
+    def stats(self):
+        return {'image_pool': self.pool.stats(), 'live_sessions': self.sessions.stats()}
+
+    def close(self):
+        self.sessions.close()
+        self.pool.close()
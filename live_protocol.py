@@ -0,0 +1,91 @@
+"""
+Binary reply format for the live pose WebSocket.
+
+The client sends each frame as one binary message containing JPEG bytes.
+Every processed frame gets one binary reply, little-endian:
+
+    uint8   version        (PROTOCOL_VERSION)
+    uint8   flags          (FLAG_* bits below)
+    uint8   accuracy       0-100
+    uint8   n_keypoints    0 or 33
+    uint32  seq            index of the processed frame on this connection
+    uint32  dropped        frames discarded since the previous reply
+    uint64  match_mask     bit i set when keypoint i is within tolerance
+    uint16  xy[n_keypoints][2]   coordinates clamped to [0, 1], scaled by 65535
+
+When FLAG_RECOGNIZED is set, the best-matching template follows:
+
+    uint8   recognized_accuracy  0-100
+    uint8   key_length
+    bytes   key                  UTF-8 pose key
+"""
+import struct
+
+import numpy as np
+
+PROTOCOL_VERSION = 1
+
+FLAG_POSE_DETECTED = 1
+FLAG_NO_TEMPLATE = 2
+# 4 is unused; the other bits keep their values for existing clients.
+FLAG_BUSY = 8
+FLAG_ERROR = 16
+FLAG_RECOGNIZED = 32
+
+HEADER = struct.Struct('<BBBBIIQ')
+_QUANT = 65535
+
+_STATUS_FLAGS = {
+    'no_template': FLAG_NO_TEMPLATE,
+}
+
+
+def encode_reply(result, seq, dropped, flags=0):
+    """
+    Pack a pose_matching.score_keypoints() result dict into the wire format.
+    Frames that got no landmarks (server busy, unreadable frame) are sent
+    as an empty result with FLAG_BUSY or FLAG_ERROR.
+    """
+    kps = result.get('user_keypoints')
+    kps = np.asarray(kps, dtype=np.float32) if len(kps) else np.empty((0, 2), np.float32)
+    if len(kps):
+        flags |= FLAG_POSE_DETECTED
+    flags |= _STATUS_FLAGS.get(result.get('status'), 0)
+
+    mask = 0
+    for i, matched in enumerate(result.get('matches') or ()):
+        if matched:
+            mask |= 1 << i
+
+    recognized = b''
+    if result.get('recognized'):
+        flags |= FLAG_RECOGNIZED
+        key = result['recognized'].encode('utf-8')[:255]
+        recognized = bytes((int(result.get('recognized_accuracy', 0)), len(key))) + key
+
+    coords = np.round(np.clip(kps, 0.0, 1.0) * _QUANT).astype('<u2')
+    header = HEADER.pack(PROTOCOL_VERSION, flags, int(result.get('accuracy', 0)), len(kps),
+                         seq & 0xFFFFFFFF, min(dropped, 0xFFFFFFFF), mask)
+    return header + coords.tobytes() + recognized
+
+
+def decode_reply(data):
+    version, flags, accuracy, n_kps, seq, dropped, mask = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version {version}")
+    coords = np.frombuffer(data, dtype='<u2', count=n_kps * 2, offset=HEADER.size)
+    recognized, recognized_accuracy = None, 0
+    if flags & FLAG_RECOGNIZED:
+        offset = HEADER.size + coords.nbytes
+        recognized_accuracy, length = data[offset], data[offset + 1]
+        recognized = bytes(data[offset + 2:offset + 2 + length]).decode('utf-8')
+    return {
+        'flags': flags,
+        'accuracy': accuracy,
+        'seq': seq,
+        'dropped': dropped,
+        'matches': [bool(mask >> i & 1) for i in range(n_kps)],
+        'user_keypoints': (coords.reshape(n_kps, 2).astype(np.float32) / _QUANT).tolist(),
+        'recognized': recognized,
+        'recognized_accuracy': recognized_accuracy,
+    }
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import mediapipe as mp
+
+from frame_roi import RegionTracker
+from metrics import LIVE_SESSION_EVICTIONS, LIVE_SESSION_FULL
+
+
+class LiveSession:
+    """
+    One user's continuous practice stream.
+
+    Holds a tracking-mode Pose graph so consecutive frames reuse the previous
+    landmarks as the search region instead of re-running person detection.
+    Frames are processed one at a time under `lock`. `region` picks the part
+    of the next frame worth decoding and running through the graph; it
+    belongs to the same frame, so it is only used under `lock` too.
+    """
+
+    def __init__(self, session_id, reset_after, pose_kwargs):
+        self.id = session_id
+        self.reset_after = reset_after
+        self.pose = mp.solutions.pose.Pose(static_image_mode=False, **pose_kwargs)
+        self.lock = threading.Lock()
+        self.region = RegionTracker()
+        self.last_seen = time.monotonic()
+        self.last_frame = None
+        self.frames = 0
+        self.resets = 0
+        self.closed = False
+
+    def process(self, image_rgb, reset=False):
+        """
+        Run the tracking graph; the caller holds `lock`. Returns None if the
+        session was evicted meanwhile. `reset` drops the tracking state
+        first, for an image that covers a different region than the previous one.
+        """
+        if self.closed:
+            return None
+        now = time.monotonic()
+        # After a long gap the person may have moved; the state is stale too.
+        if reset or self.last_frame is not None and now - self.last_frame > self.reset_after:
+            self.pose.reset()
+            self.resets += 1
+        self.last_frame = now
+        self.last_seen = now
+        self.frames += 1
+        return self.pose.process(image_rgb)
+
+    def close(self):
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.pose.close()
+
+
+class LiveSessionManager:
+    """
+    Per-worker table of LiveSessions keyed by a Flask session id.
+
+    Sessions idle for longer than `ttl` seconds are closed, and at most
+    `max_sessions` graphs are kept: when full, the least recently used
+    session idle for over `evict_after` seconds is evicted. Active sessions
+    are never evicted, so more active users than graphs don't rebuild a
+    graph per frame; get() returns None instead and the caller should fall
+    back to the stateless image pool.
+    """
+
+    def __init__(self, max_sessions=None, ttl=60.0, reset_after=2.0, evict_after=None, **pose_kwargs):
+        self.max_sessions = max_sessions or int(os.environ.get('LIVE_SESSION_LIMIT', 8))
+        self.ttl = ttl
+        self.reset_after = reset_after
+        self.evict_after = evict_after or float(os.environ.get('LIVE_SESSION_EVICT_AFTER', 5.0))
+        self.pose_kwargs = pose_kwargs
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.full = 0
+
+    def get(self, session_id):
+        with self._lock:
+            evicted = self._expire_locked()
+            live = self._sessions.get(session_id)
+            if live is not None:
+                self._sessions.move_to_end(session_id)
+                live.last_seen = time.monotonic()
+            elif len(self._sessions) >= self.max_sessions:
+                victim = self._pop_lru_idle_locked()
+                if victim is not None:
+                    evicted.append(victim)
+                else:
+                    self.full += 1
+                    LIVE_SESSION_FULL.inc()
+            create = live is None and len(self._sessions) < self.max_sessions
+        # Close graphs outside the table lock; closing waits for in-flight frames.
+        for old in evicted:
+            old.close()
+        if not create:
+            return live
+        # Building a graph takes a while; don't hold up other sessions' lookups.
+        new = LiveSession(session_id, self.reset_after, self.pose_kwargs)
+        with self._lock:
+            live = self._sessions.get(session_id)
+            if live is None and len(self._sessions) < self.max_sessions:
+                live = self._sessions[session_id] = new
+        if live is not new:
+            # Another request created this session first, or the table filled up meanwhile.
+            new.close()
+        return live
+
+    def discard(self, session_id):
+        with self._lock:
+            live = self._sessions.pop(session_id, None)
+        if live is not None:
+            live.close()
+
+    def _expire_locked(self):
+        cutoff = time.monotonic() - self.ttl
+        expired = [sid for sid, live in self._sessions.items() if live.last_seen < cutoff]
+        if expired:
+            LIVE_SESSION_EVICTIONS.inc(len(expired), reason='expired')
+        return [self._sessions.pop(sid) for sid in expired]
+
+    def _pop_lru_idle_locked(self):
+        cutoff = time.monotonic() - self.evict_after
+        for sid, live in self._sessions.items():
+            if live.last_seen >= cutoff:
+                break  # LRU order: everything after this was used more recently
+            if not live.lock.locked():
+                self.evictions += 1
+                LIVE_SESSION_EVICTIONS.inc(reason='idle')
+                return self._sessions.pop(sid)
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'evictions': self.evictions,
+                'full': self.full,
+            }
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for live in sessions:
+            live.close()
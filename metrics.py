@@ -0,0 +1,266 @@
+"""
+In-process timing histograms and counters, exposed in the Prometheus text
+format by /metrics.
+
+Metrics live in the process that records them. Every process dump()s a
+snapshot into METRICS_DIR (web workers every DUMP_INTERVAL seconds, job
+workers after each job, the inference server every few seconds), and
+whichever web worker answers /metrics merges all of them with its own live
+numbers, so a scrape sees the same totals whichever worker it hits.
+Snapshots of processes that have exited are folded into one archive file
+rather than dropped, so counters never go backwards.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+METRICS_DIR = os.environ.get('METRICS_DIR', 'metrics')
+DUMP_INTERVAL = float(os.environ.get('METRICS_DUMP_INTERVAL', 5.0))
+_ARCHIVE = 'exited.json'
+_SNAPSHOT_NAME = re.compile(r'(\d+)(-[0-9a-f]+)?\.json$')
+
+# Joins label values into snapshot keys, which have to survive JSON.
+_SEP = '|'
+# Seconds; covers a single live-frame stage up to a whole video.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, one series per label combination."""
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}   # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return {_SEP.join(key): list(series) for key, series in self._series.items()}
+
+    def render(self, snapshots):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(_merge(snapshots).items()):
+            labels = _labels(self.labels, key)
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, series[:len(self.buckets)] + [series[-1]]):
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{{{labels + ',' + le if labels else le}}} {count}")
+            suffix = f"{{{labels}}}" if labels else ''
+            lines.append(f"{self.name}_sum{suffix} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{suffix} {series[-1]}")
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {_SEP.join(key): [value] for key, value in self._values.items()}
+
+    def render(self, snapshots):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, (value,) in sorted(_merge(snapshots).items()):
+            labels = _labels(self.labels, key)
+            lines.append(f"{self.name}{{{labels}}} {value}" if labels else f"{self.name} {value}")
+        return lines
+
+
+def _merge(snapshots):
+    merged = {}
+    for snap in snapshots:
+        for key, values in snap.items():
+            if key in merged:
+                merged[key] = [a + b for a, b in zip(merged[key], values)]
+            else:
+                merged[key] = list(values)
+    return merged
+
+
+def _labels(names, key):
+    values = key.split(_SEP) if names else []
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = {}
+        self._snapshot_file = None   # (pid, file name)
+        self._dumper_pid = None
+        self._dumper_lock = threading.Lock()
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def _own_file(self):
+        pid = os.getpid()
+        if self._snapshot_file is None or self._snapshot_file[0] != pid:
+            # Unique per process, so one that reuses a dead pid can't overwrite its counts.
+            self._snapshot_file = (pid, f"{pid}-{uuid.uuid4().hex[:8]}.json")
+        return self._snapshot_file[1]
+
+    def dump(self, directory=METRICS_DIR):
+        """Write this process's snapshot for the web workers to merge."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self._own_file())
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def dump_periodically(self, interval=DUMP_INTERVAL, directory=METRICS_DIR):
+        """dump() every `interval` seconds and at exit, from a thread started once per process."""
+        if self._dumper_pid == os.getpid():
+            return
+        with self._dumper_lock:
+            if self._dumper_pid == os.getpid():
+                return
+            self._dumper_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.dump(directory)
+                except OSError as e:
+                    print(f"Could not dump metrics: {e}")
+
+        threading.Thread(target=run, name='metrics-dump', daemon=True).start()
+        atexit.register(self.dump, directory)
+
+    def _dumped(self, directory):
+        """
+        Every other process's snapshot. Those of processes that have exited
+        are first folded into the archive and deleted; the lock keeps
+        concurrent scrapes from counting one twice.
+        """
+        if not os.path.isdir(directory):
+            return []
+        own = self._own_file()
+        archive = os.path.join(directory, _ARCHIVE)
+        with open(os.path.join(directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            live, exited = [], []
+            for path in glob.glob(os.path.join(directory, '*.json')):
+                match = _SNAPSHOT_NAME.match(os.path.basename(path))
+                if match is None or os.path.basename(path) == own:
+                    continue
+                (live if _alive(int(match.group(1))) else exited).append(path)
+            archived = _load(archive)
+            if exited:
+                snapshots = [snap for snap in [archived] + [_load(path) for path in exited] if snap is not None]
+                names = {name for snap in snapshots for name in snap}
+                archived = {name: _merge([snap.get(name, {}) for snap in snapshots]) for name in names}
+                tmp = f"{archive}.tmp"
+                with open(tmp, 'w') as f:
+                    json.dump(archived, f)
+                os.replace(tmp, archive)
+                for path in exited:
+                    os.remove(path)
+            snapshots = [_load(path) for path in live]
+        return [snap for snap in [archived] + snapshots if snap is not None]
+
+    def render(self, directory=METRICS_DIR):
+        """Prometheus text exposition of this process plus every dumped snapshot."""
+        snapshots = [self.snapshot()] + self._dumped(directory)
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.extend(metric.render([snap.get(name, {}) for snap in snapshots]))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+LIVE_STAGE_SECONDS = REGISTRY.histogram(
+    'live_stage_seconds', 'Time per live frame in each comparison stage.', ('stage',))
+LIVE_ROI_FRAMES = REGISTRY.counter(
+    'live_roi_frames_total', 'Live frames inferred on a cropped region, the full frame, or retried full.',
+    ('region',))
+LIVE_SESSION_EVICTIONS = REGISTRY.counter(
+    'live_session_evictions_total', 'Tracking sessions closed after the TTL, or to make room for another user.',
+    ('reason',))
+LIVE_SESSION_FULL = REGISTRY.counter(
+    'live_session_full_total', 'Live frames run statelessly because every tracking session was in use.')
+VIDEO_STAGE_SECONDS = REGISTRY.histogram(
+    'video_stage_seconds', 'Busy time per evaluated video in each pipeline stage.', ('test', 'stage'))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_seconds', 'HTTP request latency by route.', ('route', 'method'))
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'HTTP requests by route and status.', ('route', 'method', 'status'))
+PASSWORD_SECONDS = REGISTRY.histogram(
+    'password_seconds', 'bcrypt hash/verify time including queueing.', ('op',))
+INFERENCE_BATCH_SIZE = REGISTRY.histogram(
+    'inference_batch_size', 'Frames per inference server dispatch.', (), (1, 2, 4, 8, 16, 32, 64))
+JOBS_FINISHED = REGISTRY.counter(
+    'eval_jobs_total', 'Evaluation jobs by test and outcome.', ('test', 'outcome'))
@@ -0,0 +1,82 @@
+"""
+bcrypt hashing off the request path, with bounded concurrency.
+
+bcrypt is deliberately slow (hundreds of ms at cost 12) and releases the GIL,
+so PasswordHasher runs it on a small dedicated thread pool. At most
+`workers` hashes burn CPU at once, however many logins arrive, which leaves
+cores for /compare_pose. Callers beyond `workers + max_pending` get
+HasherBusy right away instead of queueing without bound.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+from metrics import PASSWORD_SECONDS
+
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS', 2))
+PASSWORD_QUEUE = int(os.environ.get('PASSWORD_QUEUE', 16))
+
+
+class HasherBusy(Exception):
+    """Too many hashes are queued; the caller should answer 503."""
+
+
+def hash_rounds(hashed):
+    """Cost factor of a bcrypt hash ($2b$<rounds>$...), or None if unparseable."""
+    try:
+        return int(hashed.split(b'$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on `workers` threads at the configured cost."""
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=PASSWORD_WORKERS, max_pending=PASSWORD_QUEUE,
+                 timeout=30.0):
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self.rejected = 0
+
+    def _run(self, op, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy("Too many password operations in flight")
+        t0 = time.perf_counter()
+        future = self._executor.submit(fn, *args)
+        # The slot is freed when the work finishes, even if we stop waiting for it.
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy("Password operation timed out") from None
+        PASSWORD_SECONDS.observe(time.perf_counter() - t0, op=op)
+        return result
+
+    def hash(self, password):
+        return self._run('hash', lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)))
+
+    def verify(self, password, hashed):
+        """
+        Returns (ok, new_hash). new_hash is a fresh hash at the current cost
+        when the password matched a hash made with a different one, else None.
+        """
+        if isinstance(hashed, str):
+            hashed = hashed.encode('utf-8')
+
+        def check():
+            if not bcrypt.checkpw(password.encode('utf-8'), hashed):
+                return False, None
+            if hash_rounds(hashed) == self.rounds:
+                return True, None
+            return True, bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return self._run('verify', check)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
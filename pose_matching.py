@@ -0,0 +1,124 @@
+"""
+Vectorized scoring of one user's landmarks against every ideal-pose template.
+
+Both sides are first put in square pixels (x scaled by the frame's width /
+height), so a pose scores the same in portrait and landscape, then
+normalized (hip-centred, torso-scaled) so the score does not depend on
+where the user stands or how far they are from the camera.
+The user is then rotated onto each template with a visibility-weighted 2D
+Procrustes fit, capped at MAX_ROTATION so a mirrored or upside-down body is
+not mistaken for the pose. Occluded keypoints carry no weight: they neither
+match nor count against the user.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from landmarks import normalize_keypoints, square_pixels
+
+# Max distance, in torso lengths after alignment, for a keypoint to count as matched.
+MATCH_TOLERANCE = 0.3
+MAX_ROTATION = np.radians(30)
+MIN_VISIBILITY = 0.5
+# Pose key that scores against whichever template the user matches best.
+AUTO_POSE = 'auto'
+
+# keys: template keys, accuracy: (T,) 0-100, matches: (T, 33) bool,
+# distance: (T,) visibility-weighted mean keypoint distance in torso lengths.
+PoseScores = namedtuple('PoseScores', 'keys accuracy matches distance')
+
+
+def best_index(scores):
+    """Index of the best-matching template (highest accuracy, then closest), or None."""
+    if not len(scores.keys):
+        return None
+    return int(np.lexsort((scores.distance, -scores.accuracy))[0])
+
+
+class PoseMatcher:
+    """
+    Scores a frame against a fixed stack of (R, 33, 2) normalized templates
+    (square_pixels() applied before normalizing) in one pass. `keys` names the pose of each row; a pose with several
+    reference rows is scored by whichever reference matches best.
+    """
+
+    def __init__(self, keys, normalized):
+        self.keys = tuple(dict.fromkeys(keys))
+        self.templates = normalized
+        self._index = {key: i for i, key in enumerate(self.keys)}
+        # Row -> pose index, or None when every pose has exactly one row.
+        self._pose_of = np.array([self._index[key] for key in keys], dtype=np.intp) \
+            if len(self.keys) != len(keys) else None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def index(self, key):
+        return self._index.get(key)
+
+    def score(self, kps, aspect=1.0):
+        """
+        (33, 4) user landmarks (x, y, z, visibility) from a frame of width /
+        height `aspect` -> PoseScores against every template.
+        """
+        xy = normalize_keypoints(square_pixels(kps[:, :2], aspect))
+        weight = np.clip(kps[:, 3], 0.0, 1.0)
+        weight = np.where(weight >= MIN_VISIBILITY, weight, 0.0)
+        if weight.sum() <= 0:
+            weight = np.ones_like(weight)
+        tx, ty = self.templates[..., 0], self.templates[..., 1]
+        ux, uy = xy[:, 0], xy[:, 1]
+
+        # Weighted least-squares rotation of the user onto each template.
+        cross = (ux * ty - uy * tx) @ weight
+        dot = (ux * tx + uy * ty) @ weight
+        theta = np.clip(np.arctan2(cross, dot), -MAX_ROTATION, MAX_ROTATION)[:, None]
+        cos, sin = np.cos(theta), np.sin(theta)
+        dist = np.hypot(cos * ux - sin * uy - tx, sin * ux + cos * uy - ty)
+
+        total = weight.sum()
+        matches = (dist < MATCH_TOLERANCE) & (weight > 0)
+        accuracy = 100 * (matches @ weight) / total
+        distance = (dist @ weight) / total
+        if self._pose_of is not None:
+            # Best reference per pose: sort rows by pose, then accuracy, then distance.
+            order = np.lexsort((distance, -accuracy, self._pose_of))
+            best = order[np.unique(self._pose_of[order], return_index=True)[1]]
+            accuracy, matches, distance = accuracy[best], matches[best], distance[best]
+        return PoseScores(self.keys, accuracy, matches, distance)
+
+
+def score_keypoints(kps, pose_key, matcher, aspect=1.0):
+    """
+    Score (33, 4) landmarks, or None when nobody was detected, against every
+    template in `matcher` at once. `aspect` is the frame's width / height.
+
+    `pose_key` picks the template reported in matches and accuracy;
+    AUTO_POSE picks the best-matching one. Returns a dict with status,
+    feedback, matches (list of bools), user_keypoints ((33, 2) array, or []
+    when nothing was detected), accuracy (0-100) and recognized /
+    recognized_accuracy for the best-matching template (None / 0 if none).
+    """
+    if kps is None:
+        return {'status': 'no_pose', 'feedback': 'No pose detected', 'matches': [], 'user_keypoints': [],
+                'accuracy': 0, 'recognized': None, 'recognized_accuracy': 0}
+
+    user_keypoints = kps[:, :2]
+    scores = matcher.score(kps, aspect)
+    best = best_index(scores)
+    recognized = {'recognized': scores.keys[best] if best is not None else None,
+                  'recognized_accuracy': int(scores.accuracy[best]) if best is not None else 0}
+
+    index = best if pose_key == AUTO_POSE else matcher.index(pose_key)
+    if index is None:
+        # user_keypoints are still returned so the overlay doesn't blink.
+        return {'status': 'no_template', 'feedback': 'Ideal pose keypoints not found', 'matches': [],
+                'user_keypoints': user_keypoints, 'accuracy': 0, **recognized}
+
+    matches = scores.matches[index].tolist()
+    accuracy = int(scores.accuracy[index])
+    feedback = f"Accuracy: {accuracy}%" + (" - Great job!" if accuracy == 100 else " - Keep adjusting!")
+    if pose_key == AUTO_POSE:
+        feedback = f"{scores.keys[index]}: {feedback}"
+    return {'status': 'ok', 'feedback': feedback, 'matches': matches, 'user_keypoints': user_keypoints,
+            'accuracy': accuracy, **recognized}
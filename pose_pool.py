@@ -0,0 +1,133 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import mediapipe as mp
+
+
+class PoolTimeout(Exception):
+    """Raised when no Pose instance becomes free within the wait budget."""
+
+
+class PosePool:
+    """
+    Fixed-size pool of warm MediaPipe Pose graphs.
+
+    Building a Pose graph loads the model and allocates native buffers, so
+    instances are created once and handed out with checkout(). Callers must
+    give them back (the context manager does this) and close() releases the
+    native resources on shutdown.
+    """
+
+    def __init__(self, size=None, timeout=5.0, **pose_kwargs):
+        self.size = size or default_pool_size()
+        self.timeout = timeout
+        self.pose_kwargs = pose_kwargs
+        self._free = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._busy_total = 0.0
+        self._started = time.monotonic()
+
+    def _create(self):
+        return mp.solutions.pose.Pose(**self.pose_kwargs)
+
+    def _acquire(self, timeout):
+        # Lazily grow up to `size` so idle workers don't pay for unused graphs.
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PosePool is closed")
+            if len(self._all) < self.size:
+                instance = self._create()
+                self._all.append(instance)
+                return instance
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No Pose instance free after {timeout:.1f}s")
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        wait_start = time.monotonic()
+        try:
+            instance = self._acquire(timeout)
+        except PoolTimeout:
+            with self._lock:
+                self._timeouts += 1
+            raise
+        waited = time.monotonic() - wait_start
+
+        with self._lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+        busy_start = time.monotonic()
+        try:
+            yield instance
+        finally:
+            busy = time.monotonic() - busy_start
+            with self._lock:
+                self._in_use -= 1
+                self._busy_total += busy
+                closed = self._closed
+            if closed:
+                instance.close()
+            else:
+                self._free.put(instance)
+
+    def stats(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            return {
+                'size': self.size,
+                'created': len(self._all),
+                'in_use': self._in_use,
+                'peak_in_use': self._peak_in_use,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'wait_avg_ms': (self._wait_total / self._checkouts * 1000) if self._checkouts else 0.0,
+                'wait_max_ms': self._wait_max * 1000,
+                'utilization': self._busy_total / (elapsed * self.size),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        while True:
+            try:
+                instance = self._free.get_nowait()
+            except queue.Empty:
+                break
+            instance.close()
+
+
+def default_pool_size():
+    """POSE_POOL_SIZE, or one graph per CPU this worker may use."""
+    env = os.environ.get('POSE_POOL_SIZE')
+    if env:
+        return max(1, int(env))
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, cpus)
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from landmarks import joint_angles, normalize_keypoints, square_pixels
+from pose_matching import PoseMatcher
+
+# keypoints as extracted (fractions of the image sides); normalized and angles
+# are computed in square pixels; aspect is the image's width / height.
+PoseTemplate = namedtuple('PoseTemplate', 'key name image keypoints normalized angles aspect')
+
+# Packed templates written by template_builder.py: one row per reference
+# image, several rows may share a pose key. aspect is the image's width / height.
+TEMPLATE_PACK = 'templates.npy'
+TEMPLATE_DTYPE = np.dtype([('key', 'U32'), ('source', 'U96'), ('digest', 'S16'), ('aspect', '<f4'),
+                           ('keypoints', '<f4', (33, 4))])
+# Packs written before the aspect ratio was recorded.
+_TEMPLATE_DTYPE_V1 = np.dtype([('key', 'U32'), ('source', 'U96'), ('digest', 'S16'), ('keypoints', '<f4', (33, 4))])
+
+
+def load_pack(path):
+    """
+    Structured TEMPLATE_DTYPE array from a template pack (one read), or None
+    if unusable. Older packs load with aspect 0 (unknown).
+    """
+    try:
+        pack = np.load(path, allow_pickle=False)
+    except (OSError, ValueError) as e:
+        print(f"Could not load template pack {path}: {e}")
+        return None
+    if pack.dtype == _TEMPLATE_DTYPE_V1:
+        upgraded = np.zeros(len(pack), dtype=TEMPLATE_DTYPE)
+        for name in pack.dtype.names:
+            upgraded[name] = pack[name]
+        return upgraded
+    if pack.dtype != TEMPLATE_DTYPE:
+        print(f"Ignoring template pack {path}: unexpected dtype {pack.dtype}")
+        return None
+    return pack
+
+
+class _Snapshot:
+    def __init__(self, templates, keypoints, matcher, mtimes):
+        self.templates = templates
+        self.keypoints = keypoints
+        self.matcher = matcher
+        self.mtimes = mtimes
+
+
+class PoseRegistry:
+    """
+    Ideal-pose templates loaded once and kept in memory.
+
+    Templates come from the TEMPLATE_PACK in `template_dir` (every reference
+    image of every pose, in one file), plus a legacy <key>.npy for any pose
+    the pack doesn't have. All reference keypoints live in one
+    contiguous (R, 33, 2) array; each PoseTemplate holds read-only views of
+    its pose's first reference plus precomputed features, and the
+    normalized stack backs a PoseMatcher that scores each pose by its
+    best-matching reference. Only poses in `poses` are loaded: pack rows
+    for other keys are ignored, since the app has no page for them.
+    Keypoints are fractions of their image's width and height, so each
+    reference is matched in square pixels using its image's aspect ratio:
+    from the pack, or for legacy templates (and packs that predate it) read
+    from the picture in `image_dir`; rebuilding the pack avoids that.
+    The template directory is re-scanned at most every `reload_interval`
+    seconds and the whole snapshot is swapped if any .npy file changed,
+    so requests never see a half-loaded registry.
+    """
+
+    def __init__(self, poses, template_dir, reload_interval=2.0, image_dir=None):
+        self.poses = {p['key']: p for p in poses}
+        self.template_dir = template_dir
+        self.image_dir = image_dir or os.path.join(os.path.dirname(template_dir), 'images')
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._snapshot = self._load(self._scan())
+
+    def _scan(self):
+        mtimes = {}
+        for name in [TEMPLATE_PACK] + [f'{key}.npy' for key in self.poses]:
+            try:
+                mtimes[name] = os.stat(os.path.join(self.template_dir, name)).st_mtime_ns
+            except OSError:
+                pass
+        return mtimes
+
+    def _image_aspect(self, name):
+        """Width / height of a picture in image_dir, or 1.0 if it can't be read."""
+        # Pillow reads only the header; web workers don't need OpenCV for this.
+        from PIL import Image
+        path = os.path.join(self.image_dir, name)
+        try:
+            with Image.open(path) as image:
+                width, height = image.size
+        except OSError:
+            print(f"No image {name} in {self.image_dir}; matching its template without aspect correction")
+            return 1.0
+        return width / height
+
+    def _load_pack(self):
+        pack = load_pack(os.path.join(self.template_dir, TEMPLATE_PACK))
+        if pack is None:
+            return []
+        unknown = sorted(set(str(key) for key in pack['key']) - set(self.poses))
+        if unknown:
+            print(f"Ignoring templates for unknown poses: {', '.join(unknown)}")
+            pack = pack[~np.isin(pack['key'], unknown)]
+        return [(str(row['key']), row['keypoints'][:, :2], float(row['aspect']) or self._image_aspect(str(row['source'])))
+                for row in pack]
+
+    def _load(self, mtimes):
+        loaded = self._load_pack() if TEMPLATE_PACK in mtimes else []
+        packed = {key for key, _, _ in loaded}
+        legacy = [key for key in self.poses if key not in packed and f'{key}.npy' in mtimes]
+        for key in legacy:
+            try:
+                kps = np.load(os.path.join(self.template_dir, f'{key}.npy'))
+            except (OSError, ValueError) as e:
+                print(f"Could not load template for {key}: {e}")
+                continue
+            if kps.shape != (33, 2):
+                print(f"Ignoring template for {key}: unexpected shape {kps.shape}")
+                continue
+            image = os.path.basename(self.poses[key]['image'])
+            loaded.append((key, kps, self._image_aspect(image)))
+
+        keypoints = np.ascontiguousarray(np.stack([kps for _, kps, _ in loaded]) if loaded
+                                         else np.empty((0, 33, 2)), dtype=np.float32)
+        aspects = np.array([aspect for _, _, aspect in loaded], dtype=np.float32)
+        square = square_pixels(keypoints, aspects)
+        normalized = normalize_keypoints(square)
+        angles = joint_angles(square)
+        for arr in (keypoints, normalized, angles):
+            arr.flags.writeable = False
+
+        templates = {}
+        for i, (key, _, _) in enumerate(loaded):
+            if key in templates:
+                continue
+            meta = self.poses[key]
+            templates[key] = PoseTemplate(key, meta['name'], meta['image'],
+                                          keypoints[i], normalized[i], angles[i], float(aspects[i]))
+        matcher = PoseMatcher([key for key, _, _ in loaded], normalized)
+        return _Snapshot(templates, keypoints, matcher, mtimes)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._last_check < self.reload_interval:
+                return
+            self._last_check = now
+            mtimes = self._scan()
+            if mtimes != self._snapshot.mtimes:
+                print("Ideal pose templates changed on disk, reloading")
+                self._snapshot = self._load(mtimes)
+
+    def pose(self, key):
+        """Display metadata for a pose, whether or not its template exists."""
+        return self.poses.get(key)
+
+    def template(self, key):
+        """The pose's first reference."""
+        self._maybe_reload()
+        return self._snapshot.templates.get(key)
+
+    def matcher(self):
+        """PoseMatcher over every loaded template, for scoring a frame against all of them."""
+        self._maybe_reload()
+        return self._snapshot.matcher
@@ -0,0 +1,70 @@
+"""
+Startup cost of a web worker: how long each import phase took and how much
+resident memory it added, and whether the vision stack (cv2, mediapipe,
+numpy) has been loaded yet. app.py records its phases here, prints the
+report once it is imported and serves it at /stats/startup, so import time
+and per-worker RSS can be compared with VISION_PRELOAD on and off.
+"""
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+VISION_MODULES = ('cv2', 'mediapipe', 'numpy')
+
+
+def rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current, but the best that's portable (KB on Linux, bytes on macOS).
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StartupReport:
+    """Phases are either marked (time since the previous mark) or timed with phase()."""
+
+    def __init__(self):
+        self._last = time.perf_counter()
+        self._last_rss = rss_bytes()
+        self.phases = []
+
+    def _add(self, name, seconds, rss_delta):
+        self.phases.append({'phase': name, 'pid': os.getpid(), 'ms': round(seconds * 1000, 1),
+                            'rss_delta_mb': round(rss_delta / 2**20, 1)})
+
+    def mark(self, name):
+        now, rss = time.perf_counter(), rss_bytes()
+        self._add(name, now - self._last, rss - self._last_rss)
+        self._last, self._last_rss = now, rss
+
+    @contextmanager
+    def phase(self, name):
+        t0, rss0 = time.perf_counter(), rss_bytes()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - t0, rss_bytes() - rss0)
+
+    def as_dict(self):
+        return {
+            'pid': os.getpid(),
+            'rss_mb': round(rss_bytes() / 2**20, 1),
+            'vision_loaded': {name: name in sys.modules for name in VISION_MODULES},
+            'phases': list(self.phases),
+        }
+
+    def log(self):
+        report = self.as_dict()
+        phases = ', '.join(f"{p['phase']} {p['ms']:.0f}ms/{p['rss_delta_mb']:+.1f}MB" for p in report['phases'])
+        loaded = [name for name, yes in report['vision_loaded'].items() if yes] or ['none']
+        print(f"Startup (pid {report['pid']}): {phases}; RSS {report['rss_mb']:.1f}MB; "
+              f"vision modules: {', '.join(loaded)}")
+
+
+# Created on first import, i.e. when app.py starts importing.
+STARTUP = StartupReport()
@@ -0,0 +1,149 @@
+"""
+Lifecycle of uploaded and evaluated videos under static/.
+
+Every file a job produces or consumes is a row in the artifacts table (in
+the jobs database): owner, kind, size, creation and last access. enforce()
+runs from the job pool's housekeeping loop and deletes, in order: artifacts
+not accessed for STORAGE_TTL_DAYS, each user's least recently used files
+beyond STORAGE_USER_MB, and everyone's least recently used files beyond
+STORAGE_TOTAL_MB. Files of queued or running jobs are never touched. When a
+job's result video goes, the job keeps its summary but loses the video link.
+
+Videos are served by app.py's /videos route (HTTP ranges, ETags and cache
+headers) so last access is recorded.
+"""
+import os
+import time
+
+from db_pool import SQLitePool
+
+STORAGE_DB = os.environ.get('JOBS_DB', 'jobs.db')
+STATIC_DIR = 'static'
+TTL = float(os.environ.get('STORAGE_TTL_DAYS', 30)) * 86400
+USER_QUOTA = int(os.environ.get('STORAGE_USER_MB', 1024)) << 20
+TOTAL_QUOTA = int(os.environ.get('STORAGE_TOTAL_MB', 20 * 1024)) << 20
+# Range requests arrive many per playback; record an access at most this often.
+TOUCH_INTERVAL = 300.0
+
+UPLOAD, EVAL, WEB = 'upload', 'eval', 'web'
+
+_db = None
+
+
+def _execute(query, args=(), one=False):
+    global _db
+    if _db is None:
+        _db = SQLitePool(STORAGE_DB)
+    return _db.execute(query, args, one)
+
+
+def init_db():
+    _execute('''CREATE TABLE IF NOT EXISTS artifacts (
+        path TEXT PRIMARY KEY,
+        owner TEXT,
+        kind TEXT,
+        job_id TEXT,
+        size INTEGER,
+        created REAL,
+        last_access REAL
+    )''')
+    _execute('CREATE INDEX IF NOT EXISTS artifacts_owner ON artifacts(owner, last_access)')
+    _execute('CREATE INDEX IF NOT EXISTS artifacts_access ON artifacts(last_access)')
+
+
+def relative(path):
+    """Path relative to static/, as stored in the table and used in URLs."""
+    return os.path.relpath(os.path.abspath(path), os.path.abspath(STATIC_DIR)).replace(os.sep, '/')
+
+
+def record(rel, owner, kind, job_id=None):
+    """Start tracking a file under static/ (or refresh its size)."""
+    try:
+        size = os.path.getsize(os.path.join(STATIC_DIR, rel))
+    except OSError:
+        return
+    now = time.time()
+    _execute('''INSERT INTO artifacts(path, owner, kind, job_id, size, created, last_access)
+                VALUES (?,?,?,?,?,?,?)
+                ON CONFLICT(path) DO UPDATE SET size=excluded.size, last_access=excluded.last_access''',
+             (rel, owner, kind, job_id, size, now, now))
+
+
+def lookup(rel):
+    """(path, owner, kind, job_id, size, last_access) of a tracked file, or None."""
+    row = _execute('SELECT path, owner, kind, job_id, size, last_access FROM artifacts WHERE path=?',
+                   (rel,), one=True)
+    if row is None:
+        # Files from before tracking started: adopt them if a job still points at them.
+        job = _execute('SELECT id, owner FROM jobs WHERE video_rel=?', (rel,), one=True)
+        if job is not None:
+            record(rel, job[1], UPLOAD if rel.startswith('uploads/') else EVAL, job[0])
+            row = _execute('SELECT path, owner, kind, job_id, size, last_access FROM artifacts WHERE path=?',
+                           (rel,), one=True)
+    return row
+
+
+def touch(rel, last_access):
+    now = time.time()
+    if now - (last_access or 0) > TOUCH_INTERVAL:
+        _execute('UPDATE artifacts SET last_access=? WHERE path=?', (now, rel))
+
+
+def _remove(rel, reason):
+    print(f"Removing {rel} ({reason})")
+    try:
+        os.remove(os.path.join(STATIC_DIR, rel))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Could not remove {rel}: {e}")
+        return 0
+    _execute('DELETE FROM artifacts WHERE path=?', (rel,))
+    _execute('UPDATE jobs SET video_rel=NULL WHERE video_rel=?', (rel,))
+    return 1
+
+
+def drop_intermediate(raw_rel, web_rel):
+    """Delete the pre-transcode video once its browser-ready copy exists."""
+    if raw_rel != web_rel and os.path.exists(os.path.join(STATIC_DIR, web_rel)):
+        _remove(raw_rel, 'superseded by web copy')
+
+
+# Artifacts that may be evicted: not an input or output of a job still in flight.
+_EVICTABLE = '''SELECT path, owner, size, last_access FROM artifacts
+    WHERE job_id IS NULL OR job_id NOT IN (SELECT id FROM jobs WHERE status IN ('queued', 'running'))'''
+
+
+def enforce(ttl=TTL, user_quota=USER_QUOTA, total_quota=TOTAL_QUOTA):
+    """Apply TTL, then per-user and total LRU quotas. Returns the number of files removed."""
+    removed = 0
+    rows = _execute(_EVICTABLE + ' ORDER BY last_access')
+    cutoff = time.time() - ttl
+    alive = []
+    for path, owner, size, last_access in rows:
+        if last_access < cutoff:
+            removed += _remove(path, 'expired')
+        else:
+            alive.append((path, owner, size))
+
+    usage = {}
+    for owner, size in _execute('SELECT owner, SUM(size) FROM artifacts GROUP BY owner'):
+        usage[owner] = size or 0
+    total = sum(usage.values())
+    for path, owner, size in alive:   # oldest access first
+        if usage.get(owner, 0) > user_quota:
+            reason = f'{owner} over quota'
+        elif total > total_quota:
+            reason = 'storage full'
+        else:
+            continue
+        if _remove(path, reason):
+            usage[owner] -= size
+            total -= size
+            removed += 1
+    return removed
+
+
+def usage(owner):
+    row = _execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts WHERE owner=?', (owner,), one=True)
+    return {'files': row[0], 'bytes': row[1], 'quota_bytes': USER_QUOTA}
@@ -0,0 +1,178 @@
+"""
+Builds the packed ideal-pose templates from reference photos.
+
+    python template_builder.py [--workers N] [--force]
+
+Poses are discovered in static/images: <key>.png (or .jpg, .jpeg, .webp) is
+a pose's main picture, the one the pose page shows, and every image in
+static/images/<key>/ is another reference for the same pose (another angle,
+another body). Keys and file names must fit TEMPLATE_DTYPE's fields, and a
+key needs an entry in the app's POSES to be used. References are extracted in a process pool with one
+model_complexity=2 static-image Pose per worker, reused across images, and
+written to static/ideal_poses/templates.npy: one TEMPLATE_DTYPE row per
+reference, with its image's aspect ratio, that PoseRegistry loads in a
+single read.
+
+Builds are incremental. Each row keeps its image's content hash, and only
+new or changed images are extracted; removed ones drop out (images with no
+detectable pose are not stored, so they are retried each time). --force
+re-extracts everything (e.g. after a MediaPipe upgrade).
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pose_registry import TEMPLATE_PACK, TEMPLATE_DTYPE, load_pack
+
+IMAGE_DIR = os.path.join('static', 'images')
+TEMPLATE_DIR = os.path.join('static', 'ideal_poses')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+_pose = None
+
+
+def discover(image_dir=IMAGE_DIR):
+    """[(key, source)] for every reference image; `source` is relative to image_dir, main picture first."""
+    refs = []
+    for name in sorted(os.listdir(image_dir)):
+        path = os.path.join(image_dir, name)
+        key, ext = os.path.splitext(name)
+        if os.path.isfile(path) and ext.lower() in IMAGE_EXTENSIONS:
+            refs.append((key, name))
+        elif os.path.isdir(path):
+            for extra in sorted(os.listdir(path)):
+                if os.path.splitext(extra)[1].lower() in IMAGE_EXTENSIONS:
+                    refs.append((name, f"{name}/{extra}"))
+    # A pose's main picture sorts before the extras in its folder ('tree.png' < 'tree/...').
+    refs.sort(key=lambda ref: (ref[0], '/' in ref[1], ref[1]))
+    return refs
+
+
+def check_widths(refs):
+    """Raise ValueError for a key or source too long for its TEMPLATE_DTYPE field."""
+    for i, field in enumerate(('key', 'source')):
+        width = TEMPLATE_DTYPE[field].itemsize // np.dtype('U1').itemsize
+        too_long = sorted({ref[i] for ref in refs if len(ref[i]) > width})
+        if too_long:
+            raise ValueError(f"Pose {field}s longer than {width} characters: {', '.join(too_long)}")
+
+
+def image_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).digest()
+
+
+def _init_worker():
+    global _pose
+    import mediapipe as mp
+    _pose = mp.solutions.pose.Pose(static_image_mode=True, model_complexity=2)
+
+
+def _close_worker():
+    global _pose
+    if _pose is not None:
+        _pose.close()
+        _pose = None
+
+
+def _extract(path):
+    """((33, 4) landmarks of the person in an image or None, image width / height)."""
+    import cv2
+    from landmarks import landmarks_to_array
+    image = cv2.imread(path)
+    if image is None:
+        return None, 0.0
+    results = _pose.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    return landmarks_to_array(results.pose_landmarks), image.shape[1] / image.shape[0]
+
+
+def image_aspect(path):
+    import cv2
+    image = cv2.imread(path)
+    return image.shape[1] / image.shape[0] if image is not None else 0.0
+
+
+def build(image_dir=IMAGE_DIR, template_dir=TEMPLATE_DIR, workers=None, force=False):
+    """Bring the template pack up to date. Returns counts of what happened."""
+    refs = discover(image_dir)
+    check_widths(refs)
+    pack_path = os.path.join(template_dir, TEMPLATE_PACK)
+    existing = {}
+    old = None if force or not os.path.exists(pack_path) else load_pack(pack_path)
+    if old is not None:
+        existing = {(str(row['source']), bytes(row['digest'])): row for row in old}
+
+    digests = [image_digest(os.path.join(image_dir, source)) for _, source in refs]
+    todo = [i for i, (_, source) in enumerate(refs) if (source, digests[i]) not in existing]
+    extracted = {}
+    if todo:
+        paths = [os.path.join(image_dir, refs[i][1]) for i in todo]
+        workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+        if workers == 1:
+            _init_worker()
+            results = map(_extract, paths)
+        else:
+            # spawn: MediaPipe graphs must not be inherited across a fork.
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker)
+            results = pool.map(_extract, paths)
+        try:
+            for i, (kps, aspect) in zip(todo, results):
+                extracted[i] = (kps, aspect)
+                if kps is None:
+                    print(f"No pose detected in {refs[i][1]}, skipping it")
+        finally:
+            if workers > 1:
+                pool.shutdown()
+            else:
+                _close_worker()
+
+    pack = np.zeros(len(refs), dtype=TEMPLATE_DTYPE)
+    n = 0
+    for i, (key, source) in enumerate(refs):
+        if i in extracted:
+            kps, aspect = extracted[i]
+        else:
+            row = existing[(source, digests[i])]
+            # Packs from before aspect ratios were stored have 0 here.
+            kps, aspect = row['keypoints'], row['aspect'] or image_aspect(os.path.join(image_dir, source))
+        if kps is None:
+            continue
+        pack[n] = (key, source, digests[i], aspect, kps)
+        n += 1
+    pack = pack[:n]
+
+    failed = sum(kps is None for kps, _ in extracted.values())
+    counts = {'references': n, 'poses': len(set(pack['key'])), 'extracted': len(todo) - failed,
+              'reused': n - (len(todo) - failed), 'failed': failed}
+    if old is not None and np.array_equal(old, pack):
+        return counts  # unchanged; keep the mtime so the registry doesn't reload
+    os.makedirs(template_dir, exist_ok=True)
+    tmp = f"{pack_path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        np.save(f, pack, allow_pickle=False)
+    os.replace(tmp, pack_path)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', default=IMAGE_DIR)
+    parser.add_argument('--out', default=TEMPLATE_DIR)
+    parser.add_argument('--workers', type=int, default=None, help='extraction processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='re-extract every image')
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    counts = build(args.images, args.out, args.workers, args.force)
+    print(f"{counts['references']} references for {counts['poses']} poses in "
+          f"{os.path.join(args.out, TEMPLATE_PACK)}: {counts['extracted']} extracted, {counts['reused']} reused, "
+          f"{counts['failed']} without a pose ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
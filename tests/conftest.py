@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# The app is a flat set of modules in the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def job_db(tmp_path, monkeypatch):
+    """A fresh jobs database (artifacts table included), run from a directory with its own static/."""
+    import jobs
+    import storage
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.join('static', 'uploads'))
+    os.makedirs(os.path.join('static', 'evaluated_videos'))
+    path = str(tmp_path / 'jobs.db')
+    monkeypatch.setattr(jobs, 'JOBS_DB', path)
+    monkeypatch.setattr(jobs, 'JOBS_LOCK', f"{path}.pool.lock")
+    monkeypatch.setattr(storage, 'STORAGE_DB', path)
+    monkeypatch.setattr(storage, '_db', None)
+    jobs.init_db()
+    yield path
+    if storage._db is not None:
+        storage._db.close()
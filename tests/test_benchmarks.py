@@ -0,0 +1,24 @@
+import numpy as np
+
+from benchmarks.hot_paths import compare, percentiles, synthetic_landmarks
+
+
+def test_percentiles_in_milliseconds():
+    result = percentiles([i / 1000 for i in range(1, 101)])
+    assert result['p50_ms'] == 50.5 and result['p99_ms'] == 99.01
+    assert percentiles([]) == {'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+
+
+def test_compare_reports_ratios_for_paths_in_both_runs():
+    baseline = {'results': [{'path': 'match', 'fps': 100.0, 'p95_ms': 2.0, 'model_init_sec': None},
+                            {'path': 'test_loops', 'fps': 10.0}]}
+    current = {'results': [{'path': 'match', 'fps': 150.0, 'p95_ms': 1.0, 'model_init_sec': 0.1},
+                           {'path': 'compare_pose', 'fps': 30.0}]}
+    assert compare(current, baseline) == {'match': {'fps': 1.5, 'p95_ms': 0.5}}
+
+
+def test_synthetic_landmarks_bob_up_and_down():
+    kps = synthetic_landmarks(40)
+    assert kps.shape == (40, 33, 4) and kps.dtype == np.float32
+    np.testing.assert_array_equal(kps[:, :, 0], np.repeat(kps[:1, :, 0], 40, axis=0))
+    assert np.ptp(kps[:, 0, 1]) > 0.1
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from db_pool import SQLitePool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLitePool(str(tmp_path / 'users.db'), max_idle=2)
+    pool.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)')
+    yield pool
+    pool.close()
+
+
+def test_wal_is_set_on_first_use_not_construction(tmp_path):
+    path = tmp_path / 'users.db'
+    pool = SQLitePool(str(path))
+    assert not path.exists()
+    assert pool.execute('PRAGMA journal_mode', one=True)[0] == 'wal'
+    pool.close()
+
+
+def test_execute_autocommits_and_returns_rows(pool):
+    pool.execute('INSERT INTO users (name) VALUES (?)', ('ada',))
+    other = sqlite3.connect(pool.path)
+    assert other.execute('SELECT name FROM users').fetchall() == [('ada',)]
+    other.close()
+    assert pool.execute('SELECT name FROM users WHERE name = ?', ('ada',), one=True) == ('ada',)
+    assert pool.execute('SELECT name FROM users WHERE name = ?', ('bob',), one=True) is None
+
+
+def test_connections_are_reused_up_to_max_idle(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as again:
+        assert again is first
+
+    barrier = threading.Barrier(4)
+
+    def hold():
+        with pool.connection():
+            barrier.wait()
+    threads = [threading.Thread(target=hold) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(pool._idle) == 2
+
+
+def test_forked_child_drops_inherited_connections(pool):
+    with pool.connection() as inherited:
+        pass
+    pid = os.fork()
+    if pid == 0:
+        with pool.connection() as conn:
+            os._exit(0 if conn is not inherited else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+
+
+def test_write_waits_out_a_locked_database(pool):
+    blocker = sqlite3.connect(pool.path, isolation_level=None, check_same_thread=False)
+    blocker.execute('BEGIN IMMEDIATE')
+    timer = threading.Timer(0.2, blocker.execute, ('COMMIT',))
+    timer.start()
+    short = SQLitePool(pool.path, busy_timeout=2.0)
+    short.execute('INSERT INTO users (name) VALUES (?)', ('ada',))
+    timer.join()
+    blocker.close()
+    assert pool.execute('SELECT count(*) FROM users', one=True) == (1,)
+    short.close()
@@ -0,0 +1,200 @@
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+mp = pytest.importorskip('mediapipe')
+if not hasattr(mp, 'solutions'):
+    pytest.skip('needs the MediaPipe solutions API', allow_module_level=True)
+
+import cv2
+
+import eval_engine
+from eval_engine import FrameSampler, extract_parallel, plan_segments, run_pipeline
+
+
+class FakeCapture:
+    """Frame i is filled with the value i, so its position survives the pipeline."""
+
+    def __init__(self, n, count=None, fail_at=None):
+        self.frames = [np.full((8, 8, 3), i, np.uint8) for i in range(n)]
+        self.count = n if count is None else count
+        self.fail_at = fail_at
+
+    def get(self, prop):
+        return self.count if prop == cv2.CAP_PROP_FRAME_COUNT else 0
+
+    def read(self):
+        if self.fail_at is not None and self.fail_at == len(self.frames):
+            raise IOError('decode failed')
+        return (True, self.frames.pop(0)) if self.frames else (False, None)
+
+
+class FakePose:
+    """Puts every landmark at x = frame value / 100."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def process(self, image):
+        self.calls += 1
+        x = float(image[0, 0, 0]) / 100
+        point = types.SimpleNamespace(x=x, y=0.5, z=0.0, visibility=1.0)
+        return types.SimpleNamespace(pose_landmarks=types.SimpleNamespace(landmark=[point] * 33))
+
+
+class Recorder:
+    uses_pose = True
+
+    def __init__(self):
+        self.seen = []
+
+    def update(self, landmarks, angles, frame_shape):
+        self.seen.append(None if landmarks is None else round(float(landmarks[0, 0]) * 100, 3))
+
+    def overlay(self):
+        return []
+
+
+class Writer:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame):
+        self.frames.append(int(frame[0, 0, 0]))
+
+
+def test_pipeline_keeps_frame_order():
+    test, out = Recorder(), Writer()
+    frames, timings, landmarks = run_pipeline(FakeCapture(50), out, FakePose(), test)
+    assert frames == 50
+    assert test.seen == list(range(50))
+    assert out.frames == list(range(50))
+    assert landmarks.shape == (50, 33, 4)
+    assert timings['inferred_frames'] == 50
+
+
+def test_pipeline_reports_progress_when_the_count_is_known():
+    seen = []
+    run_pipeline(FakeCapture(60), Writer(), FakePose(), Recorder(), progress=seen.append, every=20)
+    assert seen == [pytest.approx(1 / 3), pytest.approx(2 / 3), 1.0]
+    seen.clear()
+    run_pipeline(FakeCapture(60, count=0), Writer(), FakePose(), Recorder(), progress=seen.append, every=20)
+    assert seen == []
+
+
+def test_decode_error_stops_the_pipeline():
+    with pytest.raises(IOError):
+        run_pipeline(FakeCapture(40, fail_at=20), Writer(), FakePose(), Recorder())
+
+
+def test_precomputed_landmarks_skip_inference():
+    landmarks = np.full((10, 33, 4), 0.07, np.float32)
+    test = Recorder()
+    frames, timings, _ = run_pipeline(FakeCapture(12), Writer(), None, test, landmarks=landmarks)
+    assert frames == 12
+    assert test.seen == [7.0] * 10 + [None, None]
+    assert timings['inferred_frames'] == 0
+
+
+def test_stride_infers_every_nth_frame_and_interpolates_the_rest():
+    pose, test = FakePose(), Recorder()
+    run_pipeline(FakeCapture(20), Writer(), pose, test, sampler=FrameSampler(stride=3))
+    assert pose.calls == 7  # frames 0, 3, ..., 18
+    # Landmarks move linearly with the frame value, so interpolation recovers them;
+    # the trailing frame keeps the last inferred landmarks.
+    assert test.seen == list(range(19)) + [18]
+
+
+def test_sampler_downscales_to_max_side():
+    image = FrameSampler(max_side=32).prepare(np.zeros((60, 120, 3), np.uint8))
+    assert image.shape == (16, 32, 3)
+    assert FrameSampler().prepare(np.zeros((60, 120, 3), np.uint8)).shape == (60, 120, 3)
+
+
+def test_adaptive_stride_follows_motion():
+    sampler = FrameSampler(stride=2, adaptive=True, max_stride=4)
+    still = np.full((33, 4), 0.5, np.float32)
+    still[:, 3] = 1.0
+    moved = still.copy()
+    moved[:, 0] += 0.2
+    sampler.adapt(still, moved, gap=2)
+    assert sampler.stride == 1
+    for _ in range(5):
+        sampler.adapt(still, still, gap=1)
+    assert sampler.stride == 4
+
+
+def test_cache_variant_depends_on_sampling(monkeypatch):
+    monkeypatch.setenv('EVAL_STRIDE', 'auto')
+    monkeypatch.setenv('EVAL_MAX_SIDE', '480')
+    assert FrameSampler.from_env().cache_variant() == 'auto-m480'
+    assert FrameSampler().cache_variant() == 's1'
+
+
+def test_plan_segments():
+    assert plan_segments(1000, 4, min_frames=300) == [(0, 333), (333, 666), (666, None)]
+    assert plan_segments(200, 4, min_frames=300) == [(0, None)]
+    segments = plan_segments(10000, 4, min_frames=300)
+    assert len(segments) == 4 and segments[0][0] == 0
+    assert all(a[1] == b[0] for a, b in zip(segments, segments[1:]))
+
+
+@pytest.fixture
+def thread_segments(monkeypatch):
+    """Run segments on threads; each returns rows whose x is the frame index."""
+    pool = ThreadPoolExecutor(4)
+    delays = {}
+
+    def segment(video_path, start, stop, sampler=None):
+        time.sleep(delays.get(start, 0))
+        stop = 1000 if stop is None else stop
+        rows = np.zeros((stop - start, 33, 4), np.float32)
+        rows[:, :, 0] = np.arange(start, stop)[:, None]
+        return rows, 0.1, stop - start
+
+    monkeypatch.setattr(eval_engine, 'segment_pool', lambda workers: pool)
+    monkeypatch.setattr(eval_engine, 'extract_segment', segment)
+    monkeypatch.setattr(eval_engine, 'MIN_SEGMENT_FRAMES', 100)
+    monkeypatch.setattr(eval_engine, 'PROGRESS_TICK', 0.05)
+    yield delays
+    pool.shutdown()
+
+
+def test_segments_are_stitched_in_order(thread_segments):
+    thread_segments[0] = 0.1  # the first segment finishes last
+    landmarks, stats = extract_parallel('clip.mp4', 1000, 3)
+    assert landmarks.shape == (1000, 33, 4)
+    np.testing.assert_array_equal(landmarks[:, 0, 0], np.arange(1000))
+    assert stats['segments'] == 3 and stats['inferred_frames'] == 1000
+
+
+def test_progress_ticks_while_a_segment_runs(thread_segments):
+    thread_segments[0] = 0.4
+    seen = []
+    extract_parallel('clip.mp4', 1000, 2, progress=seen.append)
+    assert seen.count(0.5) >= 3  # the second segment is done, the first still running
+    assert seen[-1] == 1.0
+
+
+def test_progress_timeout_cancels_queued_segments(thread_segments, monkeypatch):
+    started = []
+    segment = eval_engine.extract_segment
+
+    def tracked(video_path, start, stop, sampler=None):
+        started.append(start)
+        return segment(video_path, start, stop, sampler)
+
+    monkeypatch.setattr(eval_engine, 'extract_segment', tracked)
+    monkeypatch.setattr(eval_engine, 'segment_pool', lambda workers: ThreadPoolExecutor(1))
+    thread_segments[0] = 0.2
+
+    def deadline(fraction):
+        raise TimeoutError('too slow')
+
+    with pytest.raises(TimeoutError):
+        extract_parallel('clip.mp4', 1000, 4, progress=deadline)
+    time.sleep(0.3)
+    assert started == [0]
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from frame_mailbox import ClaimTimeout, FrameMailbox, LatestFrame, MailboxTable
+
+
+def test_idle_mailbox_hands_frame_straight_over():
+    box = FrameMailbox()
+    assert box.claim(box.post(b'a')) == b'a'
+    box.release()
+    assert box.claim(box.post(b'b')) == b'b'
+
+
+def test_waiting_frame_is_superseded_by_a_newer_one():
+    box = FrameMailbox()
+    box.claim(box.post(b'first'))
+    results = {}
+
+    def request(name, ticket):
+        results[name] = box.claim(ticket, timeout=2)
+
+    old = threading.Thread(target=request, args=('old', box.post(b'old')))
+    old.start()
+    time.sleep(0.05)
+    new = threading.Thread(target=request, args=('new', box.post(b'new')))
+    new.start()
+    old.join(1)
+    assert results == {'old': None}
+    box.release()
+    new.join(1)
+    assert results['new'] == b'new'
+    assert box.superseded == 1 and box.drop_rate() == pytest.approx(1 / 3)
+
+
+def test_starved_claim_times_out_instead_of_superseding():
+    box = FrameMailbox()
+    box.claim(box.post(b'first'))
+    ticket = box.post(b'second')
+    with pytest.raises(ClaimTimeout):
+        box.claim(ticket, timeout=0.05)
+    assert box.timeouts == 1 and box.superseded == 0
+
+
+def test_latest_frame_keeps_only_the_newest():
+    slot = LatestFrame()
+    for data in (b'a', b'b', b'c'):
+        slot.put(data)
+    assert slot.take() == (b'c', 2, 2)
+    slot.put(b'd')
+    assert slot.take() == (b'd', 3, 0)
+    slot.close()
+    assert slot.take() is None
+    assert (slot.posted, slot.superseded) == (4, 2)
+
+
+def test_latest_frame_wakes_a_blocked_taker_on_close():
+    slot = LatestFrame()
+    taken = []
+    taker = threading.Thread(target=lambda: taken.append(slot.take()))
+    taker.start()
+    slot.close()
+    taker.join(1)
+    assert taken == [None]
+
+
+def test_table_keeps_totals_of_expired_mailboxes():
+    table = MailboxTable(ttl=0.05)
+    box = table.get('a')
+    assert table.get('a') is box
+    box.post(b'x')
+    box.post(b'y')
+    box.claim(2)
+    time.sleep(0.1)
+    table.get('b')
+    slot = LatestFrame()
+    slot.put(b'z')
+    table.record(slot)
+    stats = table.stats()
+    assert stats['active'] == 1
+    assert (stats['posted'], stats['superseded']) == (3, 0)
@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+from frame_roi import RegionTracker
+
+FRAME = cv2.imencode('.jpg', np.full((1080, 1920, 3), 128, np.uint8))[1].tobytes()
+
+
+def person(x0=0.4, y0=0.3, x1=0.55, y1=0.7):
+    """(33, 4) visible landmarks spread over a box of frame fractions."""
+    t = np.linspace(0.0, 1.0, 33)
+    kps = np.ones((33, 4), np.float32)
+    kps[:, 0] = x0 + t * (x1 - x0)
+    kps[:, 1] = y0 + t[::-1] * (y1 - y0)
+    kps[:, 2] = 0.0
+    return kps
+
+
+def in_box(kps, shape, box):
+    """What the model reports for `kps` when it only sees `box` of an image of `shape`."""
+    h, w = shape[:2]
+    x0, y0, x1, y1 = box
+    local = kps.copy()
+    local[:, 0] = (kps[:, 0] * w - x0) / (x1 - x0)
+    local[:, 1] = (kps[:, 1] * h - y0) / (y1 - y0)
+    return local
+
+
+def test_first_frame_is_whole_then_cropped_at_reduced_scale():
+    region = RegionTracker()
+    image, box = region.decode(FRAME)
+    assert image.shape[:2] == (1080, 1920) and box is None and not region.moved
+    region.update(person(), image.shape, box)
+
+    image, box = region.decode(FRAME)
+    assert region.reduction() == 2 and image.shape[:2] == (540, 960)
+    assert box is not None and region.moved
+    crop = region.crop(image, box)
+    assert crop.shape[:2] == (box[3] - box[1], box[2] - box[0])
+    assert min(crop.shape[:2]) >= region.min_side
+
+
+def test_landmarks_are_mapped_back_to_the_whole_frame():
+    region = RegionTracker()
+    image, box = region.decode(FRAME)
+    region.update(person(), image.shape, box)
+    image, box = region.decode(FRAME)
+    mapped = region.update(in_box(person(), image.shape, box), image.shape, box)
+    np.testing.assert_allclose(mapped[:, :2], person()[:, :2], atol=1e-5)
+
+
+def test_region_is_sticky_until_the_person_leaves_it():
+    region = RegionTracker()
+    image, box = region.decode(FRAME)
+    region.update(person(), image.shape, box)
+    first = region.roi
+    region.update(person(0.41, 0.31, 0.56, 0.71), image.shape, None)
+    assert region.roi == first
+    region.decode(FRAME)
+    region.decode(FRAME)
+    assert not region.moved
+
+    region.update(person(0.1, 0.3, 0.25, 0.7), image.shape, None)
+    assert region.roi != first
+    region.decode(FRAME)
+    assert region.moved
+
+
+def test_lost_person_goes_back_to_the_whole_frame():
+    region = RegionTracker()
+    image, box = region.decode(FRAME)
+    region.update(person(), image.shape, box)
+    region.decode(FRAME)
+    region.lost()
+    image, box = region.decode(FRAME)
+    assert box is None and region.moved and region.reduction() == 4
+    assert region.stats()['fallbacks'] == 1
+
+
+def test_person_filling_the_frame_is_not_cropped():
+    region = RegionTracker()
+    image, box = region.decode(FRAME)
+    region.update(person(0.1, 0.05, 0.9, 0.95), image.shape, box)
+    assert region.roi is None
+
+
+def test_no_pose_clears_the_region():
+    region = RegionTracker()
+    image, box = region.decode(FRAME)
+    region.update(person(), image.shape, box)
+    assert region.update(None, image.shape, None) is None and region.roi is None
+
+
+def test_garbage_is_not_an_image():
+    region = RegionTracker()
+    assert region.decode(b'not a jpeg') == (None, None)
+    assert region.frames == 0
@@ -0,0 +1,133 @@
+import socket
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from inference import (BUSY, OP_FRAME, POSE, FrameError, InferenceBusy, InferenceClient, pack_reply,
+                       pack_request, recv_message, send_message, unpack_request)
+
+
+def test_request_round_trip():
+    body = pack_request(7, OP_FRAME, -1, 5, 'live-é', b'jpeg!')
+    req_id, op, slot, nbytes, ident, inline = unpack_request(bytearray(body))
+    assert (req_id, op, slot, nbytes, ident, bytes(inline)) == (7, OP_FRAME, -1, 5, 'live-é', b'jpeg!')
+
+
+def test_reply_carries_landmarks_only_for_a_pose():
+    kps = np.arange(33 * 4, dtype=np.float64).reshape(33, 4)
+    assert len(pack_reply(1, POSE, kps, 0.75)) == 5 + 4 + 33 * 4 * 4
+    assert len(pack_reply(1, BUSY)) == 5
+
+
+def test_messages_are_length_prefixed():
+    a, b = socket.socketpair()
+    send_message(a, b'hello')
+    send_message(a, b'')
+    assert recv_message(b) == b'hello' and recv_message(b) == b''
+    a.close()
+    b.close()
+
+
+class FakeEngine:
+    """Answers from the frame bytes: b'none' has nobody, b'bad' isn't an image."""
+
+    def __init__(self):
+        self.pool = SimpleNamespace(size=2)
+        self.seen = []
+        self.discarded = []
+        self.closed = False
+
+    def landmarks(self, data, live_id=None):
+        data = bytes(data)
+        self.seen.append((live_id, data))
+        if data == b'bad':
+            raise FrameError("Frame is not an image")
+        if data == b'none':
+            return None, None
+        return np.full((33, 4), len(data), np.float32), 0.5
+
+    def discard(self, live_id):
+        self.discarded.append(live_id)
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def server():
+    pytest.importorskip('mediapipe')
+    from inference_server import InferenceServer
+    path = tempfile.mktemp(suffix='.sock', dir='/tmp')
+    server = InferenceServer(path, engine=FakeEngine(), batch_window=0.01)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    for _ in range(100):
+        try:
+            with socket.socket(socket.AF_UNIX) as probe:
+                probe.connect(path)
+            break
+        except OSError:
+            time.sleep(0.01)
+    yield server
+    server.stop()
+    thread.join(timeout=5)
+
+
+def test_frames_through_the_ring_and_inline(server):
+    client = InferenceClient(server.path, slots=2, slot_bytes=16, timeout=2.0)
+    kps, aspect = client.landmarks(b'x' * 10)
+    assert kps.shape == (33, 4) and kps[0, 0] == 10 and aspect == 0.5
+    kps, _ = client.landmarks(b'y' * 100, 'ada')
+    assert kps[0, 0] == 100 and client.inline == 1
+    assert client.landmarks(b'none') == (None, None)
+    with pytest.raises(FrameError):
+        client.landmarks(b'bad')
+    assert client.stats()['free_slots'] == 2
+    assert server.engine.seen[:2] == [(None, b'x' * 10), ('ada', b'y' * 100)]
+    client.close()
+
+
+def test_session_frames_keep_their_order(server):
+    client = InferenceClient(server.path, slots=8, slot_bytes=16, timeout=2.0)
+    threads = [threading.Thread(target=client.landmarks, args=(b'f' * (i + 1), 'ada')) for i in range(8)]
+    for t in threads:
+        t.start()
+        time.sleep(0.002)
+    for t in threads:
+        t.join()
+    assert [len(data) for _, data in server.engine.seen] == list(range(1, 9))
+    client.close()
+
+
+def test_discard_reaches_the_engine(server):
+    client = InferenceClient(server.path, timeout=2.0)
+    client.discard('ada')
+    client.landmarks(b'x')
+    assert server.engine.discarded == ['ada']
+    client.close()
+
+
+def test_requests_that_waited_too_long_are_answered_busy(server):
+    server.max_wait = -1
+    client = InferenceClient(server.path, timeout=2.0)
+    with pytest.raises(InferenceBusy, match='busy'):
+        client.landmarks(b'x')
+    assert server.expired == 1 and server.engine.seen == []
+    client.close()
+
+
+def test_stop_disconnects_clients_then_closes_the_engine(server):
+    client = InferenceClient(server.path, timeout=2.0)
+    client.landmarks(b'x')
+    server.stop()
+    assert server.engine.closed and server._readers == {}
+    with pytest.raises(InferenceBusy):
+        client.landmarks(b'x')
+    client.close()
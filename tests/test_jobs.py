@@ -0,0 +1,165 @@
+import os
+import time
+from collections import namedtuple
+
+import pytest
+
+import jobs
+
+Result = namedtuple('Result', 'test summary metrics video web_ready frames duration timings')
+
+
+def upload(name='clip.mp4', size=10):
+    path = os.path.join('static', 'uploads', name)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    return path
+
+
+def test_job_lifecycle(job_db):
+    job_id = jobs.create_job('alice', 'squats', upload())
+    assert jobs.get_job(job_id)['status'] == jobs.QUEUED
+    job = jobs.claim_next('w1')
+    assert job['id'] == job_id
+    running = jobs.get_job(job_id)
+    assert (running['status'], running['worker'], running['attempts']) == (jobs.RUNNING, 'w1', 1)
+    assert jobs.claim_next('w2') is None
+    jobs.heartbeat(job_id, 0.5)
+    assert jobs.get_job(job_id)['progress'] == 0.5
+    jobs.finish_job(job_id, 'Good form', 'evaluated_videos/out.mp4')
+    done = jobs.get_job(job_id)
+    assert (done['status'], done['progress'], done['summary']) == (jobs.DONE, 1, 'Good form')
+
+
+def test_claims_oldest_first_and_respects_max_running(job_db, monkeypatch):
+    monkeypatch.setattr(jobs, 'MAX_RUNNING', 1)
+    first = jobs.create_job('alice', 'squats', upload('a.mp4'))
+    jobs.create_job('bob', 'squats', upload('b.mp4'))
+    assert jobs.claim_next('w1')['id'] == first
+    assert jobs.claim_next('w2') is None
+
+
+def test_stale_jobs_are_retried_then_failed(job_db, monkeypatch):
+    monkeypatch.setattr(jobs, 'STALE_AFTER', -1.0)
+    job_id = jobs.create_job('alice', 'squats', upload())
+    for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+        assert jobs.claim_next(f"w{attempt}")['id'] == job_id
+        assert jobs.requeue_stale() == {f"w{attempt}"}
+    failed = jobs.get_job(job_id)
+    assert failed['status'] == jobs.FAILED
+    assert failed['attempts'] == jobs.MAX_ATTEMPTS
+    assert failed['video_rel'] == 'uploads/clip.mp4'
+
+
+def test_dead_workers_jobs_are_requeued(job_db):
+    job_id = jobs.create_job('alice', 'squats', upload())
+    jobs.claim_next('w1')
+    jobs.requeue_worker_jobs('w2')
+    assert jobs.get_job(job_id)['status'] == jobs.RUNNING
+    jobs.requeue_worker_jobs('w1')
+    assert jobs.get_job(job_id)['status'] == jobs.QUEUED
+
+
+def test_only_one_pool_per_database(job_db):
+    first, second = jobs.JobPool(0), jobs.JobPool(0)
+    try:
+        assert first.start()
+        assert not second.start()
+    finally:
+        first.stop()
+    try:
+        assert second.start()
+    finally:
+        second.stop()
+
+
+def test_orphaned_files_are_removed(job_db):
+    kept = upload('kept.mp4')
+    jobs.create_job('alice', 'squats', kept)
+    orphan = upload('orphan.mp4')
+    old = time.time() - 2 * jobs.ORPHAN_AGE
+    os.utime(kept, (old, old))
+    os.utime(orphan, (old, old))
+    fresh = upload('fresh.mp4')
+    jobs.cleanup_orphans()
+    assert os.path.exists(kept) and os.path.exists(fresh)
+    assert not os.path.exists(orphan)
+
+
+class FakeEngine:
+    """Stands in for eval_engine: runs `step(progress)` as the evaluation."""
+
+    class EvalError(Exception):
+        pass
+
+    def __init__(self, step):
+        self.step = step
+
+    def evaluate(self, test, path, progress=None):
+        self.step(progress)
+        return Result(test, 'Done', {}, '', False, 0, 0.0, {})
+
+
+@pytest.fixture
+def fast_beats(job_db, monkeypatch):
+    monkeypatch.setattr(jobs, 'HEARTBEAT_INTERVAL', 0.05)
+    jobs.create_job('alice', 'squats', upload())
+    return jobs.claim_next('w1')
+
+
+def test_evaluation_without_progress_keeps_heartbeating(fast_beats):
+    beats = []
+
+    def silent(progress):
+        for _ in range(3):
+            time.sleep(0.1)
+            beats.append(jobs.get_job(fast_beats['id'])['heartbeat'])
+
+    jobs.run_job(fast_beats, FakeEngine(silent))
+    assert beats[0] < beats[1] < beats[2]
+    assert jobs.get_job(fast_beats['id'])['status'] == jobs.DONE
+
+
+def test_progress_is_written_on_the_timer(fast_beats):
+    stored = []
+
+    def reporting(progress):
+        progress(0.4)
+        time.sleep(0.15)
+        stored.append(jobs.get_job(fast_beats['id'])['progress'])
+        progress(1.0)
+        time.sleep(0.15)
+        stored.append(jobs.get_job(fast_beats['id'])['progress'])
+
+    jobs.run_job(fast_beats, FakeEngine(reporting))
+    assert stored == [0.4, 0.99]
+
+
+def test_progress_past_the_deadline_fails_the_job(fast_beats, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_TIMEOUT', 0.05)
+
+    def slow(progress):
+        time.sleep(0.1)
+        progress(0.5)
+
+    jobs.run_job(fast_beats, FakeEngine(slow))
+    job = jobs.get_job(fast_beats['id'])
+    assert job['status'] == jobs.FAILED
+    assert 'exceeded' in job['error']
+
+
+# The fake os._exit ends the timer thread with SystemExit.
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_silent_evaluation_past_the_deadline_stops_the_worker(fast_beats, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_TIMEOUT', 0.05)
+    exits = []
+
+    def exit_worker(code):
+        exits.append((code, jobs.get_job(fast_beats['id'])))
+        raise SystemExit(code)
+
+    monkeypatch.setattr(jobs.os, '_exit', exit_worker)
+    jobs.run_job(fast_beats, FakeEngine(lambda progress: time.sleep(0.4)))
+    (code, job), = exits
+    assert code == 1
+    assert job['status'] == jobs.FAILED and 'exceeded' in job['error']
@@ -0,0 +1,64 @@
+import os
+import time
+
+import numpy as np
+
+from landmark_cache import LandmarkCache
+
+
+def video(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def rows(n, value=0.5):
+    return np.full((n, 33, 4), value, np.float32)
+
+
+def test_key_follows_content_and_variant(tmp_path):
+    cache = LandmarkCache(str(tmp_path / 'cache'))
+    a = video(tmp_path, 'a.mp4', b'same bytes')
+    b = video(tmp_path, 'b.webm', b'same bytes')
+    c = video(tmp_path, 'c.mp4', b'other bytes')
+    assert cache.key(a) == cache.key(b)
+    assert cache.key(a) != cache.key(c)
+    assert cache.key(a, 's2') != cache.key(a)
+
+
+def test_round_trip_counts_hits_and_misses(tmp_path):
+    cache = LandmarkCache(str(tmp_path / 'cache'))
+    assert cache.get('missing') is None
+    cache.put('k', rows(10))
+    got = cache.get('k')
+    np.testing.assert_array_equal(got, rows(10))
+    assert isinstance(got, np.memmap)
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses']) == (1, 1, 1)
+    assert not [name for name in os.listdir(cache.directory) if name.endswith('.tmp')]
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry = rows(100).nbytes + 128
+    cache = LandmarkCache(str(tmp_path / 'cache'), max_bytes=2 * entry + 10)
+    cache.put('old', rows(100))
+    cache.put('used', rows(100))
+    past = time.time() - 60
+    os.utime(cache._path('old'), (past, past))
+    os.utime(cache._path('used'), (past - 10, past - 10))
+    cache.get('used')  # refreshes its last-used time
+    cache.put('new', rows(100))
+    assert cache.get('old') is None
+    assert cache.get('used') is not None and cache.get('new') is not None
+
+
+def test_expired_entries_and_stray_temp_files_are_removed(tmp_path):
+    cache = LandmarkCache(str(tmp_path / 'cache'), max_age=3600)
+    cache.put('stale', rows(1))
+    stray = os.path.join(cache.directory, 'x.npy.abcd.tmp')
+    open(stray, 'wb').close()
+    past = time.time() - 7200
+    os.utime(cache._path('stale'), (past, past))
+    os.utime(stray, (past, past))
+    cache.put('fresh', rows(1))
+    assert sorted(os.listdir(cache.directory)) == ['fresh.npy']
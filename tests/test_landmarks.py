@@ -0,0 +1,75 @@
+import types
+
+import numpy as np
+import pytest
+
+from landmarks import (JOINT_INDEX, LEFT_ELBOW, LEFT_HIP, LEFT_SHOULDER, LEFT_WRIST, RIGHT_HIP, RIGHT_SHOULDER,
+                       LandmarkBuffer, interpolate, joint_angles, landmarks_to_array, normalize_keypoints,
+                       square_pixels)
+
+
+def body(seed=0):
+    kps = np.random.default_rng(seed).uniform(0.2, 0.8, (33, 4)).astype(np.float32)
+    kps[:, 3] = 1.0
+    return kps
+
+
+def test_landmarks_to_array():
+    points = [types.SimpleNamespace(x=i, y=i + 0.5, z=-i, visibility=0.9) for i in range(33)]
+    kps = landmarks_to_array(types.SimpleNamespace(landmark=points))
+    assert kps.shape == (33, 4) and kps.dtype == np.float32
+    np.testing.assert_allclose(kps[5], [5, 5.5, -5, 0.9])
+    assert landmarks_to_array(None) is None
+    out = np.zeros((33, 4), np.float32)
+    assert landmarks_to_array(types.SimpleNamespace(landmark=points), out) is out
+
+
+def test_joint_angles_single_frame_and_batch():
+    kps = body()
+    kps[LEFT_SHOULDER, :2] = (0.5, 0.2)
+    kps[LEFT_ELBOW, :2] = (0.5, 0.4)
+    kps[LEFT_WRIST, :2] = (0.7, 0.4)
+    assert joint_angles(kps)[JOINT_INDEX['left_elbow']] == pytest.approx(90, abs=1e-3)
+    kps[LEFT_WRIST, :2] = (0.5, 0.6)
+    assert joint_angles(kps)[JOINT_INDEX['left_elbow']] == pytest.approx(180, abs=1e-3)
+    batch = np.stack([body(1), kps])
+    np.testing.assert_allclose(joint_angles(batch)[1], joint_angles(kps))
+    assert joint_angles(kps, names=('left_elbow',)).shape == (1,)
+
+
+def test_square_pixels_scales_x_per_row():
+    kps = np.stack([body(0), body(1)])
+    square = square_pixels(kps, [2.0, 0.5])
+    np.testing.assert_allclose(square[0, :, 0], kps[0, :, 0] * 2)
+    np.testing.assert_allclose(square[1, :, 0], kps[1, :, 0] * 0.5)
+    np.testing.assert_array_equal(square[..., 1:], kps[..., 1:])
+    assert square is not kps
+
+
+def test_normalize_is_translation_and_scale_invariant():
+    kps = body()[:, :2]
+    moved = kps * 3 + 0.25
+    np.testing.assert_allclose(normalize_keypoints(moved), normalize_keypoints(kps), atol=1e-5)
+    norm = normalize_keypoints(kps)
+    np.testing.assert_allclose((norm[LEFT_HIP] + norm[RIGHT_HIP]) / 2, 0, atol=1e-6)
+    torso = (norm[LEFT_SHOULDER] + norm[RIGHT_SHOULDER]) / 2
+    assert np.linalg.norm(torso) == pytest.approx(1)
+
+
+def test_interpolate():
+    a, b = np.zeros((33, 4), np.float32), np.ones((33, 4), np.float32)
+    mid = interpolate(a, b, 3)
+    np.testing.assert_allclose(mid[:, 0, 0], [0.25, 0.5, 0.75])
+    nearest = interpolate(a, None, 3)
+    assert not np.isnan(nearest[0]).any() and np.isnan(nearest[2]).all()
+    assert np.isnan(interpolate(None, None, 2)).all()
+
+
+def test_landmark_buffer_grows_and_marks_missing_frames():
+    buffer = LandmarkBuffer(capacity=2)
+    buffer.append(body(0))
+    buffer.append(None)
+    buffer.extend(np.stack([body(1), body(2)]))
+    assert len(buffer) == 4
+    np.testing.assert_array_equal(buffer.array[3], body(2))
+    assert buffer.valid.tolist() == [True, False, True, True]
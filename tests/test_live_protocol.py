@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from live_protocol import (FLAG_BUSY, FLAG_NO_TEMPLATE, FLAG_POSE_DETECTED, FLAG_RECOGNIZED, HEADER,
+                           decode_reply, encode_reply)
+
+
+def result(**overrides):
+    kps = np.linspace(0, 1, 66, dtype=np.float32).reshape(33, 2)
+    base = {'status': 'ok', 'user_keypoints': kps, 'matches': [i % 2 == 0 for i in range(33)],
+            'accuracy': 73.0, 'recognized': 'tree', 'recognized_accuracy': 81.0}
+    base.update(overrides)
+    return base
+
+
+def test_round_trip():
+    sent = result()
+    reply = decode_reply(encode_reply(sent, seq=7, dropped=2))
+    assert reply['flags'] == FLAG_POSE_DETECTED | FLAG_RECOGNIZED
+    assert (reply['seq'], reply['dropped'], reply['accuracy']) == (7, 2, 73)
+    assert reply['matches'] == sent['matches']
+    np.testing.assert_allclose(reply['user_keypoints'], sent['user_keypoints'], atol=1 / 65535)
+    assert (reply['recognized'], reply['recognized_accuracy']) == ('tree', 81)
+
+
+def test_keypoints_are_clamped():
+    kps = np.full((33, 2), 0.5, np.float32)
+    kps[0] = (-0.2, 1.3)
+    reply = decode_reply(encode_reply(result(user_keypoints=kps), 0, 0))
+    assert reply['user_keypoints'][0] == [0.0, 1.0]
+
+
+def test_empty_busy_reply():
+    data = encode_reply({'user_keypoints': [], 'matches': [], 'accuracy': 0}, seq=3, dropped=0, flags=FLAG_BUSY)
+    assert len(data) == HEADER.size
+    reply = decode_reply(data)
+    assert reply['flags'] == FLAG_BUSY
+    assert reply['user_keypoints'] == [] and reply['recognized'] is None
+
+
+def test_missing_template_sets_its_flag():
+    reply = decode_reply(encode_reply(result(status='no_template', recognized=None), 0, 0))
+    assert reply['flags'] == FLAG_POSE_DETECTED | FLAG_NO_TEMPLATE
+
+
+def test_unknown_version_is_rejected():
+    data = bytearray(encode_reply(result(), 0, 0))
+    data[0] = 99
+    with pytest.raises(ValueError):
+        decode_reply(bytes(data))
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+mp = pytest.importorskip('mediapipe')
+if not hasattr(mp, 'solutions'):
+    pytest.skip('needs the MediaPipe solutions API', allow_module_level=True)
+
+import live_sessions
+from live_sessions import LiveSessionManager
+
+
+class FakePose:
+    built = 0
+
+    def __init__(self, **kwargs):
+        FakePose.built += 1
+        self.resets = 0
+        self.closed = False
+
+    def process(self, image):
+        return image
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_pose(monkeypatch):
+    FakePose.built = 0
+    monkeypatch.setattr(live_sessions.mp.solutions.pose, 'Pose', FakePose)
+
+
+def test_same_id_gets_same_session():
+    manager = LiveSessionManager(max_sessions=2)
+    assert manager.get('a') is manager.get('a')
+    assert FakePose.built == 1
+
+
+def test_active_users_over_the_limit_do_not_thrash():
+    manager = LiveSessionManager(max_sessions=2, evict_after=5.0)
+    tracked = [manager.get(f"user{i % 3}") is not None for i in range(30)]
+    assert FakePose.built == 2
+    assert tracked.count(False) == 10
+    assert manager.stats()['evictions'] == 0
+    assert manager.stats()['full'] == 10
+
+
+def test_idle_session_makes_room():
+    manager = LiveSessionManager(max_sessions=1, evict_after=0.05)
+    old = manager.get('a')
+    time.sleep(0.1)
+    new = manager.get('b')
+    assert new is not None and new is not old
+    assert old.closed and old.pose.closed
+    assert manager.stats()['evictions'] == 1
+
+
+def test_session_mid_frame_is_not_evicted():
+    manager = LiveSessionManager(max_sessions=1, evict_after=0.01)
+    busy = manager.get('a')
+    time.sleep(0.05)
+    with busy.lock:
+        assert manager.get('b') is None
+    assert not busy.closed
+
+
+def test_expired_sessions_are_closed():
+    manager = LiveSessionManager(max_sessions=4, ttl=0.05)
+    old = manager.get('a')
+    time.sleep(0.1)
+    manager.get('b')
+    assert old.closed
+    assert manager.stats()['active'] == 1
+
+
+def test_tracking_resets_after_a_gap_or_on_request():
+    manager = LiveSessionManager(reset_after=0.05)
+    live = manager.get('a')
+    with live.lock:
+        live.process('frame')
+        live.process('frame')
+    assert live.pose.resets == 0
+    time.sleep(0.1)
+    with live.lock:
+        live.process('frame')
+        live.process('frame', reset=True)
+    assert live.pose.resets == 2 and live.frames == 4
+
+
+def test_discarded_session_stops_processing():
+    manager = LiveSessionManager()
+    live = manager.get('a')
+    manager.discard('a')
+    with live.lock:
+        assert live.process('frame') is None
+    assert manager.get('a') is not live
@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from benchmarks.load_test import Recorder, Session, process_tree
+
+
+@pytest.fixture
+def app_server():
+    """Answers /signup and /login, the first `busy` times with 503."""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            calls.append((self.path, body['username']))
+            status = 503 if len(calls) <= server.busy else 200
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.busy = 0
+    server.calls = calls
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_login_to_an_existing_account(app_server):
+    Session(app_server.url, timeout=5).login('alice', 'secret')
+    assert app_server.calls == [('/login', 'alice')]
+
+
+def test_throwaway_account_signs_up_first(app_server):
+    Session(app_server.url, timeout=5).login()
+    (signup, user), (login, same) = app_server.calls
+    assert (signup, login) == ('/signup', '/login') and user == same and user.startswith('load-')
+
+
+def test_busy_logins_are_retried(app_server):
+    app_server.busy = 2
+    Session(app_server.url, timeout=5).login('alice', 'secret', retries=5)
+    assert len(app_server.calls) == 3
+    app_server.calls.clear()
+    app_server.busy = 10
+    with pytest.raises(RuntimeError, match='503'):
+        Session(app_server.url, timeout=5).login('alice', 'secret', retries=2)
+
+
+def test_recorder_summary():
+    rec = Recorder()
+    for latency in (0.01, 0.02, 0.03):
+        rec.add('ok', latency)
+    rec.add('busy')
+    summary = rec.summary(2.0)
+    assert summary['requests'] == 4 and summary['per_sec'] == 2.0
+    assert summary['outcomes'] == {'ok': 3, 'busy': 1} and summary['p50_ms'] == 20.0
+
+
+def test_process_tree_includes_children():
+    child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(5)'])
+    try:
+        pids = process_tree(os.getpid())
+        assert pids[0] == os.getpid() and child.pid in pids
+    finally:
+        child.kill()
+        child.wait()
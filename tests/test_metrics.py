@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+
+from metrics import Registry
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def write_snapshot(directory, pid, snapshot):
+    with open(os.path.join(directory, f'{pid}-0123abcd.json'), 'w') as f:
+        json.dump(snapshot, f)
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    hist = registry.histogram('stage_seconds', 'Stage time.', ('stage',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        hist.observe(value, stage='decode')
+    assert hist.snapshot() == {'decode': [1, 2, 5.55, 3]}
+    lines = hist.render([hist.snapshot()])
+    assert 'stage_seconds_bucket{stage="decode",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="decode",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="decode"} 3' in lines
+
+
+def test_counter_without_labels():
+    registry = Registry()
+    full = registry.counter('full_total', 'Full.')
+    full.inc()
+    full.inc(2)
+    assert full.render([full.snapshot()])[-1] == 'full_total 3'
+
+
+def test_render_merges_other_processes(tmp_path):
+    registry = Registry()
+    jobs = registry.counter('jobs_total', 'Jobs.', ('outcome',))
+    jobs.inc(outcome='done')
+    write_snapshot(tmp_path, os.getppid(), {'jobs_total': {'done': [2], 'failed': [1]}})
+    text = registry.render(str(tmp_path))
+    assert 'jobs_total{outcome="done"} 3' in text
+    assert 'jobs_total{outcome="failed"} 1' in text
+
+
+def test_own_dump_is_not_counted_twice(tmp_path):
+    registry = Registry()
+    jobs = registry.counter('jobs_total', 'Jobs.')
+    jobs.inc()
+    registry.dump(str(tmp_path))
+    assert 'jobs_total 1\n' in registry.render(str(tmp_path))
+
+
+def test_exited_processes_are_archived_and_counters_never_go_back(tmp_path):
+    registry = Registry()
+    registry.counter('jobs_total', 'Jobs.')
+    write_snapshot(tmp_path, dead_pid(), {'jobs_total': {'': [4]}})
+    assert 'jobs_total 4\n' in registry.render(str(tmp_path))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('-0123abcd.json')]
+    assert 'jobs_total 4\n' in registry.render(str(tmp_path))
+
+    write_snapshot(tmp_path, dead_pid(), {'jobs_total': {'': [1]}})
+    assert 'jobs_total 5\n' in registry.render(str(tmp_path))
@@ -0,0 +1,58 @@
+import threading
+
+import bcrypt
+import pytest
+
+from passwords import HasherBusy, PasswordHasher, hash_rounds
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=0)
+    yield hasher
+    hasher.close()
+
+
+def test_hash_and_verify(hasher):
+    hashed = hasher.hash('secret')
+    assert hash_rounds(hashed) == 4
+    assert hasher.verify('secret', hashed) == (True, None)
+    assert hasher.verify('wrong', hashed.decode()) == (False, None)
+
+
+def test_hash_at_another_cost_is_rehashed(hasher):
+    old = bcrypt.hashpw(b'secret', bcrypt.gensalt(5))
+    ok, new_hash = hasher.verify('secret', old)
+    assert ok and hash_rounds(new_hash) == 4
+    assert bcrypt.checkpw(b'secret', new_hash)
+    assert hasher.verify('wrong', old) == (False, None)
+
+
+def test_hash_rounds_of_garbage():
+    assert hash_rounds(b'not a hash') is None
+
+
+def test_callers_beyond_the_queue_are_rejected(hasher):
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait()
+    thread = threading.Thread(target=hasher._run, args=('hash', slow))
+    thread.start()
+    started.wait()
+    with pytest.raises(HasherBusy):
+        hasher.hash('secret')
+    assert hasher.rejected == 1
+    release.set()
+    thread.join()
+    assert hash_rounds(hasher.hash('secret')) == 4
+
+
+def test_timeout_raises_busy():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=1, timeout=0.05)
+    release = threading.Event()
+    with pytest.raises(HasherBusy):
+        hasher._run('hash', release.wait)
+    release.set()
+    hasher.close()
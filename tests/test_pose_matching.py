@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from landmarks import normalize_keypoints, square_pixels
+from pose_matching import AUTO_POSE, PoseMatcher, score_keypoints
+
+
+def body_pixels(seed):
+    """A random body in pixel coordinates, roughly 400 x 600 px."""
+    return np.random.default_rng(seed).uniform((100, 50), (500, 650), (33, 2)).astype(np.float32)
+
+
+def in_frame(pixels, width, height, visibility=1.0):
+    """(33, 4) landmarks as MediaPipe reports them: fractions of the frame sides."""
+    kps = np.empty((33, 4), np.float32)
+    kps[:, 0] = pixels[:, 0] / width
+    kps[:, 1] = pixels[:, 1] / height
+    kps[:, 2] = 0.0
+    kps[:, 3] = visibility
+    return kps
+
+
+def matcher_for(templates):
+    """templates: [(key, kps, aspect)], normalized the way PoseRegistry does."""
+    keys = [key for key, _, _ in templates]
+    kps = np.stack([k[:, :2] for _, k, _ in templates])
+    aspects = np.array([a for _, _, a in templates], np.float32)
+    return PoseMatcher(keys, normalize_keypoints(square_pixels(kps, aspects)))
+
+
+@pytest.fixture
+def matcher():
+    return matcher_for([('tree', in_frame(body_pixels(0), 800, 800), 1.0),
+                        ('warrior', in_frame(body_pixels(1), 800, 800), 1.0)])
+
+
+def test_same_pose_scores_full_marks_wherever_the_user_stands(matcher):
+    moved = body_pixels(0) * 0.5 + (300, 40)
+    result = score_keypoints(in_frame(moved, 800, 800), 'tree', matcher)
+    assert result['status'] == 'ok' and result['accuracy'] == 100
+    assert all(result['matches']) and result['recognized'] == 'tree'
+
+
+def test_small_rotation_is_aligned_but_upside_down_is_not(matcher):
+    def rotated(degrees):
+        pixels = body_pixels(0)
+        centre = pixels.mean(axis=0)
+        t = np.radians(degrees)
+        rot = np.array([[np.cos(t), -np.sin(t)], [np.sin(t), np.cos(t)]], np.float32)
+        return in_frame((pixels - centre) @ rot.T + centre + 200, 1200, 1200)
+
+    assert score_keypoints(rotated(15), 'tree', matcher)['accuracy'] == 100
+    assert score_keypoints(rotated(180), 'tree', matcher)['accuracy'] < 50
+
+
+def test_occluded_keypoints_are_ignored(matcher):
+    kps = in_frame(body_pixels(0), 800, 800)
+    kps[:10, :2] = 0.99
+    kps[:10, 3] = 0.1
+    result = score_keypoints(kps, 'tree', matcher)
+    assert result['accuracy'] == 100
+    assert not any(result['matches'][:10])
+
+
+def test_frame_aspect_is_taken_into_account():
+    pixels = body_pixels(2)
+    matcher = matcher_for([('tree', in_frame(pixels, 1200, 800), 1.5)])
+    portrait = in_frame(pixels + (50, 300), 720, 1280)
+    assert score_keypoints(portrait, 'tree', matcher, aspect=720 / 1280)['accuracy'] == 100
+    assert score_keypoints(portrait, 'tree', matcher)['accuracy'] < 100
+
+
+def test_pose_with_several_references_scores_its_best_one():
+    matcher = matcher_for([('tree', in_frame(body_pixels(3), 800, 800), 1.0),
+                           ('tree', in_frame(body_pixels(4), 800, 800), 1.0),
+                           ('warrior', in_frame(body_pixels(5), 800, 800), 1.0)])
+    assert len(matcher) == 2
+    scores = matcher.score(in_frame(body_pixels(4), 800, 800))
+    assert scores.keys == ('tree', 'warrior')
+    assert scores.accuracy[0] == 100 and scores.accuracy.shape == (2,)
+
+
+def test_auto_and_missing_poses(matcher):
+    kps = in_frame(body_pixels(1), 800, 800)
+    auto = score_keypoints(kps, AUTO_POSE, matcher)
+    assert auto['feedback'].startswith('warrior:') and auto['accuracy'] == 100
+    missing = score_keypoints(kps, 'lotus', matcher)
+    assert missing['status'] == 'no_template' and missing['recognized'] == 'warrior'
+    assert len(missing['user_keypoints']) == 33
+    assert score_keypoints(None, 'tree', matcher)['status'] == 'no_pose'
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+mp = pytest.importorskip('mediapipe')
+if not hasattr(mp, 'solutions'):
+    pytest.skip('needs the MediaPipe solutions API', allow_module_level=True)
+
+from pose_pool import PosePool, PoolTimeout
+
+
+class FakePose:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool(PosePool):
+    def _create(self):
+        return FakePose()
+
+
+def test_graphs_are_reused():
+    pool = FakePool(size=2)
+    seen = []
+    for _ in range(5):
+        with pool.checkout() as pose:
+            seen.append(pose)
+    assert len(set(map(id, seen))) == 1
+    assert pool.stats()['created'] == 1
+    assert pool.stats()['checkouts'] == 5
+
+
+def test_grows_up_to_size_then_times_out():
+    pool = FakePool(size=2)
+    with pool.checkout() as a, pool.checkout() as b:
+        assert a is not b
+        with pytest.raises(PoolTimeout):
+            with pool.checkout(timeout=0.05):
+                pass
+    assert pool.stats()['created'] == 2
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_waiter_gets_released_graph():
+    pool = FakePool(size=1)
+    got = []
+
+    def wait():
+        with pool.checkout(timeout=2) as pose:
+            got.append(pose)
+
+    with pool.checkout() as first:
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        waiter.join(0.1)
+        assert not got
+    waiter.join(2)
+    assert got == [first]
+
+
+def test_close_releases_idle_and_returned_graphs():
+    pool = FakePool(size=2)
+    with pool.checkout() as busy:
+        with pool.checkout() as idle:
+            pass
+        pool.close()
+        assert idle.closed and not busy.closed
+    assert busy.closed
+    with pytest.raises(RuntimeError):
+        with pool.checkout():
+            pass
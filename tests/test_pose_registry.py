@@ -0,0 +1,75 @@
+import os
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from pose_registry import PoseRegistry, TEMPLATE_DTYPE, TEMPLATE_PACK
+
+POSES = [{'key': 'tree', 'name': 'Tree Pose', 'image': '/static/images/tree.png'},
+         {'key': 'warrior', 'name': 'Warrior', 'image': '/static/images/warrior.png'}]
+
+
+def keypoints(seed):
+    return np.random.default_rng(seed).uniform(0.2, 0.8, (33, 2)).astype(np.float32)
+
+
+@pytest.fixture
+def static(tmp_path):
+    templates, images = tmp_path / 'ideal_poses', tmp_path / 'images'
+    templates.mkdir()
+    images.mkdir()
+    Image.new('RGB', (200, 100)).save(images / 'tree.png')
+    np.save(templates / 'tree.npy', keypoints(0))
+    return templates
+
+
+def write_pack(templates, rows):
+    pack = np.zeros(len(rows), dtype=TEMPLATE_DTYPE)
+    for i, (key, aspect, kps) in enumerate(rows):
+        full = np.ones((33, 4), np.float32)
+        full[:, :2] = kps
+        pack[i] = (key, f"{key}-{i}.png", b'', aspect, full)
+    np.save(templates / TEMPLATE_PACK, pack)
+
+
+def test_legacy_template_takes_aspect_from_its_image(static):
+    registry = PoseRegistry(POSES, str(static))
+    tree = registry.template('tree')
+    assert tree.name == 'Tree Pose'
+    assert tree.aspect == pytest.approx(2.0)
+    np.testing.assert_array_equal(tree.keypoints, keypoints(0))
+    assert not tree.keypoints.flags.writeable
+    assert registry.template('warrior') is None
+    assert registry.pose('warrior')['name'] == 'Warrior'
+
+
+def test_pack_replaces_legacy_and_keeps_every_reference(static):
+    write_pack(static, [('tree', 0.5, keypoints(1)), ('tree', 1.5, keypoints(2)), ('warrior', 1.0, keypoints(3))])
+    registry = PoseRegistry(POSES, str(static))
+    np.testing.assert_array_equal(registry.template('tree').keypoints, keypoints(1))
+    assert registry.template('tree').aspect == pytest.approx(0.5)
+    assert registry.template('warrior') is not None
+    matcher = registry.matcher()
+    assert len(matcher) == 2 and len(matcher.templates) == 3
+
+
+def test_reloads_when_a_template_changes(static):
+    registry = PoseRegistry(POSES, str(static), reload_interval=0.0)
+    assert registry.template('warrior') is None
+    np.save(static / 'warrior.npy', keypoints(4))
+    time.sleep(0.01)
+    np.testing.assert_array_equal(registry.template('warrior').keypoints, keypoints(4))
+
+
+def test_missing_image_falls_back_to_square(static):
+    os.remove(static.parent / 'images' / 'tree.png')
+    assert PoseRegistry(POSES, str(static)).template('tree').aspect == 1.0
+
+
+def test_bad_template_is_skipped(static):
+    np.save(static / 'warrior.npy', np.zeros((5, 2)))
+    registry = PoseRegistry(POSES, str(static))
+    assert registry.template('warrior') is None
+    assert registry.template('tree') is not None
@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from startup import StartupReport
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip('flask_sock')
+
+
+def import_app(cwd, **env):
+    code = ('import json, sys, app\n'
+            'print(json.dumps({"modules": sorted(m for m in ("cv2", "mediapipe", "numpy") if m in sys.modules),\n'
+            '                  "report": app.STARTUP.as_dict()}))\n')
+    env = {**os.environ, 'PYTHONPATH': ROOT, **env}
+    out = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_importing_the_app_loads_no_vision_modules_and_touches_no_files(tmp_path):
+    result = import_app(tmp_path)
+    assert result['modules'] == []
+    assert [phase['phase'] for phase in result['report']['phases']] == ['app']
+    assert not result['report']['vision_loaded']['cv2']
+    assert os.listdir(tmp_path) == []
+
+
+def test_report_phases():
+    report = StartupReport()
+    with report.phase('vision'):
+        pass
+    report.mark('app')
+    assert [p['phase'] for p in report.phases] == ['vision', 'app']
+    assert report.as_dict()['rss_mb'] > 0
@@ -0,0 +1,86 @@
+import os
+import time
+
+import jobs
+import storage
+
+
+def put(rel, owner, size, kind=storage.EVAL, job_id=None, age=0):
+    path = os.path.join('static', rel)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    storage.record(rel, owner, kind, job_id)
+    storage._execute('UPDATE artifacts SET last_access=? WHERE path=?', (time.time() - age, rel))
+
+
+def kept():
+    return sorted(row[0] for row in storage._execute('SELECT path FROM artifacts'))
+
+
+def test_record_and_usage(job_db):
+    put('evaluated_videos/a.mp4', 'ada', 100)
+    put('evaluated_videos/a.mp4', 'ada', 150)
+    assert storage.usage('ada')['files'] == 1 and storage.usage('ada')['bytes'] == 150
+    assert storage.relative(os.path.join('static', 'uploads', 'x.mp4')) == 'uploads/x.mp4'
+
+
+def test_expired_files_are_removed_and_jobs_lose_the_link(job_db):
+    job_id = jobs.create_job('ada', 'plank', os.path.join('static', 'uploads', 'in.mp4'))
+    jobs.finish_job(job_id, 'ok', 'evaluated_videos/old.mp4')
+    put('evaluated_videos/old.mp4', 'ada', 10, age=100)
+    put('evaluated_videos/new.mp4', 'ada', 10)
+    assert storage.enforce(ttl=50) == 1
+    assert kept() == ['evaluated_videos/new.mp4']
+    assert not os.path.exists(os.path.join('static', 'evaluated_videos', 'old.mp4'))
+    job = jobs.get_job(job_id)
+    assert job['video_rel'] is None and job['summary'] == 'ok'
+
+
+def test_user_quota_evicts_that_users_least_recently_used(job_db):
+    put('evaluated_videos/a1.mp4', 'ada', 40, age=30)
+    put('evaluated_videos/a2.mp4', 'ada', 40, age=20)
+    put('evaluated_videos/a3.mp4', 'ada', 40, age=10)
+    put('evaluated_videos/b1.mp4', 'bob', 40, age=40)
+    assert storage.enforce(ttl=3600, user_quota=100, total_quota=1000) == 1
+    assert kept() == ['evaluated_videos/a2.mp4', 'evaluated_videos/a3.mp4', 'evaluated_videos/b1.mp4']
+
+
+def test_total_quota_evicts_everyones_least_recently_used(job_db):
+    put('evaluated_videos/a1.mp4', 'ada', 40, age=30)
+    put('evaluated_videos/b1.mp4', 'bob', 40, age=40)
+    put('evaluated_videos/c1.mp4', 'cy', 40, age=10)
+    assert storage.enforce(ttl=3600, user_quota=1000, total_quota=100) == 1
+    assert kept() == ['evaluated_videos/a1.mp4', 'evaluated_videos/c1.mp4']
+
+
+def test_files_of_jobs_in_flight_are_never_evicted(job_db):
+    upload = os.path.join('static', 'uploads', 'in.mp4')
+    with open(upload, 'wb') as f:
+        f.write(b'\0' * 40)
+    job_id = jobs.create_job('ada', 'plank', upload)
+    storage._execute('UPDATE artifacts SET last_access=0')
+    assert storage.enforce(ttl=50, user_quota=0, total_quota=0) == 0
+    assert kept() == ['uploads/in.mp4']
+
+    jobs.finish_job(job_id, 'ok', None)
+    assert storage.enforce(ttl=50) == 1
+    assert kept() == []
+
+
+def test_lookup_adopts_untracked_job_videos(job_db):
+    job_id = jobs.create_job('ada', 'plank', os.path.join('static', 'uploads', 'in.mp4'))
+    with open(os.path.join('static', 'evaluated_videos', 'out.mp4'), 'wb') as f:
+        f.write(b'\0' * 7)
+    jobs.finish_job(job_id, 'ok', 'evaluated_videos/out.mp4')
+    row = storage.lookup('evaluated_videos/out.mp4')
+    assert row[:5] == ('evaluated_videos/out.mp4', 'ada', storage.EVAL, job_id, 7)
+    assert storage.lookup('evaluated_videos/unknown.mp4') is None
+
+
+def test_drop_intermediate_only_once_the_web_copy_exists(job_db):
+    put('evaluated_videos/raw.avi', 'ada', 10)
+    storage.drop_intermediate('evaluated_videos/raw.avi', 'evaluated_videos/web.mp4')
+    assert kept() == ['evaluated_videos/raw.avi']
+    put('evaluated_videos/web.mp4', 'ada', 5)
+    storage.drop_intermediate('evaluated_videos/raw.avi', 'evaluated_videos/web.mp4')
+    assert kept() == ['evaluated_videos/web.mp4']
@@ -0,0 +1,105 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import template_builder
+from pose_registry import TEMPLATE_PACK, PoseRegistry, load_pack
+from template_builder import build, check_widths, discover
+
+
+class FakePose:
+    closed = 0
+
+    def close(self):
+        FakePose.closed += 1
+
+
+@pytest.fixture
+def images(tmp_path, monkeypatch):
+    """static/images with tree.png, tree/side.jpg and warrior.png; extraction is faked."""
+    extracted = []
+
+    def init_worker():
+        template_builder._pose = FakePose()
+
+    def extract(path):
+        extracted.append(os.path.basename(path))
+        if 'blank' in path:
+            return None, 1.0
+        kps = np.full((33, 4), len(extracted), np.float32)
+        with Image.open(path) as image:
+            return kps, image.size[0] / image.size[1]
+    monkeypatch.setattr(template_builder, '_init_worker', init_worker)
+    monkeypatch.setattr(template_builder, '_extract', extract)
+    FakePose.closed = 0
+
+    images = tmp_path / 'images'
+    (images / 'tree').mkdir(parents=True)
+    Image.new('RGB', (200, 100)).save(images / 'tree.png')
+    Image.new('RGB', (100, 200)).save(images / 'tree' / 'side.jpg')
+    Image.new('RGB', (100, 100)).save(images / 'warrior.png')
+    (images / 'notes.txt').write_text('not an image')
+    return SimpleNamespace(dir=images, out=tmp_path / 'ideal_poses', extracted=extracted)
+
+
+def test_discover_puts_the_main_picture_first(images):
+    assert discover(str(images.dir)) == [('tree', 'tree.png'), ('tree', 'tree/side.jpg'), ('warrior', 'warrior.png')]
+
+
+def test_check_widths():
+    check_widths([('tree', 'tree.png')])
+    with pytest.raises(ValueError, match='keys longer than 32'):
+        check_widths([('k' * 33, 'a.png')])
+    with pytest.raises(ValueError, match='sources longer than 96'):
+        check_widths([('tree', 's' * 97)])
+
+
+def test_build_writes_every_reference_with_its_aspect(images):
+    counts = build(str(images.dir), str(images.out), workers=1)
+    assert counts == {'references': 3, 'poses': 2, 'extracted': 3, 'reused': 0, 'failed': 0}
+    pack = load_pack(str(images.out / TEMPLATE_PACK))
+    assert list(pack['source']) == ['tree.png', 'tree/side.jpg', 'warrior.png']
+    np.testing.assert_allclose(pack['aspect'], [2.0, 0.5, 1.0])
+    assert FakePose.closed == 1
+
+
+def test_rebuild_extracts_only_new_or_changed_images(images):
+    build(str(images.dir), str(images.out), workers=1)
+    pack_path = images.out / TEMPLATE_PACK
+    os.utime(pack_path, (0, 0))
+    assert build(str(images.dir), str(images.out), workers=1)['reused'] == 3
+    assert os.path.getmtime(pack_path) == 0
+
+    del images.extracted[:]
+    Image.new('RGB', (300, 100)).save(images.dir / 'warrior.png')
+    os.remove(images.dir / 'tree' / 'side.jpg')
+    counts = build(str(images.dir), str(images.out), workers=1)
+    assert images.extracted == ['warrior.png']
+    assert counts['references'] == 2 and counts['reused'] == 1
+    assert list(load_pack(str(pack_path))['aspect']) == [2.0, 3.0]
+
+    del images.extracted[:]
+    build(str(images.dir), str(images.out), workers=1, force=True)
+    assert sorted(images.extracted) == ['tree.png', 'warrior.png']
+
+
+def test_images_without_a_pose_are_left_out_and_retried(images):
+    Image.new('RGB', (100, 100)).save(images.dir / 'tree' / 'blank.png')
+    assert build(str(images.dir), str(images.out), workers=1)['failed'] == 1
+    assert 'tree/blank.png' not in load_pack(str(images.out / TEMPLATE_PACK))['source']
+    del images.extracted[:]
+    build(str(images.dir), str(images.out), workers=1)
+    assert images.extracted == ['blank.png']
+
+
+def test_registry_ignores_pack_keys_the_app_does_not_know(images):
+    Image.new('RGB', (100, 100)).save(images.dir / 'lotus.png')
+    build(str(images.dir), str(images.out), workers=1)
+    poses = [{'key': 'tree', 'name': 'Tree Pose', 'image': '/static/images/tree.png'},
+             {'key': 'warrior', 'name': 'Warrior', 'image': '/static/images/warrior.png'}]
+    registry = PoseRegistry(poses, str(images.out))
+    assert registry.template('lotus') is None
+    assert registry.matcher().keys == ('tree', 'warrior')
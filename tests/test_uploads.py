@@ -0,0 +1,112 @@
+import io
+import os
+
+import pytest
+
+import uploads
+from uploads import UploadError, UploadStore, VideoInfo, sniff_container
+
+MP4_HEAD = b'\x00\x00\x00\x18ftypisom' + b'\x00' * 52
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    probed = []
+
+    def probe(path, container=None):
+        probed.append(os.path.getsize(path))
+        return VideoInfo(container, 'avc1', 640, 480, 30.0, 300, 10.0)
+    monkeypatch.setattr(uploads, 'probe_video', probe)
+    monkeypatch.setattr(uploads, 'PROBE_BYTES', 100)
+    store = UploadStore(str(tmp_path / 'upload_tmp'), max_bytes=1000)
+    store.probed = probed
+    return store
+
+
+def test_sniff_container():
+    assert sniff_container(MP4_HEAD) == 'mp4'
+    assert sniff_container(b'\x1a\x45\xdf\xa3' + b'\x00' * 8) == 'webm'
+    assert sniff_container(b'RIFF\x00\x00\x00\x00AVI ') == 'avi'
+    assert sniff_container(b'\x00\x00\x00\x08wide') == 'mov'
+    assert sniff_container(b'%PDF-1.7\n') is None
+
+
+def test_create_validates(store):
+    with pytest.raises(UploadError, match='Unknown test'):
+        store.create('ada', '../etc', 'a.mp4', 10)
+    with pytest.raises(UploadError) as too_big:
+        store.create('ada', 'plank', 'a.mp4', 1001)
+    assert too_big.value.status == 413
+    status = store.create('ada', 'plank', 'a.mp4', 200)
+    assert status['offset'] == 0 and status['size'] == 200
+
+
+def test_chunks_resume_at_the_stored_offset(store):
+    upload_id = store.create('ada', 'plank', 'a.mp4', 200)['upload_id']
+    meta = store.get(upload_id, 'ada')
+    data = MP4_HEAD + b'x' * 136
+    assert store.append(meta, 0, io.BytesIO(data[:80])) == 80
+    assert store.probed == []
+
+    # A resent chunk is refused with the offset to resume from.
+    with pytest.raises(UploadError) as conflict:
+        store.append(store.get(upload_id, 'ada'), 0, io.BytesIO(data[:80]))
+    assert conflict.value.status == 409 and 'Expected offset 80' in str(conflict.value)
+
+    assert store.status(store.get(upload_id, 'ada'))['offset'] == 80
+    assert store.append(store.get(upload_id, 'ada'), 80, io.BytesIO(data[80:])) == 200
+    assert store.probed == [200]
+    meta = store.get(upload_id, 'ada')
+    assert meta['container'] == 'mp4' and meta['probed']
+
+
+def test_uploads_are_private(store):
+    upload_id = store.create('ada', 'plank', 'a.mp4', 200)['upload_id']
+    for upload, owner in ((upload_id, 'bob'), ('../x', 'ada'), ('missing', 'ada')):
+        with pytest.raises(UploadError) as missing:
+            store.get(upload, owner)
+        assert missing.value.status == 404
+
+
+def test_non_video_is_rejected_after_the_first_bytes(store):
+    upload_id = store.create('ada', 'plank', 'a.pdf', 200)['upload_id']
+    with pytest.raises(UploadError) as rejected:
+        store.append(store.get(upload_id, 'ada'), 0, io.BytesIO(b'%PDF-1.7\n' + b'x' * 91))
+    assert rejected.value.status == 415
+    assert os.listdir(store.directory) == []
+
+
+def test_more_than_the_declared_size_is_refused(store):
+    upload_id = store.create('ada', 'plank', 'a.mp4', 100)['upload_id']
+    with pytest.raises(UploadError) as too_big:
+        store.append(store.get(upload_id, 'ada'), 0, io.BytesIO(MP4_HEAD + b'x' * 50))
+    assert too_big.value.status == 413
+    assert store.offset(upload_id) == 0
+
+
+def test_too_long_video_is_rejected(store, monkeypatch):
+    monkeypatch.setattr(uploads, 'probe_video',
+                        lambda path, container=None: VideoInfo(container, 'avc1', 640, 480, 30.0, 30000, 1000.0))
+    upload_id = store.create('ada', 'plank', 'a.mp4', 200)['upload_id']
+    with pytest.raises(UploadError) as rejected:
+        store.append(store.get(upload_id, 'ada'), 0, io.BytesIO(MP4_HEAD + b'x' * 136))
+    assert rejected.value.status == 413
+
+
+def test_complete_moves_the_file_into_uploads(store):
+    upload_id = store.create('ada', 'plank', 'a.mp4', 200)['upload_id']
+    store.append(store.get(upload_id, 'ada'), 0, io.BytesIO(MP4_HEAD + b'x' * 136))
+    path = store.complete(store.get(upload_id, 'ada'))
+    assert path.startswith(os.path.join('static', 'uploads', 'plank_')) and path.endswith('.mp4')
+    assert os.path.getsize(path) == 200
+    assert os.listdir(store.directory) == []
+
+
+def test_sweep_removes_stale_uploads(store):
+    upload_id = store.create('ada', 'plank', 'a.mp4', 200)['upload_id']
+    old = store.create('ada', 'plank', 'b.mp4', 200)['upload_id']
+    for name in (f'{old}.part', f'{old}.json'):
+        os.utime(os.path.join(store.directory, name), (0, 0))
+    store.sweep()
+    assert sorted(os.listdir(store.directory)) == [f'{upload_id}.json', f'{upload_id}.part']
@@ -0,0 +1,57 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from video_io import H264PipeWriter, open_video_writer
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='needs ffmpeg')
+
+SIZE = (64, 48)
+
+
+def frames(n):
+    for i in range(n):
+        yield np.full((SIZE[1], SIZE[0], 3), i * 20 % 256, np.uint8)
+
+
+def test_encodes_a_playable_h264_file(tmp_path):
+    cv2 = pytest.importorskip('cv2')
+    path = str(tmp_path / 'out.mp4')
+    writer, web_ready = open_video_writer(path, 10.0, SIZE)
+    assert web_ready and isinstance(writer, H264PipeWriter)
+    for frame in frames(10):
+        writer.write(frame)
+    assert writer.release() is True
+    cap = cv2.VideoCapture(path)
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    cap.release()
+    assert count == 10
+
+
+def test_frame_of_the_wrong_size_is_rejected(tmp_path):
+    writer = H264PipeWriter(str(tmp_path / 'out.mp4'), 10.0, SIZE)
+    with pytest.raises(ValueError):
+        writer.write(np.zeros((10, 10, 3), np.uint8))
+    writer.release()
+
+
+def test_ffmpeg_dying_mid_encode_is_reported(tmp_path):
+    writer = H264PipeWriter(str(tmp_path / 'out.mp4'), 10.0, SIZE)
+    writer._proc.kill()
+    writer._proc.wait()
+    for frame in frames(50):
+        writer.write(frame)
+    assert writer.release() is False
+    assert writer._proc is None
+
+
+def test_unwritable_output_is_reported(tmp_path):
+    writer = H264PipeWriter(str(tmp_path / 'missing' / 'out.mp4'), 10.0, SIZE)
+    for frame in frames(3):
+        writer.write(frame)
+    assert writer.release() is False
+    assert not os.path.exists(tmp_path / 'missing')
@@ -0,0 +1,278 @@
+"""
+Streaming and resumable video uploads for /physical_test.
+
+Browsers send the file in chunks (POST /api/uploads to start, PUT each chunk
+at its byte offset, GET to learn where to resume after a dropped
+connection). Chunks are copied from the request stream straight into a
+.part file under UPLOAD_TMP_DIR, so a 200MB recording never sits in memory
+and each request holds a worker only for one chunk. The first bytes are
+sniffed for a known container and the partial file is probed as soon as
+enough has arrived, so non-videos and over-long recordings are rejected
+before the rest is uploaded. The .part file's size is the upload offset and
+a JSON sidecar holds the metadata, so any web worker can take the next chunk.
+
+Plain multipart form posts go through DiskRequest, which spools the file
+field into UPLOAD_TMP_DIR instead of a temp file that later gets copied.
+"""
+import fcntl
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from collections import namedtuple
+
+from flask import Request
+
+UPLOADS_DIR = os.path.join('static', 'uploads')
+UPLOAD_TMP_DIR = os.environ.get('UPLOAD_TMP_DIR', 'upload_tmp')
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_MB', 200)) << 20
+MAX_VIDEO_SECONDS = float(os.environ.get('MAX_VIDEO_SECONDS', 600))
+CHUNK_SIZE = 4 << 20        # suggested to clients
+COPY_BUFFER = 1 << 20       # read size when copying a request body to disk
+PROBE_BYTES = 512 << 10     # try probing the partial file once this much arrived
+STALE_AFTER = 24 * 3600.0   # unfinished uploads are deleted after this long
+
+EXTENSIONS = {'mp4': '.mp4', 'mov': '.mov', 'webm': '.webm', 'avi': '.avi'}
+
+# container: sniffed from the magic bytes; codec: FourCC reported by OpenCV.
+VideoInfo = namedtuple('VideoInfo', 'container codec width height fps frames duration')
+
+
+class UploadError(Exception):
+    """The upload was rejected; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff_container(head):
+    """Container name from the first bytes of a file, or None if it isn't a video we know."""
+    if len(head) >= 12 and head[4:8] == b'ftyp':
+        return 'mp4'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'avi'
+    # QuickTime files may start with other atoms before ftyp.
+    if len(head) >= 8 and head[4:8] in (b'moov', b'mdat', b'wide', b'free'):
+        return 'mov'
+    return None
+
+
+def probe_video(path, container=None):
+    """VideoInfo if OpenCV can open the file and decode a frame, else None."""
+    import cv2  # only upload routes need it; keeps it out of worker startup
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            return None
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            return None
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        codec = ''.join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)).strip('\x00 ') or None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        duration = frames / fps if fps and fps > 0 and frames > 0 else None
+        return VideoInfo(container, codec, frame.shape[1], frame.shape[0], fps, frames, duration)
+    finally:
+        cap.release()
+
+
+def check_video(info):
+    """Raise UploadError if a probed video can't be evaluated."""
+    if info.duration is not None and info.duration > MAX_VIDEO_SECONDS:
+        raise UploadError(f"Video is {info.duration:.0f}s long; the limit is {MAX_VIDEO_SECONDS:.0f}s", 413)
+    if min(info.width, info.height) < 64:
+        raise UploadError("Video resolution is too small", 415)
+
+
+class UploadStore:
+    """Resumable chunked uploads kept as .part files plus JSON metadata in `directory`."""
+
+    def __init__(self, directory=UPLOAD_TMP_DIR, max_bytes=MAX_UPLOAD_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _part(self, upload_id):
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def _meta(self, upload_id):
+        return os.path.join(self.directory, f"{upload_id}.json")
+
+    def create(self, owner, test, filename, size):
+        if not re.fullmatch(r'[a-z0-9_]{1,32}', test or ''):
+            raise UploadError("Unknown test")
+        if not isinstance(size, int) or size <= 0:
+            raise UploadError("Upload size is required")
+        if size > self.max_bytes:
+            raise UploadError(f"File is larger than {self.max_bytes >> 20}MB", 413)
+        os.makedirs(self.directory, exist_ok=True)
+        self.sweep()
+        upload_id = uuid.uuid4().hex
+        meta = {'id': upload_id, 'owner': owner, 'test': test, 'filename': os.path.basename(filename or ''),
+                'size': size, 'container': None, 'probed': False, 'created': time.time()}
+        open(self._part(upload_id), 'wb').close()
+        self._save(meta)
+        return self.status(meta)
+
+    def _save(self, meta):
+        tmp = f"{self._meta(meta['id'])}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta(meta['id']))
+
+    def get(self, upload_id, owner):
+        """Metadata of an upload owned by `owner`, or UploadError(404)."""
+        if not upload_id.isalnum():
+            raise UploadError("Upload not found", 404)
+        try:
+            with open(self._meta(upload_id)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise UploadError("Upload not found", 404) from None
+        if meta['owner'] != owner:
+            raise UploadError("Upload not found", 404)
+        return meta
+
+    def offset(self, upload_id):
+        try:
+            return os.path.getsize(self._part(upload_id))
+        except OSError:
+            return 0
+
+    def status(self, meta):
+        return {'upload_id': meta['id'], 'offset': self.offset(meta['id']), 'size': meta['size'],
+                'chunk_size': CHUNK_SIZE}
+
+    def append(self, meta, offset, stream):
+        """
+        Copy a chunk from `stream` to the .part file at `offset`, validating
+        the video as early as its bytes allow. Returns the new offset.
+        """
+        upload_id = meta['id']
+        current = self.offset(upload_id)
+        if offset != current:
+            # The client lost a response or resent a chunk; tell it where to resume.
+            raise UploadError(f"Expected offset {current}", 409)
+        with open(self._part(upload_id), 'r+b') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError("Another chunk of this upload is being written", 409) from None
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise UploadError(f"Expected offset {current}", 409)
+            written = current
+            f.seek(current)
+            while True:
+                data = stream.read(COPY_BUFFER)
+                if not data:
+                    break
+                written += len(data)
+                if written > meta['size']:
+                    f.truncate(current)
+                    raise UploadError("More data than the declared size", 413)
+                f.write(data)
+        try:
+            self._validate(meta, written)
+        except UploadError:
+            self.discard(upload_id)
+            raise
+        return written
+
+    def _validate(self, meta, written):
+        changed = False
+        if meta['container'] is None and written >= min(64, meta['size']):
+            with open(self._part(meta['id']), 'rb') as f:
+                meta['container'] = sniff_container(f.read(64))
+            if meta['container'] is None:
+                raise UploadError("File is not a supported video (mp4, mov, webm or avi)", 415)
+            changed = True
+        # A partial file can only be probed when its index is at the front
+        # (webm, faststart mp4); otherwise this waits for the complete file.
+        if not meta['probed'] and written >= min(PROBE_BYTES, meta['size']):
+            info = probe_video(self._part(meta['id']), meta['container'])
+            if info is not None:
+                check_video(info)
+                meta['probed'] = True
+                changed = True
+        if changed:
+            self._save(meta)
+
+    def complete(self, meta):
+        """Validate the finished upload and move it into UPLOADS_DIR; returns the new path."""
+        try:
+            return accept_file(self._part(meta['id']), meta['test'])
+        finally:
+            self.discard(meta['id'])
+
+    def discard(self, upload_id):
+        for path in (self._part(upload_id), self._meta(upload_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def sweep(self, max_age=STALE_AFTER):
+        """Delete uploads (and spooled form files) nobody has touched for `max_age` seconds."""
+        now = time.time()
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def accept_file(path, test):
+    """
+    Check that a fully received file is a video we can evaluate and move it
+    into UPLOADS_DIR under a fresh name; returns the new path. The file is
+    deleted if it is rejected.
+    """
+    try:
+        with open(path, 'rb') as f:
+            container = sniff_container(f.read(64))
+        if container is None:
+            raise UploadError("File is not a supported video (mp4, mov, webm or avi)", 415)
+        info = probe_video(path, container)
+        if info is None:
+            raise UploadError("Could not decode the uploaded video", 415)
+        check_video(info)
+    except (UploadError, OSError):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    target = os.path.join(UPLOADS_DIR, f"{test}_{uuid.uuid4().hex}{EXTENSIONS[container]}")
+    try:
+        os.replace(path, target)
+    except OSError:
+        shutil.move(path, target)  # different filesystem
+    return target
+
+
+class DiskRequest(Request):
+    """
+    Spools multipart file fields of DISK_ENDPOINTS into UPLOAD_TMP_DIR rather
+    than memory or /tmp, so accept_file() can move them without a copy.
+    Small uploads elsewhere (live frames) keep Werkzeug's in-memory default.
+    """
+
+    DISK_ENDPOINTS = {'physical_test'}
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint not in self.DISK_ENDPOINTS:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=UPLOAD_TMP_DIR, prefix='form-', suffix='.part', delete=False)
@@ -0,0 +1,105 @@
+import shutil
+import subprocess
+
+
+def convert_to_h264(input_path, output_path):
+    """
+    Converts video to H.264 format using FFmpeg for browser compatibility.
+    Returns True if successful, False otherwise.
+    """
+    try:
+        if shutil.which('ffmpeg') is None:
+            print("FFmpeg not found. Skipping conversion.")
+            return False
+
+        print(f"Converting {input_path} to H.264...")
+        command = [
+            'ffmpeg', '-y',
+            '-i', input_path,
+            '-vcodec', 'libx264',
+            '-acodec', 'aac',
+            '-movflags', 'faststart',
+            output_path
+        ]
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        print("Conversion successful!")
+        return True
+    except Exception as e:
+        print(f"Video conversion failed: {e}")
+        return False
+
+
+class H264PipeWriter:
+    """
+    cv2.VideoWriter look-alike that pipes raw BGR frames into ffmpeg and
+    produces a browser-ready H.264 MP4 (yuv420p, faststart) in one pass,
+    so no intermediate mp4v file has to be re-decoded and re-encoded.
+    """
+
+    def __init__(self, path, fps, size):
+        width, height = size
+        self.path = path
+        self._frame_bytes = width * height * 3
+        command = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+            '-s', f'{width}x{height}', '-r', f'{fps:.3f}',
+            '-i', '-',
+            '-an',
+            # yuv420p needs even dimensions
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            '-vcodec', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+            '-movflags', 'faststart',
+            path
+        ]
+        try:
+            self._proc = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"Could not start ffmpeg: {e}")
+            self._proc = None
+        self._broken = False
+
+    def isOpened(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def write(self, frame):
+        if self._proc is None or self._broken:
+            return
+        data = frame.tobytes() if frame.flags['C_CONTIGUOUS'] else frame.copy().tobytes()
+        if len(data) != self._frame_bytes:
+            raise ValueError(f"Frame has {len(data)} bytes, expected {self._frame_bytes}")
+        try:
+            self._proc.stdin.write(data)
+        except BrokenPipeError:
+            # Keep the process so release() reaps it and reports the failure.
+            print("ffmpeg exited early while encoding")
+            self._broken = True
+
+    def release(self):
+        """Finish the file; returns True if ffmpeg took every frame and exited cleanly."""
+        if self._proc is None:
+            return False
+        try:
+            self._proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        code = self._proc.wait()
+        self._proc = None
+        if code != 0:
+            print(f"ffmpeg exited with {code} while encoding {self.path}")
+        return code == 0 and not self._broken
+
+
+def open_video_writer(path, fps, size):
+    """
+    Returns (writer, web_ready). Uses the single-pass ffmpeg H.264 pipe when
+    ffmpeg is installed, otherwise an mp4v cv2.VideoWriter that browsers may
+    not play.
+    """
+    if shutil.which('ffmpeg') is not None:
+        writer = H264PipeWriter(path, fps, size)
+        if writer.isOpened():
+            return writer, True
+    import cv2
+    return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size), False